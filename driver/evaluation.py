@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict, Any, Union
+from typing import List, Dict, Any, Union, Tuple, Callable
 
 class DatabaseDriver(ABC):
     """Database Driver Interface"""
@@ -13,6 +13,18 @@ class DatabaseDriver(ABC):
         """Execute the query and return the result list; return None if an error occurs."""
         pass
 
+    def query_many(self, queries: List[Tuple[str, str]], consume: Callable = None) -> List[Dict]:
+        """Execute (cypher, db_name) pairs and return one {"result", "error"} dict per query, in order.
+        consume, if given, maps each query's record iterator to the stored result.
+        Drivers that can overlap round trips or stream records should override this sequential default."""
+        outcomes = []
+        for cypher, db_name in queries:
+            result = self.query(cypher, db_name)
+            if result is not None and consume:
+                result = consume(iter(result))
+            outcomes.append({"result": result, "error": None if result is not None else "query failed"})
+        return outcomes
+
     @abstractmethod
     def close(self):
         """Close connection"""
@@ -1,9 +1,14 @@
 from abc import ABC, abstractmethod
-from typing import List, Dict
+from typing import List, Dict, Callable, Optional
 
 class Text2GraphSystem(ABC):
     """Generation System Interface"""
     @abstractmethod
-    def predict_batch(self, data: List[Dict]) -> List[Dict]:
-        """Batch Prediction"""
-        pass
\ No newline at end of file
+    def predict_batch(self, data: List[Dict], on_record: Optional[Callable[[Dict], None]] = None) -> List[Dict]:
+        """Batch Prediction; with on_record, each result record is passed to it as soon as it is
+        complete instead of being returned"""
+        pass
+
+    def close(self):
+        """Release resources held across batches (caches, clients); no-op by default"""
+        pass
@@ -0,0 +1,213 @@
+import os
+import json
+import shutil
+import hashlib
+import numpy as np
+from impl.db_driver.memory_graph import PropertyGraph
+
+_DTYPES = {"DOUBLE": np.float64, "FLOAT": np.float64, "BOOL": np.bool_}
+
+def _dtype(type_name: str):
+    type_name = (type_name or "STRING").upper()
+    return np.int64 if type_name.startswith("INT") else _DTYPES.get(type_name)
+
+
+class MappedColumn:
+    """Read-only view over a memory-mapped array (plus optional null mask) that yields Python values."""
+    def __init__(self, data, nulls=None):
+        self.data = data
+        self.nulls = nulls
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, i):
+        if self.nulls is not None and self.nulls[i]:
+            return None
+        return self.data[i].item()
+
+    def __iter__(self):
+        values = self.data.tolist()
+        if self.nulls is None:
+            return iter(values)
+        return (None if null else value for value, null in zip(values, self.nulls.tolist()))
+
+
+class ColumnarGraphStore:
+    """
+    Binary cache of a PropertyGraph: one typed .npy array per property (with a null mask),
+    endpoint arrays and CSR adjacency per edge label. Arrays are opened with mmap, so
+    loading skips CSV parsing and concurrent worker processes share the same pages.
+    The cache is rebuilt when the import config or any CSV it lists changes.
+    """
+    MANIFEST = "manifest.json"
+    VERSION = 1
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    def load(self, config_path: str, data_dir: str = None) -> PropertyGraph:
+        """Graph for config_path, served from the cache when it is fresh and rebuilt otherwise."""
+        data_dir = data_dir or os.path.dirname(os.path.abspath(config_path))
+        target = os.path.join(self.cache_dir, self._cache_name(config_path, data_dir))
+        sources = self.source_files(config_path, data_dir)
+        manifest = self._read_manifest(target)
+        if manifest is not None and self._is_fresh(target, manifest, sources):
+            print(f"Loading columnar graph cache from {target}")
+            return self._load(target, manifest)
+
+        print(f"Building columnar graph cache in {target}...")
+        graph = PropertyGraph.from_import_config(config_path, data_dir)
+        self._save(graph, target, sources)
+        return self._load(target, self._read_manifest(target))
+
+    @staticmethod
+    def _cache_name(config_path, data_dir) -> str:
+        key = f"{os.path.abspath(config_path)}|{os.path.abspath(data_dir)}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def source_files(config_path, data_dir=None) -> list:
+        """The config plus every CSV it references, resolved the way PropertyGraph resolves them."""
+        data_dir = data_dir or os.path.dirname(os.path.abspath(config_path))
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        paths = [os.path.abspath(config_path)]
+        for spec in config.get("files", []):
+            path = os.path.join(data_dir, os.path.basename(spec["path"]))
+            if path not in paths:
+                paths.append(path)
+        return paths
+
+    @staticmethod
+    def _file_hash(path) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _is_fresh(self, target, manifest, sources) -> bool:
+        if manifest.get("version") != self.VERSION:
+            return False
+        recorded = manifest.get("sources", {})
+        if set(recorded) != set(sources):
+            return False
+        touched = False
+        for path in sources:
+            if not os.path.exists(path):
+                return False
+            stat = os.stat(path)
+            entry = recorded[path]
+            if entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                continue
+            # mtime changes on checkout/copy; only a content change invalidates the cache
+            if entry["size"] != stat.st_size or entry["sha256"] != self._file_hash(path):
+                return False
+            entry["mtime_ns"] = stat.st_mtime_ns
+            touched = True
+        if touched:
+            self._write_json(os.path.join(target, self.MANIFEST), manifest)
+        return True
+
+    def _read_manifest(self, target):
+        try:
+            with open(os.path.join(target, self.MANIFEST), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    @staticmethod
+    def _write_json(path, payload):
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+        os.replace(tmp, path)
+
+    # --- write ---
+    def _save(self, graph: PropertyGraph, target: str, sources: list):
+        # Build next to the final location and swap it in, so readers never see a partial cache
+        staging = target + f".tmp{os.getpid()}"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+
+        manifest = {"version": self.VERSION, "vertices": [], "edges": [], "sources": {}}
+        for table in graph.vertex_by_code:
+            prefix = f"v{table.code}"
+            for i, name in enumerate(table.properties):
+                self._save_column(staging, f"{prefix}_p{i}", table.columns[name], table.types[name])
+            manifest["vertices"].append({
+                "label": table.label, "primary": table.primary, "size": table.size,
+                "properties": [{"name": n, "type": table.types[n]} for n in table.properties],
+            })
+        for e, table in enumerate(graph.edges.values()):
+            prefix = f"e{e}"
+            for i, name in enumerate(table.properties):
+                self._save_column(staging, f"{prefix}_p{i}", table.columns[name], table.types[name])
+            for field in ("src_label", "src_row", "dst_label", "dst_row"):
+                np.save(os.path.join(staging, f"{prefix}_{field}.npy"), np.asarray(getattr(table, field), dtype=np.int64))
+            csr = {}
+            for direction, entries in (("out", table.out_csr), ("in", table.in_csr)):
+                for code, (offsets, edge_ids) in entries.items():
+                    np.save(os.path.join(staging, f"{prefix}_{direction}{code}_offsets.npy"), np.asarray(offsets, dtype=np.int64))
+                    np.save(os.path.join(staging, f"{prefix}_{direction}{code}_ids.npy"), np.asarray(edge_ids, dtype=np.int64))
+                csr[direction] = sorted(entries)
+            manifest["edges"].append({
+                "label": table.label, "size": table.size, "csr": csr,
+                "properties": [{"name": n, "type": table.types[n]} for n in table.properties],
+            })
+        for path in sources:
+            stat = os.stat(path)
+            manifest["sources"][path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns,
+                                         "sha256": self._file_hash(path)}
+        self._write_json(os.path.join(staging, self.MANIFEST), manifest)
+
+        if os.path.exists(target):
+            shutil.rmtree(target, ignore_errors=True)
+        os.replace(staging, target)
+
+    @staticmethod
+    def _save_column(directory, name, values, type_name):
+        dtype = _dtype(type_name)
+        nulls = np.fromiter((v is None for v in values), dtype=np.bool_, count=len(values))
+        if dtype is None:
+            data = np.array(["" if v is None else v for v in values], dtype=np.str_)
+        else:
+            data = np.array([0 if v is None else v for v in values], dtype=dtype)
+        np.save(os.path.join(directory, f"{name}.npy"), data)
+        if nulls.any():
+            np.save(os.path.join(directory, f"{name}_nulls.npy"), nulls)
+
+    # --- read ---
+    @staticmethod
+    def _open(directory, name):
+        path = os.path.join(directory, f"{name}.npy")
+        return np.load(path, mmap_mode="r") if os.path.exists(path) else None
+
+    def _load_column(self, directory, name):
+        return MappedColumn(self._open(directory, name), self._open(directory, f"{name}_nulls"))
+
+    def _load(self, target: str, manifest: dict) -> PropertyGraph:
+        graph = PropertyGraph()
+        for code, meta in enumerate(manifest["vertices"]):
+            table = graph.add_vertex_label(meta["label"], meta["primary"], meta["properties"])
+            table.size = meta["size"]
+            for i, name in enumerate(table.properties):
+                table.columns[name] = self._load_column(target, f"v{code}_p{i}")
+            if table.primary in table.columns:
+                table.key_index = {key: row for row, key in enumerate(table.columns[table.primary])}
+        for e, meta in enumerate(manifest["edges"]):
+            table = graph.add_edge_label(meta["label"], meta["properties"])
+            table.size = meta["size"]
+            prefix = f"e{e}"
+            for i, name in enumerate(table.properties):
+                table.columns[name] = self._load_column(target, f"{prefix}_p{i}")
+            for field in ("src_label", "src_row", "dst_label", "dst_row"):
+                setattr(table, field, MappedColumn(self._open(target, f"{prefix}_{field}")))
+            for direction, attr in (("out", "out_csr"), ("in", "in_csr")):
+                getattr(table, attr).update({
+                    code: (self._open(target, f"{prefix}_{direction}{code}_offsets"),
+                           self._open(target, f"{prefix}_{direction}{code}_ids"))
+                    for code in meta["csr"].get(direction, [])
+                })
+        return graph
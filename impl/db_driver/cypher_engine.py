@@ -0,0 +1,1485 @@
+import re
+import math
+import time
+import threading
+from itertools import chain
+from collections import OrderedDict
+
+class CypherError(Exception):
+    """Raised for syntax outside the supported Cypher subset or for runtime type errors."""
+    pass
+
+
+class CypherTimeout(CypherError, TimeoutError):
+    """The query ran past its deadline (reported like a TuGraph transaction timeout)."""
+    pass
+
+
+class _Deadline:
+    """Wall-clock budget of one query, checked every few hundred steps of the search."""
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.expires = time.monotonic() + seconds
+        self.steps = 0
+
+    def tick(self):
+        self.steps += 1
+        if not self.steps & 255 and time.monotonic() > self.expires:
+            raise CypherTimeout(f"Transaction timed out after {self.seconds}s")
+
+
+# ---------------------------------------------------------------------------
+# Tokenizer
+# ---------------------------------------------------------------------------
+
+_TOKEN_RE = re.compile(r"""
+    (?P<ws>\s+|//[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:[^'\\]|\\.)*'|"(?:[^"\\]|\\.)*")
+  | (?P<quoted>`[^`]*`)
+  | (?P<number>\d+\.\d+(?:[eE][+-]?\d+)?|\d+(?:[eE][+-]?\d+)?)
+  | (?P<ident>[A-Za-z_][A-Za-z0-9_]*)
+  | (?P<op><>|<=|>=|=~|\.\.|!=|[-+*/%^=<>()\[\]{},:.|$;])
+""", re.VERBOSE | re.DOTALL)
+
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "\\": "\\", "'": "'", '"': '"'}
+
+
+class Token:
+    __slots__ = ("kind", "value", "start", "end")
+
+    def __init__(self, kind, value, start, end):
+        self.kind = kind
+        self.value = value
+        self.start = start
+        self.end = end
+
+    def is_kw(self, *words):
+        return self.kind == "ident" and self.value.upper() in words
+
+    def is_op(self, *ops):
+        return self.kind == "op" and self.value in ops
+
+
+def tokenize(text: str) -> list:
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        m = _TOKEN_RE.match(text, pos)
+        if not m:
+            raise CypherError(f"Unexpected character {text[pos]!r} at {pos}")
+        kind = m.lastgroup
+        value = m.group()
+        if kind == "string":
+            value = re.sub(r"\\(.)", lambda e: _ESCAPES.get(e.group(1), e.group(1)), value[1:-1])
+        elif kind == "quoted":
+            kind, value = "ident", value[1:-1]
+        elif kind == "number":
+            value = float(value) if any(c in value for c in ".eE") else int(value)
+        if kind != "ws":
+            tokens.append(Token(kind, value, m.start(), m.end()))
+        pos = m.end()
+    tokens.append(Token("eof", None, len(text), len(text)))
+    return tokens
+
+
+# ---------------------------------------------------------------------------
+# AST
+# ---------------------------------------------------------------------------
+# Expressions are tuples tagged by their first element:
+#   ("lit", v) ("var", name) ("prop", e, key) ("index", e, i) ("slice", e, lo, hi)
+#   ("call", name, distinct, args) ("count_star",) ("bin", op, l, r) ("not", e)
+#   ("neg", e) ("list", items) ("map", pairs) ("is_null", e, negated)
+#   ("case", subject, [(when, then)], default) ("pattern", part)
+#   ("comprehension", var, source, where, projection)
+
+AGGREGATES = {"count", "sum", "avg", "min", "max", "collect"}
+
+
+class NodePattern:
+    def __init__(self, var, labels, props):
+        self.var = var
+        self.labels = labels
+        self.props = props
+
+
+class RelPattern:
+    def __init__(self, var, types, direction, props, min_hops=1, max_hops=1, var_length=False):
+        self.var = var
+        self.types = types
+        self.direction = direction  # "out", "in" or "both", relative to the left node
+        self.props = props
+        self.min_hops = min_hops
+        self.max_hops = max_hops
+        self.var_length = var_length
+
+
+class PatternPart:
+    def __init__(self, path_var, nodes, rels):
+        self.path_var = path_var
+        self.nodes = nodes
+        self.rels = rels
+
+
+class Clause:
+    def __init__(self, kind, **fields):
+        self.kind = kind
+        self.__dict__.update(fields)
+
+
+# ---------------------------------------------------------------------------
+# Parser
+# ---------------------------------------------------------------------------
+
+class Parser:
+    def __init__(self, text: str):
+        self.text = text
+        self.tokens = tokenize(text)
+        self.pos = 0
+        self.anon = 0
+
+    # --- token helpers ---
+    @property
+    def tok(self):
+        return self.tokens[self.pos]
+
+    def peek(self, offset=1):
+        return self.tokens[min(self.pos + offset, len(self.tokens) - 1)]
+
+    def advance(self):
+        tok = self.tokens[self.pos]
+        self.pos += 1
+        return tok
+
+    def accept_kw(self, *words):
+        if self.tok.is_kw(*words):
+            return self.advance()
+        return None
+
+    def accept_op(self, *ops):
+        if self.tok.is_op(*ops):
+            return self.advance()
+        return None
+
+    def expect_kw(self, word):
+        if not self.tok.is_kw(word):
+            raise CypherError(f"Expected {word} at {self.tok.start}, found {self.tok.value!r}")
+        return self.advance()
+
+    def expect_op(self, op):
+        if not self.tok.is_op(op):
+            raise CypherError(f"Expected '{op}' at {self.tok.start}, found {self.tok.value!r}")
+        return self.advance()
+
+    def ident(self):
+        if self.tok.kind != "ident":
+            raise CypherError(f"Expected identifier at {self.tok.start}, found {self.tok.value!r}")
+        return self.advance().value
+
+    def anon_var(self):
+        self.anon += 1
+        return f"  anon_{self.anon}"
+
+    # --- statements ---
+    def parse(self):
+        """Returns a list of (clauses, union_all) branches."""
+        branches = [(self.parse_single(), True)]
+        while self.accept_kw("UNION"):
+            union_all = bool(self.accept_kw("ALL"))
+            branches.append((self.parse_single(), union_all))
+        self.accept_op(";")
+        if self.tok.kind != "eof":
+            raise CypherError(f"Unexpected {self.tok.value!r} at {self.tok.start}")
+        return branches
+
+    def parse_single(self):
+        clauses = []
+        while True:
+            if self.tok.is_kw("OPTIONAL"):
+                self.advance()
+                self.expect_kw("MATCH")
+                clauses.append(self.parse_match(optional=True))
+            elif self.accept_kw("MATCH"):
+                clauses.append(self.parse_match(optional=False))
+            elif self.accept_kw("UNWIND"):
+                expr = self.parse_expr()
+                self.expect_kw("AS")
+                clauses.append(Clause("unwind", expr=expr, var=self.ident()))
+            elif self.accept_kw("WITH"):
+                clauses.append(self.parse_projection("with"))
+            elif self.accept_kw("RETURN"):
+                clauses.append(self.parse_projection("return"))
+                break
+            elif self.tok.is_kw("CREATE", "MERGE", "DELETE", "DETACH", "SET", "REMOVE", "CALL", "FOREACH", "LOAD"):
+                raise CypherError(f"Unsupported clause {self.tok.value.upper()} (read-only subset)")
+            else:
+                raise CypherError(f"Unexpected {self.tok.value!r} at {self.tok.start}")
+        if not clauses or clauses[-1].kind != "return":
+            raise CypherError("Query must end with RETURN")
+        return clauses
+
+    def parse_match(self, optional):
+        patterns = [self.parse_pattern_part()]
+        while self.accept_op(","):
+            patterns.append(self.parse_pattern_part())
+        where = self.parse_expr() if self.accept_kw("WHERE") else None
+        return Clause("match", patterns=patterns, where=where, optional=optional)
+
+    def parse_projection(self, kind):
+        distinct = bool(self.accept_kw("DISTINCT"))
+        star = False
+        items = []
+        if self.accept_op("*"):
+            star = True
+            if not self.accept_op(","):
+                return self._projection_tail(kind, distinct, star, items)
+        while True:
+            start = self.tok.start
+            expr = self.parse_expr()
+            text = self.text[start:self.tokens[self.pos - 1].end]
+            alias = self.ident() if self.accept_kw("AS") else None
+            if alias is None:
+                alias = expr[1] if expr[0] == "var" else text
+            items.append((expr, alias, text))
+            if not self.accept_op(","):
+                break
+        return self._projection_tail(kind, distinct, star, items)
+
+    def _projection_tail(self, kind, distinct, star, items):
+        order = []
+        if self.tok.is_kw("ORDER"):
+            self.advance()
+            self.expect_kw("BY")
+            while True:
+                start = self.tok.start
+                expr = self.parse_expr()
+                text = self.text[start:self.tokens[self.pos - 1].end]
+                descending = False
+                if self.accept_kw("DESC", "DESCENDING"):
+                    descending = True
+                else:
+                    self.accept_kw("ASC", "ASCENDING")
+                order.append((expr, descending, text))
+                if not self.accept_op(","):
+                    break
+        skip = self.parse_expr() if self.accept_kw("SKIP") else None
+        limit = self.parse_expr() if self.accept_kw("LIMIT") else None
+        where = None
+        if kind == "with" and self.accept_kw("WHERE"):
+            where = self.parse_expr()
+        return Clause(kind, items=items, distinct=distinct, star=star, order=order,
+                      skip=skip, limit=limit, where=where)
+
+    # --- patterns ---
+    def parse_pattern_part(self):
+        path_var = None
+        if self.tok.kind == "ident" and self.peek().is_op("="):
+            path_var = self.advance().value
+            self.advance()
+        if self.tok.is_kw("SHORTESTPATH", "ALLSHORTESTPATHS"):
+            raise CypherError("shortestPath is not supported")
+        nodes = [self.parse_node()]
+        rels = []
+        while self.tok.is_op("-", "<"):
+            rels.append(self.parse_rel())
+            nodes.append(self.parse_node())
+        return PatternPart(path_var, nodes, rels)
+
+    def parse_node(self):
+        self.expect_op("(")
+        var = self.advance().value if self.tok.kind == "ident" else self.anon_var()
+        labels = []
+        while self.accept_op(":"):
+            labels.append(self.ident())
+        props = self.parse_map() if self.tok.is_op("{") else None
+        self.expect_op(")")
+        return NodePattern(var, labels, props)
+
+    def parse_rel(self):
+        left_arrow = bool(self.accept_op("<"))
+        self.expect_op("-")
+        var, types, props = self.anon_var(), [], None
+        min_hops, max_hops, var_length = 1, 1, False
+        if self.accept_op("["):
+            if self.tok.kind == "ident":
+                var = self.advance().value
+            if self.accept_op(":"):
+                types.append(self.ident())
+                while self.accept_op("|"):
+                    self.accept_op(":")
+                    types.append(self.ident())
+            if self.accept_op("*"):
+                var_length = True
+                min_hops, max_hops = 1, None
+                if self.tok.kind == "number":
+                    min_hops = max_hops = self.advance().value
+                if self.accept_op(".."):
+                    max_hops = self.advance().value if self.tok.kind == "number" else None
+                    if min_hops == max_hops and max_hops is None:
+                        min_hops = 1
+                elif min_hops is None:
+                    min_hops = 1
+            if self.tok.is_op("{"):
+                props = self.parse_map()
+            self.expect_op("]")
+        self.expect_op("-")
+        right_arrow = bool(self.accept_op(">"))
+        if left_arrow and right_arrow:
+            raise CypherError("Relationship cannot point both ways")
+        direction = "out" if right_arrow else "in" if left_arrow else "both"
+        return RelPattern(var, types, direction, props, min_hops, max_hops, var_length)
+
+    def parse_map(self):
+        self.expect_op("{")
+        pairs = []
+        if not self.tok.is_op("}"):
+            while True:
+                key = self.advance().value
+                self.expect_op(":")
+                pairs.append((key, self.parse_expr()))
+                if not self.accept_op(","):
+                    break
+        self.expect_op("}")
+        return pairs
+
+    # --- expressions (lowest to highest precedence) ---
+    def parse_expr(self):
+        return self.parse_or()
+
+    def parse_or(self):
+        left = self.parse_xor()
+        while self.accept_kw("OR"):
+            left = ("bin", "OR", left, self.parse_xor())
+        return left
+
+    def parse_xor(self):
+        left = self.parse_and()
+        while self.accept_kw("XOR"):
+            left = ("bin", "XOR", left, self.parse_and())
+        return left
+
+    def parse_and(self):
+        left = self.parse_not()
+        while self.accept_kw("AND"):
+            left = ("bin", "AND", left, self.parse_not())
+        return left
+
+    def parse_not(self):
+        if self.accept_kw("NOT"):
+            return ("not", self.parse_not())
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        left = self.parse_additive()
+        while True:
+            if self.tok.is_op("=", "<>", "!=", "<", ">", "<=", ">=", "=~"):
+                op = self.advance().value
+                left = ("bin", "<>" if op == "!=" else op, left, self.parse_additive())
+            elif self.tok.is_kw("IS"):
+                self.advance()
+                negated = bool(self.accept_kw("NOT"))
+                self.expect_kw("NULL")
+                left = ("is_null", left, negated)
+            elif self.accept_kw("IN"):
+                left = ("bin", "IN", left, self.parse_additive())
+            elif self.tok.is_kw("STARTS", "ENDS"):
+                op = self.advance().value.upper()
+                self.expect_kw("WITH")
+                left = ("bin", op, left, self.parse_additive())
+            elif self.accept_kw("CONTAINS"):
+                left = ("bin", "CONTAINS", left, self.parse_additive())
+            else:
+                return left
+
+    def parse_additive(self):
+        left = self.parse_multiplicative()
+        while self.tok.is_op("+", "-"):
+            op = self.advance().value
+            left = ("bin", op, left, self.parse_multiplicative())
+        return left
+
+    def parse_multiplicative(self):
+        left = self.parse_power()
+        while self.tok.is_op("*", "/", "%"):
+            op = self.advance().value
+            left = ("bin", op, left, self.parse_power())
+        return left
+
+    def parse_power(self):
+        left = self.parse_unary()
+        while self.accept_op("^"):
+            left = ("bin", "^", left, self.parse_unary())
+        return left
+
+    def parse_unary(self):
+        if self.accept_op("-"):
+            return ("neg", self.parse_unary())
+        if self.accept_op("+"):
+            return self.parse_unary()
+        return self.parse_postfix()
+
+    def parse_postfix(self):
+        expr = self.parse_atom()
+        while True:
+            if self.tok.is_op("."):
+                self.advance()
+                expr = ("prop", expr, self.ident())
+            elif self.tok.is_op("["):
+                self.advance()
+                lo = None if self.tok.is_op("..") else self.parse_expr()
+                if self.accept_op(".."):
+                    hi = None if self.tok.is_op("]") else self.parse_expr()
+                    self.expect_op("]")
+                    expr = ("slice", expr, lo, hi)
+                else:
+                    self.expect_op("]")
+                    expr = ("index", expr, lo)
+            elif self.tok.is_op(":") and expr[0] == "var":
+                # label predicate such as n:LABEL
+                self.advance()
+                expr = ("has_label", expr, self.ident())
+            else:
+                return expr
+
+    def parse_atom(self):
+        tok = self.tok
+        if tok.kind in ("number", "string"):
+            self.advance()
+            return ("lit", tok.value)
+        if tok.is_op("$"):
+            raise CypherError("Query parameters are not supported")
+        if tok.is_op("["):
+            return self.parse_list()
+        if tok.is_op("{"):
+            return ("map", self.parse_map())
+        if tok.is_op("("):
+            pattern = self._try_pattern()
+            if pattern is not None:
+                return ("pattern", pattern)
+            self.advance()
+            expr = self.parse_expr()
+            self.expect_op(")")
+            return expr
+        if tok.kind != "ident":
+            raise CypherError(f"Unexpected {tok.value!r} at {tok.start}")
+        word = tok.value.upper()
+        if word in ("TRUE", "FALSE"):
+            self.advance()
+            return ("lit", word == "TRUE")
+        if word == "NULL":
+            self.advance()
+            return ("lit", None)
+        if word == "CASE":
+            return self.parse_case()
+        if word in ("EXISTS", "EXIST") and self.peek().is_op("("):
+            self.advance()
+            self.advance()
+            inner = self._try_pattern()
+            expr = ("pattern", inner) if inner is not None else ("is_null", self.parse_expr(), True)
+            self.expect_op(")")
+            return expr
+        if self.peek().is_op("("):
+            return self.parse_call()
+        self.advance()
+        return ("var", tok.value)
+
+    def parse_call(self):
+        name = self.advance().value
+        while self.tok.is_op(".") and self.peek().kind == "ident":
+            self.advance()
+            name += "." + self.advance().value
+        self.expect_op("(")
+        lname = name.lower()
+        if lname == "count" and self.tok.is_op("*"):
+            self.advance()
+            self.expect_op(")")
+            return ("count_star",)
+        distinct = bool(self.accept_kw("DISTINCT"))
+        args = []
+        if not self.tok.is_op(")"):
+            while True:
+                args.append(self.parse_expr())
+                if not self.accept_op(","):
+                    break
+        self.expect_op(")")
+        return ("call", lname, distinct, args)
+
+    def parse_list(self):
+        self.expect_op("[")
+        # list comprehension: [x IN list WHERE cond | expr]
+        if self.tok.kind == "ident" and self.peek().is_kw("IN"):
+            var = self.advance().value
+            self.advance()
+            source = self.parse_expr()
+            where = self.parse_expr() if self.accept_kw("WHERE") else None
+            projection = self.parse_expr() if self.accept_op("|") else None
+            self.expect_op("]")
+            return ("comprehension", var, source, where, projection)
+        items = []
+        if not self.tok.is_op("]"):
+            while True:
+                items.append(self.parse_expr())
+                if not self.accept_op(","):
+                    break
+        self.expect_op("]")
+        return ("list", items)
+
+    def parse_case(self):
+        self.expect_kw("CASE")
+        subject = None if self.tok.is_kw("WHEN") else self.parse_expr()
+        branches = []
+        while self.accept_kw("WHEN"):
+            when = self.parse_expr()
+            self.expect_kw("THEN")
+            branches.append((when, self.parse_expr()))
+        default = self.parse_expr() if self.accept_kw("ELSE") else None
+        self.expect_kw("END")
+        return ("case", subject, branches, default)
+
+    def _try_pattern(self):
+        """Parse a relationship pattern used as a predicate; restore position if it is not one."""
+        saved_pos, saved_anon = self.pos, self.anon
+        try:
+            part = self.parse_pattern_part()
+            if part.rels:
+                return part
+        except CypherError:
+            pass
+        self.pos, self.anon = saved_pos, saved_anon
+        return None
+
+
+# ---------------------------------------------------------------------------
+# Runtime values
+# ---------------------------------------------------------------------------
+
+class Node:
+    __slots__ = ("table", "row")
+
+    def __init__(self, table, row):
+        self.table = table
+        self.row = row
+
+    def __eq__(self, other):
+        return isinstance(other, Node) and self.table is other.table and self.row == other.row
+
+    def __hash__(self):
+        return hash((self.table.code, self.row))
+
+    def get(self, key):
+        return self.table.get(self.row, key)
+
+    @property
+    def id(self):
+        return (self.table.code << 32) | self.row
+
+
+class Rel:
+    __slots__ = ("table", "idx", "graph")
+
+    def __init__(self, table, idx, graph):
+        self.table = table
+        self.idx = idx
+        self.graph = graph
+
+    def __eq__(self, other):
+        return isinstance(other, Rel) and self.table is other.table and self.idx == other.idx
+
+    def __hash__(self):
+        return hash((self.table.label, self.idx))
+
+    def get(self, key):
+        return self.table.get(self.idx, key)
+
+    @property
+    def start(self):
+        return Node(self.graph.vertex_by_code[self.table.src_label[self.idx]], self.table.src_row[self.idx])
+
+    @property
+    def end(self):
+        return Node(self.graph.vertex_by_code[self.table.dst_label[self.idx]], self.table.dst_row[self.idx])
+
+    @property
+    def id(self):
+        return (self.table.code << 32) | self.idx
+
+
+class Path:
+    __slots__ = ("nodes", "rels")
+
+    def __init__(self, nodes, rels):
+        self.nodes = nodes
+        self.rels = rels
+
+    def __eq__(self, other):
+        return isinstance(other, Path) and self.nodes == other.nodes and self.rels == other.rels
+
+    def __hash__(self):
+        return hash((tuple(self.nodes), tuple(self.rels)))
+
+
+def to_output(value):
+    """Convert runtime values the way the Neo4j driver's Record.data() does."""
+    if isinstance(value, Node):
+        return value.table.props(value.row)
+    if isinstance(value, Rel):
+        return (value.start.table.props(value.start.row), value.table.label, value.end.table.props(value.end.row))
+    if isinstance(value, Path):
+        out = [to_output(value.nodes[0])]
+        for rel, node in zip(value.rels, value.nodes[1:]):
+            out.append(to_output(rel)[1])
+            out.append(to_output(node))
+        return out
+    if isinstance(value, list):
+        return [to_output(v) for v in value]
+    if isinstance(value, dict):
+        return {k: to_output(v) for k, v in value.items()}
+    return value
+
+
+def _hashable(value):
+    if isinstance(value, list):
+        return ("\0list",) + tuple(_hashable(v) for v in value)
+    if isinstance(value, dict):
+        return ("\0map",) + tuple(sorted((k, _hashable(v)) for k, v in value.items()))
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def _sort_key(value):
+    """Cypher ordering: maps < nodes < rels < lists < paths < strings < booleans < numbers < null."""
+    if value is None:
+        return (9, 0)
+    if isinstance(value, bool):
+        return (6, value)
+    if isinstance(value, (int, float)):
+        return (7, value) if not (isinstance(value, float) and math.isnan(value)) else (8, 0)
+    if isinstance(value, str):
+        return (5, value)
+    if isinstance(value, Node):
+        return (1, value.id)
+    if isinstance(value, Rel):
+        return (2, value.id)
+    if isinstance(value, list):
+        return (3, tuple(_sort_key(v) for v in value))
+    if isinstance(value, Path):
+        return (4, tuple(n.id for n in value.nodes))
+    return (0, str(value))
+
+
+class _Descending:
+    __slots__ = ("key",)
+
+    def __init__(self, key):
+        self.key = key
+
+    def __lt__(self, other):
+        return other.key < self.key
+
+    def __eq__(self, other):
+        return self.key == other.key
+
+
+def _is_number(v):
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def _equals(a, b):
+    if a is None or b is None:
+        return None
+    if _is_number(a) and _is_number(b):
+        return a == b
+    if isinstance(a, list) and isinstance(b, list):
+        if len(a) != len(b):
+            return False
+        result = True
+        for x, y in zip(a, b):
+            eq = _equals(x, y)
+            if eq is False:
+                return False
+            if eq is None:
+                result = None
+        return result
+    if type(a) is not type(b) and not (isinstance(a, str) and isinstance(b, str)):
+        return False
+    return a == b
+
+
+def _compare(op, a, b):
+    if a is None or b is None:
+        return None
+    comparable = (_is_number(a) and _is_number(b)) or (isinstance(a, str) and isinstance(b, str)) \
+        or (isinstance(a, bool) and isinstance(b, bool))
+    if not comparable:
+        return None
+    if op == "<":
+        return a < b
+    if op == ">":
+        return a > b
+    if op == "<=":
+        return a <= b
+    return a >= b
+
+
+def _truth(value):
+    if value is None or isinstance(value, bool):
+        return value
+    raise CypherError(f"Expected a boolean, got {value!r}")
+
+
+def _arith(op, a, b):
+    if a is None or b is None:
+        return None
+    if op == "+":
+        if isinstance(a, list) or isinstance(b, list):
+            return (a if isinstance(a, list) else [a]) + (b if isinstance(b, list) else [b])
+        if isinstance(a, str) or isinstance(b, str):
+            return _to_string(a) + _to_string(b)
+    if not (_is_number(a) and _is_number(b)):
+        raise CypherError(f"Cannot apply {op} to {a!r} and {b!r}")
+    if op == "+":
+        return a + b
+    if op == "-":
+        return a - b
+    if op == "*":
+        return a * b
+    if op == "/":
+        if isinstance(a, int) and isinstance(b, int):
+            if b == 0:
+                raise CypherError("/ by zero")
+            return int(a / b)
+        return a / b if b != 0 else (math.copysign(math.inf, a) if a else math.nan)
+    if op == "%":
+        if isinstance(a, int) and isinstance(b, int):
+            if b == 0:
+                raise CypherError("% by zero")
+            return int(math.fmod(a, b))
+        return math.fmod(a, b)
+    if op == "^":
+        return float(a) ** float(b)
+    raise CypherError(f"Unknown operator {op}")
+
+
+def _to_string(v):
+    if v is None:
+        return None
+    if isinstance(v, bool):
+        return "true" if v else "false"
+    if isinstance(v, float) and v.is_integer():
+        return f"{v:.1f}"
+    return str(v)
+
+
+def _to_int(v):
+    if v is None:
+        return None
+    try:
+        return int(float(v)) if isinstance(v, str) else int(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_float(v):
+    if v is None:
+        return None
+    try:
+        return float(v)
+    except (TypeError, ValueError):
+        return None
+
+
+def _cypher_round(v, precision=0):
+    if v is None:
+        return None
+    factor = 10 ** precision
+    # Half away from zero, as Cypher rounds: round(-2.5) = -3
+    rounded = math.copysign(math.floor(abs(v) * factor + 0.5), v) / factor
+    return float(rounded)
+
+
+def _size(v):
+    return None if v is None else len(v)
+
+
+SCALAR_FUNCTIONS = {
+    "size": _size,
+    "length": lambda v: None if v is None else len(v.rels) if isinstance(v, Path) else len(v),
+    "tolower": lambda v: None if v is None else str(v).lower(),
+    "toupper": lambda v: None if v is None else str(v).upper(),
+    "trim": lambda v: None if v is None else str(v).strip(),
+    "ltrim": lambda v: None if v is None else str(v).lstrip(),
+    "rtrim": lambda v: None if v is None else str(v).rstrip(),
+    "reverse": lambda v: None if v is None else v[::-1],
+    "tostring": _to_string,
+    "tointeger": _to_int,
+    "toint": _to_int,
+    "tofloat": _to_float,
+    "abs": lambda v: None if v is None else abs(v),
+    "ceil": lambda v: None if v is None else float(math.ceil(v)),
+    "floor": lambda v: None if v is None else float(math.floor(v)),
+    "sqrt": lambda v: None if v is None else math.sqrt(v),
+    "exp": lambda v: None if v is None else math.exp(v),
+    "log": lambda v: None if v is None else math.log(v),
+    "log10": lambda v: None if v is None else math.log10(v),
+    "sign": lambda v: None if v is None else (v > 0) - (v < 0),
+    "round": _cypher_round,
+    "substring": lambda s, start, length=None: None if s is None else
+        s[start:] if length is None else s[start:start + length],
+    "left": lambda s, n: None if s is None else s[:n],
+    "right": lambda s, n: None if s is None else s[len(s) - n:] if n else "",
+    "replace": lambda s, a, b: None if s is None else s.replace(a, b),
+    "split": lambda s, sep: None if s is None else s.split(sep),
+    "head": lambda v: v[0] if v else None,
+    "last": lambda v: v[-1] if v else None,
+    "tail": lambda v: None if v is None else v[1:],
+    "range": lambda a, b, step=1: list(range(a, b + (1 if step > 0 else -1), step)),
+    "coalesce": lambda *args: next((a for a in args if a is not None), None),
+    "id": lambda v: None if v is None else v.id,
+    "labels": lambda v: None if v is None else [v.table.label],
+    "type": lambda v: None if v is None else v.table.label,
+    "nodes": lambda v: None if v is None else list(v.nodes),
+    "relationships": lambda v: None if v is None else list(v.rels),
+    "startnode": lambda v: None if v is None else v.start,
+    "endnode": lambda v: None if v is None else v.end,
+    "properties": lambda v: None if v is None else v.table.props(v.row if isinstance(v, Node) else v.idx),
+    "keys": lambda v: None if v is None else list(v.keys()) if isinstance(v, dict)
+        else list(v.table.props(v.row if isinstance(v, Node) else v.idx)),
+    "pi": lambda: math.pi,
+    "e": lambda: math.e,
+}
+
+
+def _aggregate(name, distinct, values):
+    values = [v for v in values if v is not None]
+    if distinct:
+        seen, unique = set(), []
+        for v in values:
+            key = _hashable(v)
+            if key not in seen:
+                seen.add(key)
+                unique.append(v)
+        values = unique
+    if name == "count":
+        return len(values)
+    if name == "collect":
+        return values
+    if name == "sum":
+        return sum(values) if values else 0
+    if name == "avg":
+        return sum(values) / len(values) if values else None
+    if name == "min":
+        return min(values, key=_sort_key) if values else None
+    if name == "max":
+        return max(values, key=_sort_key) if values else None
+    raise CypherError(f"Unknown aggregate {name}")
+
+
+def contains_aggregate(expr) -> bool:
+    if not isinstance(expr, tuple):
+        return False
+    if expr[0] == "count_star" or (expr[0] == "call" and expr[1] in AGGREGATES):
+        return True
+    return any(contains_aggregate(child) for child in _children(expr))
+
+
+def _children(expr):
+    tag = expr[0]
+    if tag in ("prop", "not", "neg", "is_null", "has_label"):
+        return [expr[1]]
+    if tag == "index":
+        return [expr[1], expr[2]]
+    if tag == "slice":
+        return [e for e in expr[1:] if e is not None]
+    if tag == "bin":
+        return [expr[2], expr[3]]
+    if tag == "call":
+        return list(expr[3])
+    if tag == "list":
+        return list(expr[1])
+    if tag == "map":
+        return [v for _, v in expr[1]]
+    if tag == "case":
+        out = [expr[1]] if expr[1] is not None else []
+        for when, then in expr[2]:
+            out.extend([when, then])
+        if expr[3] is not None:
+            out.append(expr[3])
+        return out
+    if tag == "comprehension":
+        return [e for e in expr[2:] if e is not None]
+    return []
+
+
+def referenced_vars(expr, out=None) -> set:
+    out = set() if out is None else out
+    if not isinstance(expr, tuple):
+        return out
+    if expr[0] == "var":
+        out.add(expr[1])
+    elif expr[0] == "pattern":
+        part = expr[1]
+        for node in part.nodes:
+            if not node.var.startswith("  "):
+                out.add(node.var)
+    elif expr[0] == "comprehension":
+        inner = set()
+        for child in _children(expr):
+            referenced_vars(child, inner)
+        inner.discard(expr[1])
+        out |= inner
+        return out
+    for child in _children(expr):
+        referenced_vars(child, out)
+    return out
+
+
+def _conjuncts(expr):
+    if expr is None:
+        return []
+    if expr[0] == "bin" and expr[1] == "AND":
+        return _conjuncts(expr[2]) + _conjuncts(expr[3])
+    return [expr]
+
+
+# ---------------------------------------------------------------------------
+# Executor
+# ---------------------------------------------------------------------------
+
+class CypherEngine:
+    """
+    Executes the read-only Cypher subset used by the corpora against a PropertyGraph:
+    MATCH / OPTIONAL MATCH (incl. variable-length and named paths), WHERE, WITH, UNWIND,
+    RETURN [DISTINCT], aggregates, ORDER BY, SKIP/LIMIT and UNION.
+    Clauses stream rows into each other, so a query is bounded by its timeout and row cap
+    rather than by the size of its intermediate results. The engine holds no per-query
+    state outside a thread-local, so one instance can serve several threads.
+    """
+    # Longest path an unbounded [*] may take; deeper matches raise instead of being dropped
+    MAX_VAR_LENGTH = 15
+
+    def __init__(self, graph):
+        self.graph = graph
+        self._local = threading.local()
+
+    def run(self, cypher: str, timeout: float = None, max_rows: int = None) -> list:
+        """
+        Rows of cypher as plain dicts. timeout (seconds) raises CypherTimeout once exceeded;
+        with max_rows, at most max_rows + 1 rows are produced (the extra one marks truncation).
+        """
+        self._local.deadline = _Deadline(timeout) if timeout else None
+        try:
+            branches = Parser(cypher).parse()
+            # A UNION without ALL needs every branch row to deduplicate, so only cap the others
+            distinct_union = any(not union_all for _, union_all in branches[1:])
+            cap = max_rows + 1 if max_rows and not distinct_union else None
+            columns, rows = self._run_single(branches[0][0], cap)
+            for clauses, union_all in branches[1:]:
+                other_columns, other_rows = self._run_single(clauses, cap)
+                if other_columns != columns:
+                    raise CypherError("All sub queries in a UNION must have the same return column names")
+                rows = rows + other_rows
+                if not union_all:
+                    rows = self._distinct(rows)
+            if max_rows:
+                rows = rows[:max_rows + 1]
+            return [{name: to_output(row[name]) for name in columns} for row in rows]
+        finally:
+            self._local.deadline = None
+
+    def _tick(self):
+        deadline = getattr(self._local, "deadline", None)
+        if deadline is not None:
+            deadline.tick()
+
+    def _distinct(self, rows):
+        seen, out = set(), []
+        for row in rows:
+            key = tuple(_hashable(v) for v in row.values())
+            if key not in seen:
+                seen.add(key)
+                out.append(row)
+        return out
+
+    def _run_single(self, clauses, cap=None):
+        rows = iter([OrderedDict()])
+        for clause in clauses:
+            if clause.kind == "match":
+                rows = self._match(clause, rows)
+            elif clause.kind == "unwind":
+                rows = self._unwind(clause, rows)
+            else:
+                columns, rows = self._project(clause, rows, cap if clause.kind == "return" else None)
+                if clause.kind == "return":
+                    return columns, rows
+                rows = iter(rows)
+        raise CypherError("Query must end with RETURN")
+
+    # --- clauses ---
+    def _unwind(self, clause, rows):
+        for row in rows:
+            values = self.eval(clause.expr, row)
+            if values is None:
+                continue
+            for value in (values if isinstance(values, list) else [values]):
+                self._tick()
+                new = OrderedDict(row)
+                new[clause.var] = value
+                yield new
+
+    def _match(self, clause, rows):
+        pending = [(c, referenced_vars(c)) for c in _conjuncts(clause.where)]
+        new_vars = set()
+        for part in clause.patterns:
+            new_vars.update(n.var for n in part.nodes)
+            new_vars.update(r.var for r in part.rels)
+            if part.path_var:
+                new_vars.add(part.path_var)
+        for row in rows:
+            matched = False
+            for result in self._match_parts(clause.patterns, 0, row, set(), pending):
+                self._tick()
+                if all(_truth(self.eval(c, result)) is True for c, _ in pending):
+                    matched = True
+                    yield result
+            if clause.optional and not matched:
+                new = OrderedDict(row)
+                for var in new_vars:
+                    new.setdefault(var, None)
+                yield new
+
+    def _match_parts(self, parts, i, row, used, pending):
+        if i == len(parts):
+            yield row
+            return
+        for result in self._match_part(parts[i], row, used):
+            # Apply WHERE conjuncts as soon as every variable they need is bound
+            bound = set(result)
+            if all(_truth(self.eval(c, result)) is True for c, vars_ in pending
+                   if vars_ <= bound and i < len(parts) - 1):
+                yield from self._match_parts(parts, i + 1, result, used, pending)
+
+    def _match_part(self, part, row, used):
+        nodes, rels = part.nodes, part.rels
+        start = self._choose_start(part, row)
+        for node in self._node_candidates(nodes[start], row):
+            bound = OrderedDict(row)
+            bound[nodes[start].var] = node
+            path_nodes = [None] * len(nodes)
+            path_rels = [None] * len(rels)
+            path_nodes[start] = node
+            yield from self._extend(part, start, start, bound, used, path_nodes, path_rels)
+
+    def _extend(self, part, left, right, row, used, path_nodes, path_rels):
+        nodes, rels = part.nodes, part.rels
+        if right < len(nodes) - 1:
+            rel_pat, target = rels[right], nodes[right + 1]
+            from_node, direction, step = path_nodes[right], rel_pat.direction, right
+            new_left, new_right = left, right + 1
+            target_index = right + 1
+        elif left > 0:
+            rel_pat, target = rels[left - 1], nodes[left - 1]
+            flipped = {"out": "in", "in": "out", "both": "both"}
+            from_node, direction, step = path_nodes[left], flipped[rel_pat.direction], left - 1
+            new_left, new_right = left - 1, right
+            target_index = left - 1
+        else:
+            if part.path_var:
+                row = OrderedDict(row)
+                hops_nodes, hops_rels = [path_nodes[0]], []
+                for i, rel_value in enumerate(path_rels):
+                    if isinstance(rel_value, list):
+                        node = path_nodes[i]
+                        for rel in rel_value:
+                            node = rel.end if rel.start == node else rel.start
+                            hops_rels.append(rel)
+                            hops_nodes.append(node)
+                    else:
+                        hops_rels.append(rel_value)
+                        hops_nodes.append(path_nodes[i + 1])
+                row[part.path_var] = Path(hops_nodes, hops_rels)
+            yield row
+            return
+
+        for rel_value, other in self._expand(from_node, rel_pat, direction, row, used):
+            if not self._node_matches(target, other, row):
+                continue
+            identities = rel_value if isinstance(rel_value, list) else [rel_value]
+            if any(r in used for r in identities):
+                continue
+            if not rel_pat.var_length and rel_pat.var in row and row[rel_pat.var] != rel_value:
+                continue
+            new_row = OrderedDict(row)
+            new_row[target.var] = other
+            new_row[rel_pat.var] = rel_value
+            for r in identities:
+                used.add(r)
+            path_nodes[target_index] = other
+            path_rels[step] = rel_value if target_index > step else list(reversed(rel_value)) \
+                if isinstance(rel_value, list) else rel_value
+            try:
+                yield from self._extend(part, new_left, new_right, new_row, used, path_nodes, path_rels)
+            finally:
+                for r in identities:
+                    used.discard(r)
+                path_nodes[target_index] = None
+
+    def _choose_start(self, part, row):
+        best, best_score = 0, None
+        for i, node in enumerate(part.nodes):
+            if node.var in row:
+                score = 0
+            elif node.props:
+                score = 1
+            elif node.labels:
+                table = self.graph.vertices.get(node.labels[0])
+                score = 2 + (table.size if table else 0)
+            else:
+                score = 10 ** 12
+            if best_score is None or score < best_score:
+                best, best_score = i, score
+        return best
+
+    def _node_candidates(self, pattern, row):
+        if pattern.var in row:
+            value = row[pattern.var]
+            if isinstance(value, Node) and self._node_matches(pattern, value, row):
+                yield value
+            return
+        if pattern.labels:
+            if len(set(pattern.labels)) > 1:
+                return
+            table = self.graph.vertices.get(pattern.labels[0])
+            tables = [table] if table else []
+        else:
+            tables = list(self.graph.vertices.values())
+        for table in tables:
+            rows = None
+            if pattern.props:
+                key, expr = pattern.props[0]
+                rows = table.lookup(key, self.eval(expr, row))
+            for r in (rows if rows is not None else range(table.size)):
+                self._tick()
+                node = Node(table, r)
+                if self._props_match(pattern.props, node, row):
+                    yield node
+
+    def _node_matches(self, pattern, node, row):
+        if not isinstance(node, Node):
+            return False
+        if pattern.var in row and row[pattern.var] != node:
+            return False
+        if pattern.labels and any(label != node.table.label for label in pattern.labels):
+            return False
+        return self._props_match(pattern.props, node, row)
+
+    def _props_match(self, props, entity, row):
+        if not props:
+            return True
+        return all(_equals(entity.get(key), self.eval(expr, row)) is True for key, expr in props)
+
+    def _edge_tables(self, rel_pat):
+        if rel_pat.types:
+            return [self.graph.edges[t] for t in rel_pat.types if t in self.graph.edges]
+        return list(self.graph.edges.values())
+
+    def _single_hops(self, node, rel_pat, direction):
+        for table in self._edge_tables(rel_pat):
+            if direction in ("out", "both"):
+                for idx in table.adjacent(node.table.code, node.row, True):
+                    rel = Rel(table, idx, self.graph)
+                    yield rel, rel.end
+            if direction in ("in", "both"):
+                for idx in table.adjacent(node.table.code, node.row, False):
+                    rel = Rel(table, idx, self.graph)
+                    if direction == "both" and table.src_label[idx] == table.dst_label[idx] \
+                            and table.src_row[idx] == table.dst_row[idx]:
+                        continue  # self-loop already produced by the outgoing pass
+                    yield rel, rel.start
+
+    def _expand(self, node, rel_pat, direction, row, used):
+        if not rel_pat.var_length:
+            for rel, other in self._single_hops(node, rel_pat, direction):
+                if self._props_match(rel_pat.props, rel, row):
+                    yield rel, other
+            return
+
+        unbounded = rel_pat.max_hops is None
+        max_hops = self.MAX_VAR_LENGTH if unbounded else rel_pat.max_hops
+        if rel_pat.min_hops == 0:
+            yield [], node
+        stack = [(node, [])]
+        while stack:
+            current, trail = stack.pop()
+            at_cap = len(trail) >= max_hops
+            if at_cap and not unbounded:
+                continue
+            for rel, other in self._single_hops(current, rel_pat, direction):
+                self._tick()
+                if rel in trail or rel in used or not self._props_match(rel_pat.props, rel, row):
+                    continue
+                if at_cap:
+                    raise CypherError(f"Variable-length relationship exceeds {self.MAX_VAR_LENGTH} hops; "
+                                      f"give the pattern an upper bound")
+                new_trail = trail + [rel]
+                if len(new_trail) >= rel_pat.min_hops:
+                    yield new_trail, other
+                stack.append((other, new_trail))
+
+    # --- projection ---
+    def _project(self, clause, rows, cap=None):
+        """Projects rows (an iterator); cap bounds the output rows when no ORDER BY needs them all."""
+        rows = iter(rows)
+        items = list(clause.items)
+        if clause.star:
+            first = next(rows, None)
+            star_items = [(("var", name), name, name) for name in (first.keys() if first is not None else [])
+                          if not name.startswith("  ")]
+            items = star_items + items
+            rows = chain([first], rows) if first is not None else iter(())
+        columns = [alias for _, alias, _ in items]
+        aggregating = any(contains_aggregate(expr) for expr, _, _ in items)
+
+        projected = []  # (output row, source rows)
+        if aggregating:
+            groups = OrderedDict()
+            keys = [i for i, (expr, _, _) in enumerate(items) if not contains_aggregate(expr)]
+            for row in rows:
+                self._tick()
+                values = [self.eval(items[i][0], row) for i in keys]
+                group_key = tuple(_hashable(v) for v in values)
+                if group_key not in groups:
+                    groups[group_key] = (values, [])
+                groups[group_key][1].append(row)
+            if not groups and not keys:
+                groups[()] = ([], [])
+            for values, group_rows in groups.values():
+                out = OrderedDict()
+                key_values = dict(zip(keys, values))
+                scope = group_rows[0] if group_rows else OrderedDict()
+                for i, (expr, alias, _) in enumerate(items):
+                    out[alias] = key_values[i] if i in key_values else self.eval(expr, scope, group_rows)
+                projected.append((out, group_rows))
+        else:
+            # Without ORDER BY the first rows are final: stop pulling input at LIMIT or the row cap
+            stop = None
+            if not clause.order:
+                wanted = [n for n in (self._count(clause.limit), cap) if n is not None]
+                if wanted:
+                    stop = (self._count(clause.skip) or 0) + min(wanted)
+            seen = set() if clause.distinct else None
+            for row in rows:
+                if stop is not None and len(projected) >= stop:
+                    break
+                self._tick()
+                out = OrderedDict()
+                for expr, alias, _ in items:
+                    out[alias] = self.eval(expr, row)
+                if seen is not None:
+                    key = tuple(_hashable(v) for v in out.values())
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                projected.append((out, [row]))
+
+        if clause.distinct and aggregating:
+            seen, unique = set(), []
+            for out, sources in projected:
+                key = tuple(_hashable(v) for v in out.values())
+                if key not in seen:
+                    seen.add(key)
+                    unique.append((out, sources))
+            projected = unique
+
+        if clause.order:
+            text_to_alias = {text: alias for _, alias, text in items}
+
+            def sort_key(entry):
+                out, sources = entry
+                keys = []
+                for expr, descending, text in clause.order:
+                    if text in text_to_alias:
+                        value = out[text_to_alias[text]]
+                    else:
+                        scope = OrderedDict(sources[0]) if sources else OrderedDict()
+                        if clause.distinct or aggregating:
+                            scope = OrderedDict()
+                        scope.update(out)
+                        value = self.eval(expr, scope, sources if aggregating else None)
+                    key = _sort_key(value)
+                    keys.append(_Descending(key) if descending else key)
+                return keys
+            projected.sort(key=sort_key)
+
+        skip = self._count(clause.skip)
+        limit = self._count(clause.limit)
+        if skip:
+            projected = projected[skip:]
+        if limit is not None:
+            projected = projected[:limit]
+
+        result = [out for out, _ in projected]
+        if clause.kind == "with" and clause.where is not None:
+            result = [row for row in result if _truth(self.eval(clause.where, row)) is True]
+        return columns, result
+
+    def _count(self, expr):
+        if expr is None:
+            return None
+        value = self.eval(expr, OrderedDict())
+        if not isinstance(value, int) or value < 0:
+            raise CypherError("SKIP/LIMIT must be a non-negative integer")
+        return value
+
+    # --- expressions ---
+    def eval(self, expr, row, group=None):
+        tag = expr[0]
+        if tag == "lit":
+            return expr[1]
+        if tag == "var":
+            if expr[1] not in row:
+                raise CypherError(f"Variable `{expr[1]}` not defined")
+            return row[expr[1]]
+        if tag == "prop":
+            target = self.eval(expr[1], row, group)
+            if target is None:
+                return None
+            if isinstance(target, dict):
+                return target.get(expr[2])
+            if isinstance(target, (Node, Rel)):
+                return target.get(expr[2])
+            raise CypherError(f"Cannot read property {expr[2]} of {target!r}")
+        if tag == "bin":
+            return self._eval_binary(expr, row, group)
+        if tag == "not":
+            value = _truth(self.eval(expr[1], row, group))
+            return None if value is None else not value
+        if tag == "neg":
+            value = self.eval(expr[1], row, group)
+            return None if value is None else -value
+        if tag == "is_null":
+            value = self.eval(expr[1], row, group)
+            return (value is not None) if expr[2] else (value is None)
+        if tag == "has_label":
+            value = self.eval(expr[1], row, group)
+            return None if value is None else value.table.label == expr[2]
+        if tag == "call":
+            return self._eval_call(expr, row, group)
+        if tag == "count_star":
+            if group is None:
+                raise CypherError("count(*) used outside of an aggregation")
+            return len(group)
+        if tag == "list":
+            return [self.eval(e, row, group) for e in expr[1]]
+        if tag == "map":
+            return {k: self.eval(v, row, group) for k, v in expr[1]}
+        if tag == "index":
+            target = self.eval(expr[1], row, group)
+            index = self.eval(expr[2], row, group)
+            if target is None or index is None:
+                return None
+            if isinstance(target, dict):
+                return target.get(index)
+            if isinstance(target, (Node, Rel)):
+                return target.get(index)
+            return target[index] if -len(target) <= index < len(target) else None
+        if tag == "slice":
+            target = self.eval(expr[1], row, group)
+            lo = self.eval(expr[2], row, group) if expr[2] is not None else None
+            hi = self.eval(expr[3], row, group) if expr[3] is not None else None
+            return None if target is None else target[lo:hi]
+        if tag == "case":
+            return self._eval_case(expr, row, group)
+        if tag == "pattern":
+            part = expr[1]
+            return any(True for _ in self._match_part(part, row, set()))
+        if tag == "comprehension":
+            _, var, source, where, projection = expr
+            values = self.eval(source, row, group)
+            if values is None:
+                return None
+            out = []
+            for value in values:
+                scope = OrderedDict(row)
+                scope[var] = value
+                if where is not None and _truth(self.eval(where, scope)) is not True:
+                    continue
+                out.append(self.eval(projection, scope) if projection is not None else value)
+            return out
+        raise CypherError(f"Unsupported expression {tag}")
+
+    def _eval_binary(self, expr, row, group):
+        _, op, left, right = expr
+        if op in ("AND", "OR", "XOR"):
+            a = _truth(self.eval(left, row, group))
+            if op == "AND" and a is False:
+                return False
+            if op == "OR" and a is True:
+                return True
+            b = _truth(self.eval(right, row, group))
+            if op == "AND":
+                return False if b is False else (None if a is None or b is None else True)
+            if op == "OR":
+                return True if b is True else (None if a is None or b is None else False)
+            return None if a is None or b is None else a != b
+        a = self.eval(left, row, group)
+        b = self.eval(right, row, group)
+        if op == "=":
+            return _equals(a, b)
+        if op == "<>":
+            eq = _equals(a, b)
+            return None if eq is None else not eq
+        if op in ("<", ">", "<=", ">="):
+            return _compare(op, a, b)
+        if op == "IN":
+            if b is None:
+                return None
+            if not isinstance(b, list):
+                raise CypherError("IN expects a list")
+            found_null = False
+            for item in b:
+                eq = _equals(a, item)
+                if eq is True:
+                    return True
+                if eq is None:
+                    found_null = True
+            return None if found_null or a is None else False
+        if op in ("STARTS", "ENDS", "CONTAINS", "=~"):
+            if not isinstance(a, str) or not isinstance(b, str):
+                return None
+            if op == "STARTS":
+                return a.startswith(b)
+            if op == "ENDS":
+                return a.endswith(b)
+            if op == "CONTAINS":
+                return b in a
+            return re.fullmatch(b, a) is not None
+        return _arith(op, a, b)
+
+    def _eval_call(self, expr, row, group):
+        _, name, distinct, args = expr
+        if name in AGGREGATES:
+            if group is None:
+                raise CypherError(f"Aggregate {name}() used outside of an aggregation")
+            values = [self.eval(args[0], r) for r in group] if args else []
+            return _aggregate(name, distinct, values)
+        func = SCALAR_FUNCTIONS.get(name)
+        if func is None:
+            raise CypherError(f"Unknown function '{name}'")
+        values = [self.eval(a, row, group) for a in args]
+        try:
+            return func(*values)
+        except (TypeError, AttributeError, ValueError) as e:
+            raise CypherError(f"Invalid arguments for {name}(): {e}")
+
+    def _eval_case(self, expr, row, group):
+        _, subject, branches, default = expr
+        if subject is not None:
+            value = self.eval(subject, row, group)
+            for when, then in branches:
+                if _equals(value, self.eval(when, row, group)) is True:
+                    return self.eval(then, row, group)
+        else:
+            for when, then in branches:
+                if _truth(self.eval(when, row, group)) is True:
+                    return self.eval(then, row, group)
+        return self.eval(default, row, group) if default is not None else None
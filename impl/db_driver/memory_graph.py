@@ -0,0 +1,218 @@
+import os
+import csv
+import json
+from collections import defaultdict
+
+def _converter(type_name: str):
+    """CSV cell -> Python value for a TuGraph property type; empty cells become None."""
+    type_name = (type_name or "STRING").upper()
+    if type_name.startswith("INT"):
+        cast = int
+    elif type_name in ("DOUBLE", "FLOAT"):
+        cast = float
+    elif type_name == "BOOL":
+        cast = lambda v: v.strip().lower() in ("true", "1", "t", "yes")
+    else:
+        cast = str
+
+    def convert(cell):
+        if cell is None or cell == "":
+            return None
+        try:
+            return cast(cell)
+        except ValueError:
+            return None
+    return convert
+
+
+class VertexTable:
+    """Columnar storage of one vertex label: one list per property plus a primary-key index."""
+    def __init__(self, label: str, code: int, primary: str, properties: list):
+        self.label = label
+        self.code = code
+        self.primary = primary
+        self.properties = [p["name"] for p in properties]
+        self.types = {p["name"]: p.get("type", "STRING") for p in properties}
+        self.columns = {name: [] for name in self.properties}
+        self.key_index = {}
+        self._indexes = {}
+        self.size = 0
+
+    def append(self, values: dict):
+        row = self.size
+        for name in self.properties:
+            self.columns[name].append(values.get(name))
+        if self.primary:
+            self.key_index[values.get(self.primary)] = row
+        self.size += 1
+        return row
+
+    def get(self, row: int, name: str):
+        column = self.columns.get(name)
+        return column[row] if column is not None else None
+
+    def props(self, row: int) -> dict:
+        return {name: self.columns[name][row] for name in self.properties if self.columns[name][row] is not None}
+
+    def lookup(self, name: str, value) -> list:
+        """Rows whose property equals value, via the primary-key index or a lazily built hash index."""
+        if name == self.primary:
+            row = self.key_index.get(value)
+            return [] if row is None else [row]
+        if name not in self.columns:
+            return []
+        if name not in self._indexes:
+            index = defaultdict(list)
+            for row, cell in enumerate(self.columns[name]):
+                if cell is not None:
+                    index[cell].append(row)
+            self._indexes[name] = index
+        return self._indexes[name].get(value, [])
+
+
+class EdgeTable:
+    """
+    Columnar storage of one edge label (possibly spanning several endpoint label pairs)
+    with CSR adjacency per endpoint vertex label in both directions.
+    """
+    def __init__(self, label: str, code: int, properties: list):
+        self.label = label
+        self.code = code
+        self.properties = [p["name"] for p in properties]
+        self.types = {p["name"]: p.get("type", "STRING") for p in properties}
+        self.columns = {name: [] for name in self.properties}
+        self.src_label = []
+        self.src_row = []
+        self.dst_label = []
+        self.dst_row = []
+        self.size = 0
+        # vertex label code -> (offsets, edge ids), offsets indexed by vertex row
+        self.out_csr = {}
+        self.in_csr = {}
+
+    def append(self, src_code, src_row, dst_code, dst_row, values: dict):
+        self.src_label.append(src_code)
+        self.src_row.append(src_row)
+        self.dst_label.append(dst_code)
+        self.dst_row.append(dst_row)
+        for name in self.properties:
+            self.columns[name].append(values.get(name))
+        self.size += 1
+
+    def get(self, idx: int, name: str):
+        column = self.columns.get(name)
+        return column[idx] if column is not None else None
+
+    def props(self, idx: int) -> dict:
+        return {name: self.columns[name][idx] for name in self.properties if self.columns[name][idx] is not None}
+
+    def build_adjacency(self, vertex_sizes: dict):
+        self.out_csr = self._csr(self.src_label, self.src_row, vertex_sizes)
+        self.in_csr = self._csr(self.dst_label, self.dst_row, vertex_sizes)
+
+    def _csr(self, codes, rows, vertex_sizes):
+        buckets = defaultdict(lambda: defaultdict(list))
+        for idx in range(self.size):
+            buckets[codes[idx]][rows[idx]].append(idx)
+        csr = {}
+        for code, by_row in buckets.items():
+            offsets = [0] * (vertex_sizes[code] + 1)
+            edge_ids = []
+            for row in range(vertex_sizes[code]):
+                edge_ids.extend(by_row.get(row, ()))
+                offsets[row + 1] = len(edge_ids)
+            csr[code] = (offsets, edge_ids)
+        return csr
+
+    def adjacent(self, code: int, row: int, outgoing: bool):
+        """Edge ids leaving (outgoing) or entering the given vertex."""
+        entry = (self.out_csr if outgoing else self.in_csr).get(code)
+        if entry is None:
+            return ()
+        offsets, edge_ids = entry
+        ids = edge_ids[offsets[row]:offsets[row + 1]]
+        # Memory-mapped CSR arrays (see columnar_store) yield numpy slices
+        return ids.tolist() if hasattr(ids, "tolist") else ids
+
+
+class PropertyGraph:
+    """In-memory property graph built from a TuGraph import config and its CSV files."""
+    def __init__(self):
+        self.vertices = {}
+        self.vertex_by_code = []
+        self.edges = {}
+
+    def add_vertex_label(self, label, primary, properties):
+        table = VertexTable(label, len(self.vertex_by_code), primary, properties)
+        self.vertices[label] = table
+        self.vertex_by_code.append(table)
+        return table
+
+    def add_edge_label(self, label, properties):
+        table = EdgeTable(label, len(self.edges), properties)
+        self.edges[label] = table
+        return table
+
+    def finalize(self):
+        sizes = {table.code: table.size for table in self.vertex_by_code}
+        for table in self.edges.values():
+            table.build_adjacency(sizes)
+
+    @classmethod
+    def from_import_config(cls, config_path: str, data_dir: str = None):
+        """
+        Load every file listed in the config's `files` section.
+        Paths are resolved by file name inside data_dir (default: the config's directory),
+        since import configs usually carry server-side absolute paths. Edge rows whose
+        endpoints do not exist in the declared SRC_ID/DST_ID labels are skipped, matching
+        how one CSV is listed once per endpoint label pair.
+        """
+        with open(config_path, "r", encoding="utf-8") as f:
+            config = json.load(f)
+        data_dir = data_dir or os.path.dirname(os.path.abspath(config_path))
+
+        graph = cls()
+        for item in config["schema"]:
+            if item["type"] == "VERTEX":
+                graph.add_vertex_label(item["label"], item.get("primary"), item.get("properties", []))
+            elif item["type"] == "EDGE":
+                graph.add_edge_label(item["label"], item.get("properties", []))
+
+        vertex_files = [f for f in config["files"] if f["label"] in graph.vertices]
+        edge_files = [f for f in config["files"] if f["label"] in graph.edges]
+        for spec in vertex_files:
+            table = graph.vertices[spec["label"]]
+            converters = {name: _converter(table.types.get(name)) for name in spec["columns"]}
+            for cells in _read_rows(data_dir, spec):
+                table.append({name: converters[name](cell) for name, cell in zip(spec["columns"], cells)})
+
+        for spec in edge_files:
+            table = graph.edges[spec["label"]]
+            src = graph.vertices.get(spec.get("SRC_ID"))
+            dst = graph.vertices.get(spec.get("DST_ID"))
+            if src is None or dst is None:
+                continue
+            columns = spec["columns"]
+            converters = {name: _converter(table.types.get(name)) for name in columns}
+            for cells in _read_rows(data_dir, spec):
+                values = dict(zip(columns, cells))
+                src_row = src.key_index.get(_converter(src.types.get(src.primary))(values.get("SRC_ID")))
+                dst_row = dst.key_index.get(_converter(dst.types.get(dst.primary))(values.get("DST_ID")))
+                if src_row is None or dst_row is None:
+                    continue
+                props = {name: converters[name](values.get(name)) for name in table.properties}
+                table.append(src.code, src_row, dst.code, dst_row, props)
+
+        graph.finalize()
+        return graph
+
+
+def _read_rows(data_dir: str, spec: dict):
+    path = os.path.join(data_dir, os.path.basename(spec["path"]))
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        for _ in range(spec.get("header", 0)):
+            next(reader, None)
+        for cells in reader:
+            if cells:
+                yield cells
@@ -0,0 +1,76 @@
+from concurrent.futures import ThreadPoolExecutor
+from driver.evaluation import DatabaseDriver
+from impl.db_driver.memory_graph import PropertyGraph
+from impl.db_driver.columnar_store import ColumnarGraphStore
+from impl.db_driver.cypher_engine import CypherEngine, CypherTimeout
+
+class InMemoryGraphAdapter(DatabaseDriver):
+    """
+    Embedded graph backend for offline EA.
+    Loads the CSV files listed in a TuGraph import config into memory and answers
+    the read-only Cypher subset used by the corpora, so evaluation needs no server.
+    One config describes one graph, so db_name is accepted but ignored.
+    """
+    def __init__(self, import_config, data_dir=None, max_rows=None, cache_dir=None,
+                 query_timeout=None, pool_size=4):
+        self.import_config = import_config
+        self.data_dir = data_dir
+        # When set, the graph is served from a memory-mapped columnar cache instead of parsing CSVs
+        self.cache_dir = cache_dir
+        # Results longer than this are truncated (and flagged), like TuGraphAdapter
+        self.max_rows = max_rows
+        # Seconds a single query may run before it is abandoned as timed out
+        self.query_timeout = query_timeout
+        self.pool_size = pool_size
+        self.graph = None
+        self.engine = None
+        self._executor = None
+
+    def connect(self):
+        try:
+            if self.cache_dir:
+                self.graph = ColumnarGraphStore(self.cache_dir).load(self.import_config, self.data_dir)
+            else:
+                self.graph = PropertyGraph.from_import_config(self.import_config, self.data_dir)
+            self.engine = CypherEngine(self.graph)
+            self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="memgraph")
+            n_vertices = sum(t.size for t in self.graph.vertices.values())
+            n_edges = sum(t.size for t in self.graph.edges.values())
+            print(f"Loaded in-memory graph from {self.import_config} ({n_vertices} vertices, {n_edges} edges)")
+        except Exception as e:
+            print(f"Failed to load in-memory graph: {e}")
+            self.engine = None
+
+    def _execute(self, cypher: str, consume=list) -> dict:
+        try:
+            # The engine stops at max_rows + 1 rows, enough to tell that the result was cut
+            rows = self.engine.run(cypher, timeout=self.query_timeout, max_rows=self.max_rows)
+        except Exception as e:
+            return {"result": None, "error": str(e), "timed_out": isinstance(e, CypherTimeout), "truncated": False}
+        truncated = bool(self.max_rows) and len(rows) > self.max_rows
+        if truncated:
+            rows = rows[:self.max_rows]
+        return {"result": consume(iter(rows)), "error": None, "timed_out": False, "truncated": truncated}
+
+    def query(self, cypher: str, db_name: str = "default") -> list:
+        if not self.engine:
+            return None
+        outcome = self._execute(cypher)
+        return outcome["result"] if outcome["error"] is None else None
+
+    def query_many(self, queries: list, consume=None) -> list:
+        """
+        Runs (cypher, db_name) pairs on the worker pool; results come back in input order
+        and errors carry the engine's message.
+        """
+        if not self.engine:
+            return [{"result": None, "error": "not connected"} for _ in queries]
+        consume = consume or list
+        return list(self._executor.map(lambda q: self._execute(q[0], consume), queries))
+
+    def close(self):
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.graph = None
+        self.engine = None
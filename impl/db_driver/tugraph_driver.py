@@ -1,40 +1,143 @@
 import logging
-from neo4j import GraphDatabase
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from neo4j import GraphDatabase, Query
 from driver.evaluation import DatabaseDriver
 
+def _is_timeout(error: Exception) -> bool:
+    """Transaction timeouts surface as server errors whose code/message mention the timeout."""
+    text = f"{type(error).__name__} {getattr(error, 'code', '')} {error}".lower()
+    return "timeout" in text or "timed out" in text or "timedout" in text
+
+class _RowCap:
+    """Yields at most `limit` records and remembers whether more were available."""
+    def __init__(self, records, limit):
+        self.records = records
+        self.limit = limit
+        self.truncated = False
+
+    def __iter__(self):
+        for n, record in enumerate(self.records):
+            if n >= self.limit:
+                self.truncated = True
+                return
+            yield record
+
 class TuGraphAdapter(DatabaseDriver):
     """
     TuGraph Database Adapter
+    Queries run on a bounded pool of worker threads; each thread keeps one
+    reusable session per graph, so query_many overlaps round trips without
+    opening a new session for every Cypher string.
     """
-    def __init__(self, uri, user, password):
+    def __init__(self, uri, user, password, pool_size=8, query_timeout=None, max_rows=None):
         self.uri = uri
         self.auth = (user, password)
+        self.pool_size = pool_size
+        # Seconds; sent as the transaction timeout so the server aborts runaway queries
+        self.query_timeout = query_timeout
+        # Results longer than this are truncated (and flagged) instead of pulled into Python
+        self.max_rows = max_rows
         self.driver = None
+        self._executor = None
+        self._local = threading.local()
+        self._sessions = []
+        self._lock = threading.Lock()
 
     def connect(self):
         try:
             # The default TuGraph port is usually 7687 (Bolt) as well.
-            self.driver = GraphDatabase.driver(self.uri, auth=self.auth)
+            self.driver = GraphDatabase.driver(self.uri, auth=self.auth,
+                                               max_connection_pool_size=max(self.pool_size, 100))
             self.driver.verify_connectivity()
+            self._executor = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="tugraph")
             print(f"Connected to TuGraph at {self.uri}")
         except Exception as e:
             print(f"Failed to connect to TuGraph: {e}")
             self.driver = None
 
+    def _session(self, db_name):
+        """Session for db_name owned by the calling thread (sessions are not thread-safe)."""
+        sessions = getattr(self._local, "sessions", None)
+        if sessions is None:
+            sessions = self._local.sessions = {}
+        if db_name not in sessions:
+            session = self.driver.session(database=db_name)
+            with self._lock:
+                self._sessions.append(session)
+            sessions[db_name] = session
+        return sessions[db_name]
+
+    def _discard_session(self, db_name):
+        """Drop a session left in an unknown state by a failed query."""
+        session = self._local.sessions.pop(db_name, None)
+        if session is not None:
+            with self._lock:
+                self._sessions.remove(session)
+            try:
+                session.close()
+            except Exception as e:
+                logging.debug(e)
+
+    def _run(self, cypher: str, db_name: str, consume=list):
+        """Returns (consumed result, truncated flag)."""
+        # The transaction timeout is enforced server-side
+        query = Query(cypher, timeout=self.query_timeout) if self.query_timeout else cypher
+        try:
+            result = self._session(db_name).run(query)
+            # Records are pulled lazily, so consume can fold them without materializing the result
+            records = (record.data() for record in result)
+            cap = _RowCap(records, self.max_rows) if self.max_rows else None
+            value = consume(iter(cap) if cap else records)
+            if cap and cap.truncated:
+                # Discard the remaining records on the server instead of streaming them
+                result.consume()
+                return value, True
+            return value, False
+        except Exception:
+            self._discard_session(db_name)
+            raise
+
+    def _execute(self, cypher: str, db_name: str, consume=list) -> dict:
+        try:
+            value, truncated = self._run(cypher, db_name, consume)
+            return {"result": value, "error": None, "timed_out": False, "truncated": truncated}
+        except Exception as e:
+            return {"result": None, "error": str(e), "timed_out": _is_timeout(e), "truncated": False}
+
     def query(self, cypher: str, db_name: str = "default") -> list:
         """
         Executes a Cypher query against the specified graph in TuGraph.
         """
         if not self.driver:
             return None
-        
+
         try:
-            with self.driver.session(database=db_name) as session:
-                result = session.run(cypher).data()
-                return result
+            return self._run(cypher, db_name)[0]
         except Exception as e:
             return None
 
+    def query_many(self, queries: list, consume=None) -> list:
+        """
+        Executes (cypher, db_name) pairs concurrently on the session pool.
+        Returns one {"result", "error"} dict per query, in input order;
+        consume, if given, folds each record stream inside the worker thread.
+        """
+        if not self.driver:
+            return [{"result": None, "error": "not connected"} for _ in queries]
+        consume = consume or list
+        return list(self._executor.map(lambda q: self._execute(q[0], q[1], consume), queries))
+
     def close(self):
+        if self._executor:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        with self._lock:
+            sessions, self._sessions = self._sessions, []
+        for session in sessions:
+            try:
+                session.close()
+            except Exception as e:
+                logging.debug(e)
         if self.driver:
-            self.driver.close()
\ No newline at end of file
+            self.driver.close()
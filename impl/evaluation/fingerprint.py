@@ -0,0 +1,100 @@
+import hashlib
+from collections import Counter
+from impl.evaluation.tugraph_eval import tugraph_eval_module
+
+# Row normalizer of the TuGraph evaluator, loaded on the first fingerprinted row
+_normalization = None
+
+def _row_digest(canonical_row) -> int:
+    global _normalization
+    if _normalization is None:
+        _normalization = tugraph_eval_module("result_normalization")
+    return _normalization.row_digest(canonical_row)
+
+class ResultFingerprint:
+    """
+    Order-independent multiset hash of a query result.
+    Each canonicalized row is hashed to 128 bits; the fingerprint keeps the row
+    count plus the modular sum and XOR of the row hashes, so two results can be
+    compared in O(1) memory after a single streaming pass. A chained digest of the
+    row hashes additionally captures row order for ORDER BY queries, and the same
+    sums over distinct row hashes compare results as sets (DISTINCT, UNION); the
+    distinct hashes seen are held only while the fingerprint is being built.
+    """
+    MASK = (1 << 128) - 1
+    __slots__ = ("count", "total", "xor", "ordered", "distinct_count", "distinct_total", "_seen")
+
+    def __init__(self, count=0, total=0, xor=0, ordered=0, distinct_count=0, distinct_total=0):
+        self.count = count
+        self.total = total
+        self.xor = xor
+        self.ordered = ordered
+        self.distinct_count = distinct_count
+        self.distinct_total = distinct_total
+        self._seen = set()
+
+    @staticmethod
+    def row_hash(canonical_row) -> int:
+        # Type-canonical, so rows that compare equal (1 == 1.0 == True) fingerprint alike
+        return _row_digest(canonical_row)
+
+    def add(self, canonical_row):
+        h = self.row_hash(canonical_row)
+        self.count += 1
+        self.total = (self.total + h) & self.MASK
+        self.xor ^= h
+        chained = hashlib.blake2b(self.ordered.to_bytes(16, "big") + h.to_bytes(16, "big"), digest_size=16)
+        self.ordered = int.from_bytes(chained.digest(), "big")
+        if h not in self._seen:
+            self._seen.add(h)
+            self.distinct_count += 1
+            self.distinct_total = (self.distinct_total + h) & self.MASK
+
+    def finish(self):
+        """Drop the distinct-hash set once every row has been added (it is not needed to compare)."""
+        self._seen = None
+        return self
+
+    @classmethod
+    def from_records(cls, records, canonicalize):
+        """Consume an iterator of records without materializing it."""
+        fingerprint = cls()
+        for record in records:
+            fingerprint.add(canonicalize(record))
+        return fingerprint.finish()
+
+    def __eq__(self, other):
+        if not isinstance(other, ResultFingerprint):
+            return NotImplemented
+        return (self.count, self.total, self.xor) == (other.count, other.total, other.xor)
+
+    def same_set(self, other) -> bool:
+        """Equal sets of distinct rows, duplicates ignored (set comparison of the row-level path)."""
+        return (self.distinct_count, self.distinct_total) == (other.distinct_count, other.distinct_total)
+
+    def same_order(self, other) -> bool:
+        """Equal rows in the same order (ties included, so stricter than row-level list comparison)."""
+        return self == other and self.ordered == other.ordered
+
+    def __hash__(self):
+        return hash((self.count, self.total, self.xor))
+
+    def __repr__(self):
+        return f"ResultFingerprint(count={self.count}, hash={self.total:032x})"
+
+    def to_dict(self) -> dict:
+        return {"count": self.count, "hash": f"{self.total:032x}", "xor": f"{self.xor:032x}"}
+
+
+def result_diff(gold_rows, pred_rows, limit=20) -> dict:
+    """Multiset difference between two canonicalized results, truncated to `limit` rows per side."""
+    gold = Counter(gold_rows)
+    pred = Counter(pred_rows)
+    missing = list((gold - pred).elements())
+    unexpected = list((pred - gold).elements())
+    return {
+        "missing_count": len(missing),
+        "unexpected_count": len(unexpected),
+        "missing": [list(r) for r in missing[:limit]],
+        "unexpected": [list(r) for r in unexpected[:limit]],
+    }
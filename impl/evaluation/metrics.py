@@ -1,64 +1,167 @@
 import os
 import sys
-import shutil
-import subprocess
 import json
-import re
+import subprocess
 import evaluate
 from driver.evaluation import BaseMetric, DatabaseDriver
+from impl.evaluation.result_cache import GoldResultCache
+from impl.evaluation.fingerprint import ResultFingerprint, result_diff
+from impl.evaluation.tugraph_eval import tugraph_eval_module
+
+def load_query_validator(import_config: str):
+    """QueryValidator for the schema of a TuGraph import config."""
+    return tugraph_eval_module("query_validator").QueryValidator.from_import_config(import_config)
 
 class ExecutionAccuracy(BaseMetric):
-    def __init__(self, driver: DatabaseDriver):
+    def __init__(self, driver: DatabaseDriver, gold_cache: GoldResultCache = None,
+                 use_fingerprints: bool = False, full_diff: bool = False, validator=None):
         self.driver = driver
+        # Gold results are shared across levels (and runs, if persisted)
+        self.gold_cache = gold_cache or GoldResultCache()
+        # Fingerprint mode streams records into a multiset hash instead of materializing result sets
+        self.use_fingerprints = use_fingerprints
+        # On a fingerprint mismatch, re-run both queries and record a row-level diff in the verdict
+        self.full_diff = full_diff
+        # Predictions the schema rules out are judged locally instead of being sent to the database
+        self.validator = validator
+        # Column-specialized, batched normalization shared by comparison, fingerprints and diffs
+        self.normalization = tugraph_eval_module("result_normalization")
+        self.normalizer = self.normalization.RowNormalizer()
+        # List / multiset / set / size semantics are chosen from the gold query's structure
+        comparator_cls = tugraph_eval_module("result_comparator").ResultComparator
+        self.comparator = comparator_cls(canonicalize_rows=self.normalizer.normalize_all)
 
-    def _normalize(self, value):
-        if isinstance(value, float):
-            return round(value, 9)
-        elif isinstance(value, (int, str, bool)) or value is None:
-            return value
-        elif hasattr(value, "isoformat"):
-            return value.isoformat()
-        elif hasattr(value, "total_seconds"):
-            return str(value)
-        elif isinstance(value, (list, tuple)):
-            return tuple(self._normalize(v) for v in value)
-        elif isinstance(value, dict):
-            return tuple(sorted((k, self._normalize(v)) for k, v in value.items()))
-        else:
-            return str(value)
-
-    def _compare_results(self, res_gold, res_predict):
-        def normalize_row(row):
-            return tuple(self._normalize(v) for v in row.values())
-        gold_set = {normalize_row(r) for r in res_gold}
-        pred_set = {normalize_row(r) for r in res_predict}
-        return gold_set == pred_set
-
-    def compute(self, predictions: list, golds: list, **kwargs) -> float:
-        db_ids = kwargs.get("db_ids", ["geography"] * len(predictions))
-        correct = 0
-        total = 0
-
-        for pred, gold, db_id in zip(predictions, golds, db_ids):
-            if not pred:
-                total += 1
-                continue 
-
-            res_gold = self.driver.query(gold, db_name=db_id)
-            if res_gold is None:
-                total += 1
-                continue
+    def _compare_results(self, res_gold, res_predict, gold_query, db_id):
+        if isinstance(res_gold, ResultFingerprint):
+            return self._compare_fingerprints(res_gold, res_predict, gold_query)
+        return self.comparator.compare(list(res_gold), list(res_predict), gold_query,
+                                       run_query=lambda query: self._full_gold_rows(query, db_id))
 
-            res_pred = self.driver.query(pred, db_name=db_id)
-            if res_pred is None:
-                total += 1
-                continue
+    def _full_gold_rows(self, query, db_id):
+        """Rows of a gold query stripped of its LIMIT/SKIP (via the gold cache); None if not comparable."""
+        outcome = self._gold_outcomes([(query, db_id)])[(query, db_id)]
+        if outcome["result"] is None or outcome.get("truncated"):
+            return None
+        return outcome["result"]
+
+    def _compare_fingerprints(self, gold, pred, gold_query):
+        """
+        Fingerprints keep no rows, so ties in ORDER BY output are compared strictly and rows
+        picked by LIMIT/SKIP without ORDER BY cannot be traced back to the gold result: those
+        are compared as multisets.
+        """
+        plan = self.comparator.plan(gold_query)
+        if plan.mode == "list":
+            return gold.same_order(pred)
+        mode = plan.base if plan.mode == "size" else plan.mode
+        if mode == "set":
+            return gold.same_set(pred)
+        return gold == pred
+
+    def _fingerprint(self, records):
+        return ResultFingerprint.from_records(self.normalizer.normalize(records), tuple)
+
+    def _consumer(self, fingerprints: bool):
+        return (self._fingerprint, f"fingerprint-v{self.normalization.FORMAT_VERSION}") if fingerprints else (None, "rows")
+
+    def _gold_outcomes(self, gold_queries: list, fingerprints: bool = False) -> dict:
+        """Outcome per distinct (gold, db_id), executing only the ones missing from the cache."""
+        consume, kind = self._consumer(fingerprints)
+        outcomes = {}
+        for key in gold_queries:
+            if key not in outcomes:
+                outcomes[key] = self.gold_cache.get(*key, kind=kind)
+        missing = [key for key, outcome in outcomes.items() if outcome is None]
+        for key, outcome in zip(missing, self.driver.query_many(missing, consume=consume)):
+            self.gold_cache.put(*key, outcome, kind=kind)
+            outcomes[key] = outcome
+        return outcomes
+
+    def _diff(self, pred, gold, db_id):
+        """Materialize both results (opt-in, mismatches only) and return their multiset difference."""
+        outcomes = self.driver.query_many([(gold, db_id), (pred, db_id)])
+        if outcomes[0]["result"] is None or outcomes[1]["result"] is None:
+            return None
+        return result_diff(self.normalizer.normalize_all(outcomes[0]["result"]),
+                           self.normalizer.normalize_all(outcomes[1]["result"]))
+
+    def _pred_outcomes(self, queries: list) -> list:
+        """
+        Outcome per (pred, db_id). Schema errors become {"invalid": True} without a round trip;
+        a pattern that can never match yields a locally built empty result. Either way the
+        validator's reason is kept under "validation".
+        """
+        consume = self._consumer(self.use_fingerprints)[0]
+        issues = [self.validator.validate(pred) if self.validator else None for pred, _ in queries]
+        outcomes = [None] * len(queries)
+        pending = []
+        for n, issue in enumerate(issues):
+            if issue is not None and issue.kind == "error":
+                outcomes[n] = {"result": None, "error": issue.reason, "invalid": True, "validation": issue.reason}
+            elif issue is not None and issue.provably_empty:
+                outcomes[n] = {"result": consume(iter([])) if consume else [], "error": None, "validation": issue.reason}
+            else:
+                pending.append(n)
+        for n, outcome in zip(pending, self.driver.query_many([queries[n] for n in pending], consume=consume)):
+            if issues[n] is not None:
+                outcome["validation"] = issues[n].reason
+            outcomes[n] = outcome
+        return outcomes
+
+    @staticmethod
+    def _failure(outcome: dict, side: str) -> str:
+        return "timeout" if outcome.get("timed_out") else f"{side}_error"
+
+    def _present(self, result):
+        return result.to_dict() if isinstance(result, ResultFingerprint) else result
+
+    def compute(self, predictions: list, golds: list, **kwargs) -> dict:
+        """
+        Returns {"accuracy": float, "verdicts": [...]} with one verdict per item:
+        correct, incorrect, empty_prediction, invalid_query (rejected by the schema
+        validator), gold_error, pred_error or timeout.
+        Verdicts compared on row-capped results are flagged with truncated=True.
+        With keep_results=True each verdict also carries gold_result / pred_result.
+        Predictions the validator flagged carry its reason under "validation".
+        """
+        db_ids = kwargs.get("db_ids") or ["geography"] * len(predictions)
+        keep_results = kwargs.get("keep_results", False)
+        rows = list(zip(predictions, golds, db_ids))
+        verdicts = [{"verdict": "empty_prediction", "error": None} for _ in rows]
+
+        # Predictions and not-yet-cached golds go to the driver as one concurrent batch
+        items = [(i, pred, gold, db_id) for i, (pred, gold, db_id) in enumerate(rows) if pred]
+        gold_outcomes = self._gold_outcomes([(gold, db_id) for _, _, gold, db_id in items], self.use_fingerprints)
+        pred_outcomes = self._pred_outcomes([(pred, db_id) for _, pred, _, db_id in items])
+
+        for (i, pred, gold, db_id), pred_outcome in zip(items, pred_outcomes):
+            gold_outcome = gold_outcomes[(gold, db_id)]
+            verdict = verdicts[i]
+            if pred_outcome.get("validation"):
+                verdict["validation"] = pred_outcome["validation"]
+            if gold_outcome["result"] is None:
+                verdict.update(verdict=self._failure(gold_outcome, "gold"), error=gold_outcome["error"])
+            elif pred_outcome.get("invalid"):
+                verdict.update(verdict="invalid_query", error=pred_outcome["error"])
+            elif pred_outcome["result"] is None:
+                verdict.update(verdict=self._failure(pred_outcome, "pred"), error=pred_outcome["error"])
+            elif self._compare_results(gold_outcome["result"], pred_outcome["result"], gold, db_id):
+                verdict["verdict"] = "correct"
+            else:
+                verdict["verdict"] = "incorrect"
+                if self.use_fingerprints and self.full_diff:
+                    verdict["diff"] = self._diff(pred, gold, db_id)
 
-            if self._compare_results(res_gold, res_pred):
-                correct += 1
-            total += 1
+            if gold_outcome.get("truncated") or pred_outcome.get("truncated"):
+                # Compared on the first max_rows rows only
+                verdict["truncated"] = True
+            if keep_results:
+                verdict["gold_result"] = self._present(gold_outcome["result"])
+                verdict["pred_result"] = self._present(pred_outcome["result"])
 
-        return correct / total if total > 0 else 0.0
+        correct = sum(1 for v in verdicts if v["verdict"] == "correct")
+        total = len(rows)
+        return {"accuracy": correct / total if total > 0 else 0.0, "verdicts": verdicts}
     
     def execute_single(self, pred, gold, db_id):
         """
@@ -70,7 +173,7 @@ class ExecutionAccuracy(BaseMetric):
 
         # Execute Gold Standard Query
         try:
-            res_gold = self.driver.query(gold, db_name=db_id)
+            res_gold = self._gold_outcomes([(gold, db_id)])[(gold, db_id)]["result"]
         except Exception as e:
             res_gold = f"[GOLD ERROR] {str(e)}"
 
@@ -82,7 +185,7 @@ class ExecutionAccuracy(BaseMetric):
 
         # Determine Consistency
         try:
-            is_correct = self._compare_results(res_gold, res_pred)
+            is_correct = self._compare_results(res_gold, res_pred, gold, db_id)
         except:
             is_correct = False
 
@@ -101,109 +204,95 @@ class GoogleBleu(BaseMetric):
             return 0.0
 
 class ExternalMetric(BaseMetric):
-
-    def __init__(self, dbgpt_root: str):
+    """
+    Grammar and structural similarity from the evaluators under dbgpt_root. By default they
+    run in-process: the engine (and its ANTLR parsers) is imported once and reused for every
+    level. With isolated=True they run in one long-lived worker process (metric_worker.py)
+    that is started on first use and serves every level over a JSON-lines pipe.
+    gold_cache_path persists which gold queries parse, so later runs skip parsing them.
+    """
+    def __init__(self, dbgpt_root: str, isolated: bool = False, gold_cache_path: str = None):
         self.dbgpt_root = dbgpt_root
-        self.temp_dir = os.path.abspath("temp_eval_results_oop")
+        self.isolated = isolated
+        self.gold_cache_path = os.path.abspath(gold_cache_path) if gold_cache_path else None
+        self.eval_dir = os.path.abspath(os.path.join(dbgpt_root, "eval_similarity_grammar", "eval"))
+        self.engine = None
+        self.worker = None
+        self._request_id = 0
 
-    def _parse_log_score(self, log_content, etype):
+    def _engine(self):
+        if self.engine is None:
+            if self.eval_dir not in sys.path:
+                sys.path.append(self.eval_dir)
+            from metric_engine import MetricEngine
+            self.engine = MetricEngine(self.gold_cache_path)
+        return self.engine
 
-        try:
-            # Attempt to parse the float directly 
-            val = float(log_content.strip())
-            return val
-        except ValueError:
+    def _worker(self):
+        if self.worker is None or self.worker.poll() is not None:
+            cmd = [sys.executable, os.path.join(self.eval_dir, "metric_worker.py")]
+            if self.gold_cache_path:
+                cmd += ["--gold_cache", self.gold_cache_path]
+            self.worker = subprocess.Popen(cmd,
+                                           stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                           text=True, encoding="utf-8", bufsize=1)
+        return self.worker
+
+    def _score_in_worker(self, etype, impl, predictions, golds) -> dict:
+        self._request_id += 1
+        request = {"id": self._request_id, "etype": etype, "impl": impl,
+                   "predictions": list(predictions), "golds": list(golds)}
+        for attempt in range(2):
+            worker = self._worker()
             try:
-                # Attempt to parse JSON
-                data = json.loads(log_content)
-                if isinstance(data, list):
-                    valid = [x['score'] for x in data if x.get('score', -1) >= 0]
-                    return sum(valid) / len(valid) if valid else 0.0
-                elif isinstance(data, dict):
-                    return data.get('accuracy', 0.0) if etype == 'grammar' else data.get('score', 0.0)
-            except:
-                pass
-        
-        # Extract numbers using regex (to prevent interference from extra logging information)
-        try:
-            matches = re.findall(r"[-+]?\d*\.\d+|\d+", log_content)
-            if matches:
-                return float(matches[-1])
-        except:
-            pass
-        return 0.0
+                worker.stdin.write(json.dumps(request, ensure_ascii=False) + "\n")
+                worker.stdin.flush()
+                line = worker.stdout.readline()
+            except (BrokenPipeError, OSError):
+                line = ""
+            if line:
+                response = json.loads(line)
+                if "error" in response:
+                    raise RuntimeError(response["error"])
+                return response
+            # The worker died (e.g. crashed inside a parser); start a fresh one and retry once
+            worker.kill()
+            worker.wait()
+        raise RuntimeError("metric worker exited without answering")
+
+    def _score(self, etype, impl, predictions, golds) -> dict:
+        if self.isolated:
+            return self._score_in_worker(etype, impl, predictions, golds)
+        return self._engine().score(etype, impl, predictions, golds)
 
     def compute(self, predictions: list, golds: list, **kwargs) -> dict:
+        """Mean Grammar / Similarity plus per-item scores under "items" (-1 where the gold query fails to parse)."""
         dataset_type = kwargs.get('dataset_type', 'text2cypher')
-        
+
         if not os.path.exists(self.dbgpt_root):
             print(f"ERROR: DBGPT root not found: {self.dbgpt_root}")
             return {'Grammar': 0.0, 'Similarity': 0.0}
 
-        # 1. Prepare Directory
-        os.makedirs(self.temp_dir, exist_ok=True)
-        
-        pred_file = os.path.join(self.temp_dir, 'predictions.txt')
-        gold_file = os.path.join(self.temp_dir, 'gold.txt')
-
-        # Ensure newline characters are removed, guaranteeing one item per line
-        clean_preds = [p.replace('\n', ' ').strip() if p else "" for p in predictions]
-        clean_golds = [g.replace('\n', ' ').strip() if g else "" for g in golds]
-
-        with open(pred_file, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(clean_preds))
-        with open(gold_file, 'w', encoding='utf-8') as f:
-            f.write('\n'.join(clean_golds))
+        impl = 'tugraph-db' if dataset_type == 'text2cypher' else 'iso-gql'
+        results = {'items': {}}
+        for etype in ['grammar', 'similarity']:
+            score = 0.0
+            try:
+                res = self._score(etype, impl, predictions, golds)
+                score = res['score']
+                results['items'][etype.capitalize()] = res['scores']
+            except Exception as e:
+                print(f"Error ({etype}): {e}")
+            results[etype.capitalize()] = score
 
-        results = {}
-        original_cwd = os.getcwd()
+        return results
 
-        try:
-            # 2. Automatically Create Log Directory 
-            log_dir = os.path.join(self.dbgpt_root, "eval_similarity_grammar", "output", "logs")
-            if not os.path.exists(log_dir):
-                # print(f"DEBUG: Creating log directory at {log_dir}")
-                os.makedirs(log_dir, exist_ok=True)
-
-            # 3. Change Directory 
-            os.chdir(self.dbgpt_root)
-            impl = 'tugraph-db' if dataset_type == 'text2cypher' else 'iso-gql'
-
-            for etype in ['grammar', 'similarity']:
-                score = 0.0
-                try:
-                    cmd = [
-                        sys.executable, 
-                        'eval_similarity_grammar/eval/evaluation.py',
-                        '--input', pred_file,
-                        '--gold', gold_file,
-                        '--etype', etype,
-                        '--impl', impl
-                    ]
-                    
-                    # 4. Execute External Script           
-                    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
-
-                    # 5. Read Log 
-                    log_path = os.path.join('eval_similarity_grammar', 'output', 'logs', 'eval.log')
-                    if os.path.exists(log_path):
-                        with open(log_path, 'r', encoding='utf-8') as f:
-                            content = f.read().strip()
-                            score = self._parse_log_score(content, etype)
-                    else:
-                        print(f"WARNING: Log file missing for {etype}")
-
-                except subprocess.CalledProcessError as e:
-                    err_msg = e.stderr.decode('utf-8') if e.stderr else ""
-                    print(f"Script Error ({etype}): {err_msg.strip()}")
-                except Exception as e:
-                    print(f"Error ({etype}): {e}")
-                
-                results[etype.capitalize()] = score
-
-        finally:
-            os.chdir(original_cwd)
-            if os.path.exists(self.temp_dir):
-                shutil.rmtree(self.temp_dir, ignore_errors=True)
-        
-        return results
\ No newline at end of file
+    def close(self):
+        """Stop the worker process, if one was started."""
+        if self.worker is not None and self.worker.poll() is None:
+            self.worker.stdin.close()
+            try:
+                self.worker.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.worker.kill()
+        self.worker = None
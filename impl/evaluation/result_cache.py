@@ -0,0 +1,104 @@
+import os
+import json
+import pickle
+import hashlib
+import sqlite3
+import threading
+from impl.db_driver.columnar_store import ColumnarGraphStore
+
+class GoldResultCache:
+    """
+    Memoizes gold query outcomes so each gold query executes once per run.
+    Successful results can also be persisted to SQLite and reused across runs;
+    keys combine the graph name, the whitespace-normalized query, a dataset
+    fingerprint and the execution limits (max_rows, query_timeout), so a changed
+    dataset or a different row cap never serves stale or differently-truncated results.
+    """
+    def __init__(self, path: str = None, fingerprint: str = "", max_rows: int = None, query_timeout: float = None):
+        self.path = path
+        self.fingerprint = fingerprint
+        self.max_rows = max_rows
+        self.query_timeout = query_timeout
+        self.memory = {}
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = None
+
+        if path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False)
+            self.conn.execute("CREATE TABLE IF NOT EXISTS gold_results (key TEXT PRIMARY KEY, outcome BLOB NOT NULL)")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS file_hashes (path TEXT PRIMARY KEY, size INTEGER NOT NULL, "
+                              "mtime_ns INTEGER NOT NULL, sha256 TEXT NOT NULL)")
+            self.conn.commit()
+
+    def dataset_fingerprint(self, config_path: str, data_dir: str = None) -> str:
+        """
+        Hash of the import config and every data file it lists, resolved like the graph loader
+        does. Per-file sha256 digests are remembered by size and mtime (as in the columnar
+        cache manifest), so unchanged files are not re-read on every run.
+        """
+        digest = hashlib.sha256()
+        for path in ColumnarGraphStore.source_files(config_path, data_dir):
+            digest.update(path.encode("utf-8"))
+            digest.update(self._file_sha256(path).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _file_sha256(self, path: str) -> str:
+        if not os.path.exists(path):
+            return "missing"
+        stat = os.stat(path)
+        if self.conn is not None:
+            row = self.conn.execute("SELECT size, mtime_ns, sha256 FROM file_hashes WHERE path = ?", (path,)).fetchone()
+            if row is not None and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+                return row[2]
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        file_hash = digest.hexdigest()
+        if self.conn is not None:
+            self.conn.execute("INSERT OR REPLACE INTO file_hashes (path, size, mtime_ns, sha256) VALUES (?, ?, ?, ?)",
+                              (path, stat.st_size, stat.st_mtime_ns, file_hash))
+            self.conn.commit()
+        return file_hash
+
+    def _key(self, query: str, db_name: str, kind: str) -> str:
+        payload = json.dumps([db_name, " ".join(query.split()), self.fingerprint, kind,
+                              self.max_rows, self.query_timeout])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, query: str, db_name: str, kind: str = "rows"):
+        """Cached {"result", "error"} outcome, or None when the query has not run yet.
+        kind separates representations of the same query (full rows vs. fingerprints)."""
+        key = self._key(query, db_name, kind)
+        with self._lock:
+            outcome = self.memory.get(key)
+            if outcome is None and self.conn is not None:
+                row = self.conn.execute("SELECT outcome FROM gold_results WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    outcome = self.memory[key] = pickle.loads(row[0])
+            if outcome is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return outcome
+
+    def put(self, query: str, db_name: str, outcome: dict, kind: str = "rows"):
+        key = self._key(query, db_name, kind)
+        with self._lock:
+            self.memory[key] = outcome
+            # Errors may be transient (connection drops), so only results outlive the run
+            if self.conn is not None and outcome.get("error") is None:
+                self.conn.execute("INSERT OR REPLACE INTO gold_results (key, outcome) VALUES (?, ?)",
+                                  (key, pickle.dumps(outcome)))
+                self.conn.commit()
+
+    def summary(self) -> str:
+        return f"Gold cache: {self.hits} hits, {self.misses} executions"
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
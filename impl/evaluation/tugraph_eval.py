@@ -0,0 +1,15 @@
+import os
+import sys
+import importlib
+
+# The result comparator, query validator and row normalizer live next to the Lcypher parser,
+# in the vendored TuGraph evaluator, which must keep working without this package
+TUGRAPH_EVAL_DIR = os.path.normpath(os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "tools", "eval_similarity_grammar",
+    "eval_similarity_grammar", "eval", "evaluator", "impl", "tugraph-db"))
+
+def tugraph_eval_module(name: str):
+    """Import a module of the TuGraph evaluator directory on first use, not when impl is imported."""
+    if TUGRAPH_EVAL_DIR not in sys.path:
+        sys.path.append(TUGRAPH_EVAL_DIR)
+    return importlib.import_module(name)
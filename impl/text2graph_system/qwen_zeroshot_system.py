@@ -1,10 +1,16 @@
+import re
 import json
 import time
+import asyncio
+from collections import Counter
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from tqdm import tqdm
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 from driver.prediction import Text2GraphSystem
 from impl.text2graph_system.utils import schema_to_text, clean_query
+from impl.text2graph_system.response_cache import ResponseCache
+from impl.text2graph_system.rate_limiter import RateLimiter
+from impl.text2graph_system.schema_retrieval import SchemaRetriever
 
 class QwenZeroshotSystem(Text2GraphSystem):
     def __init__(self, config: dict):
@@ -13,78 +19,388 @@ class QwenZeroshotSystem(Text2GraphSystem):
         self.model = config["model"]
         self.max_workers = config.get("max_workers", 5)
         self.level_fields = config.get("level_fields", [])
-        
+
+        # Event-loop engine: one AsyncOpenAI client, in-flight calls bounded by a semaphore
+        self.async_mode = config.get("async_mode", False)
+        self.max_concurrency = config.get("max_concurrency", 256)
+
+        # Questions packed into one request (JSON answer); 1 disables batched prompting
+        self.batch_size = config.get("batch_size", 1)
+
+        # Sent with every completion request; also part of the response cache key
+        self.generation_params = {"extra_body": {"enable_thinking": False}}
+
+        # Optional on-disk cache of raw completions, shared across runs
+        self.cache = None
+        if config.get("cache_path"):
+            self.cache = ResponseCache(config["cache_path"], config.get("cache_max_mb", 512))
+
+        # Optional RPM/TPM budgets with AIMD concurrency; replaces the fixed retry sleep
+        self.max_retries = config.get("max_retries", 3)
+        self.rate_limiter = None
+        if config.get("rate_limit"):
+            # The limiter can only lower concurrency below what the executor allows
+            ceiling = self.max_concurrency if self.async_mode else self.max_workers
+            self.rate_limiter = RateLimiter.from_config(config["rate_limit"], ceiling)
+
         # Load Schema
         schema_path = config["schema_path"]
         schema_json = json.load(open(schema_path, "r", encoding="utf-8"))
         self.schema_text = schema_to_text(schema_json).rstrip() + "\n"
 
+        # Optional per-question schema pruning (top-k BM25 matches plus their 1-hop neighbourhood)
+        self.schema_retriever = None
+        if config.get("schema_top_k"):
+            self.schema_retriever = SchemaRetriever(schema_json, top_k=config["schema_top_k"])
+        # With pruning, batched questions share the union of their schema elements, up to this many
+        self.batch_schema_limit = config.get("batch_schema_limit", 4 * config.get("schema_top_k", 0))
+
+    def _schema_for(self, nl_question: str) -> str:
+        """Schema text placed in the prompt for this question."""
+        if self.schema_retriever:
+            pruned = self.schema_retriever.schema_text(nl_question)
+            if pruned:
+                return pruned
+        return self.schema_text
+
+    def _batch_schema(self, questions: list) -> str:
+        """Schema text for a batched prompt: the union of every question's pruned schema."""
+        if self.schema_retriever:
+            selections = [self.schema_retriever.select(q) for q in questions]
+            if all(selections):
+                return self.schema_retriever.render(frozenset().union(*selections))
+        return self.schema_text
+
+    def _system_prompt(self, schema_text: str, task: str, answer_format: str) -> str:
+        return (
+            "You are an expert in graph query languages.\n"
+            "The database schema is as follows:\n"
+            f"{schema_text}\n\n"
+            f"{task}"
+            "Requirements:\n"
+            "- Use the schema exactly (labels, properties, edge types).\n"
+            "- Maintain the exact relationship types and directions.\n"
+            "- Preserve all temporal constraints.\n"
+            "- Use DISTINCT when necessary.\n"
+            "- For path length, use length(p)-1 if matching multi-hop paths.\n"
+            "- Do not merge different edge types unless explicitly required.\n"
+            f"{answer_format}"
+        )
+
     def _build_prompt(self, nl_question: str):
         return [
             {
                 "role": "system",
-                "content": (
-                    "You are an expert in graph query languages.\n"
-                    "The database schema is as follows:\n"
-                    f"{self.schema_text}\n\n"
+                "content": self._system_prompt(
+                    self._schema_for(nl_question),
                     "Your task: Given a natural language question, output ONLY one query:\n"
-                    "Cypher (for Neo4j)\n\n"
-                    "Requirements:\n"
-                    "- Use the schema exactly (labels, properties, edge types).\n"
-                    "- Maintain the exact relationship types and directions.\n"
-                    "- Preserve all temporal constraints.\n"
-                    "- Use DISTINCT when necessary.\n"
-                    "- For path length, use length(p)-1 if matching multi-hop paths.\n"
-                    "- Do not merge different edge types unless explicitly required.\n"
+                    "Cypher (for Neo4j)\n\n",
                     "- Output must be plain query only, no comments, no explanation.\n"
                 )
             },
             {"role": "user", "content": nl_question.strip()}
         ]
 
-    def _call_single(self, client, question, max_retries=3):
-        for _ in range(max_retries):
+    def _build_batch_prompt(self, questions: list, schema_text: str):
+        """Pack several questions sharing one schema into a single request with a JSON answer."""
+        numbered = "\n".join(f"{i}. {q.strip()}" for i, q in enumerate(questions, 1))
+        return [
+            {
+                "role": "system",
+                "content": self._system_prompt(
+                    schema_text,
+                    f"Your task: Given {len(questions)} numbered natural language questions, "
+                    "output ONE query for EACH question:\n"
+                    "Cypher (for Neo4j)\n\n",
+                    "- Each query must be plain query only, no comments, no explanation.\n\n"
+                    "Answer format:\n"
+                    f"A JSON array of exactly {len(questions)} strings, where element i is the query "
+                    "for question i. Output the JSON array only.\n"
+                )
+            },
+            {"role": "user", "content": numbered}
+        ]
+
+    @staticmethod
+    def _split_batch_answer(content, n: int) -> list:
+        """Split a batched JSON answer into n raw predictions; None marks items that failed to parse."""
+        if not isinstance(content, str):
+            return [None] * n
+        text = content.strip()
+        match = re.search(r"```(?:json)?(.*?)```", text, re.DOTALL)
+        if match:
+            text = match.group(1).strip()
+        start, end = text.find("["), text.rfind("]")
+        try:
+            answers = json.loads(text[start:end + 1]) if start != -1 and end > start else json.loads(text)
+        except ValueError:
+            return [None] * n
+        if isinstance(answers, dict):
+            answers = [answers.get(str(i), answers.get(i)) for i in range(1, n + 1)]
+        if not isinstance(answers, list) or len(answers) != n:
+            return [None] * n
+
+        split = []
+        for answer in answers:
+            if isinstance(answer, dict):
+                answer = answer.get("query")
+            split.append(answer if isinstance(answer, str) and answer.strip() else None)
+        return split
+
+    def _create_client(self):
+        """One client per batch; its keep-alive connection pool is shared by all worker threads."""
+        return OpenAI(api_key=self.api_key, base_url=self.base_url, **self._client_options())
+
+    def _create_async_client(self):
+        """One client per event loop; keep-alive connections are reused across all requests."""
+        return AsyncOpenAI(api_key=self.api_key, base_url=self.base_url, **self._client_options())
+
+    def _client_options(self):
+        # Let 429s reach the rate limiter instead of being retried inside the SDK
+        return {"max_retries": 0} if self.rate_limiter else {}
+
+    def _cache_lookup(self, messages):
+        if not self.cache:
+            return None, None
+        key = ResponseCache.make_key(self.model, self.base_url, messages, self.generation_params)
+        return key, self.cache.get(key)
+
+    @staticmethod
+    def _estimate_tokens(messages):
+        # Rough prompt size (~4 characters per token) plus headroom for the answer
+        return sum(len(m["content"]) for m in messages) // 4 + 256
+
+    def _handle_response(self, raw, cache_key, estimated):
+        completion = raw.parse()
+        content = completion.choices[0].message.content.strip()
+        if self.rate_limiter:
+            usage = getattr(completion, "usage", None)
+            self.rate_limiter.record_success(raw.headers, estimated, getattr(usage, "total_tokens", None))
+        if self.cache:
+            self.cache.put(cache_key, content)
+        return content
+
+    def _call_single(self, client, messages):
+        cache_key, cached = self._cache_lookup(messages)
+        if cached is not None:
+            return cached
+
+        estimated = self._estimate_tokens(messages)
+        for attempt in range(self.max_retries):
+            delay = 1
+            if self.rate_limiter:
+                self.rate_limiter.acquire(estimated)
             try:
-                completion = client.chat.completions.create(
+                raw = client.chat.completions.with_raw_response.create(
                     model=self.model,
-                    messages=self._build_prompt(question),
-                    extra_body={"enable_thinking": False},
-                    timeout=30
+                    messages=messages,
+                    timeout=30,
+                    **self.generation_params
                 )
-                return completion.choices[0].message.content.strip()
-            except Exception:
-                time.sleep(1)
+                return self._handle_response(raw, cache_key, estimated)
+            except Exception as e:
+                if self.rate_limiter:
+                    delay = self.rate_limiter.record_error(e, attempt)
+            finally:
+                if self.rate_limiter:
+                    self.rate_limiter.release()
+            time.sleep(delay)
+        return None
+
+    async def _call_single_async(self, client, semaphore, messages):
+        cache_key, cached = self._cache_lookup(messages)
+        if cached is not None:
+            return cached
+
+        estimated = self._estimate_tokens(messages)
+        for attempt in range(self.max_retries):
+            delay = 1
+            if self.rate_limiter:
+                await self.rate_limiter.acquire_async(estimated)
+            try:
+                async with semaphore:
+                    raw = await client.chat.completions.with_raw_response.create(
+                        model=self.model,
+                        messages=messages,
+                        timeout=30,
+                        **self.generation_params
+                    )
+                return self._handle_response(raw, cache_key, estimated)
+            except Exception as e:
+                if self.rate_limiter:
+                    delay = self.rate_limiter.record_error(e, attempt)
+            finally:
+                if self.rate_limiter:
+                    await self.rate_limiter.release_async()
+            await asyncio.sleep(delay)
         return None
 
-    def predict_batch(self, data: list) -> list:
-        def process_record(item):
-            # Instantiate Client independently for each thread
-            local_client = OpenAI(api_key=self.api_key, base_url=self.base_url)
-            result = item.copy()
-            
+    def _iter_tasks(self, data: list):
+        """Flatten the batch into independent (record index, query field, question) calls."""
+        for idx, item in enumerate(data):
             for nl_field, query_field in self.level_fields:
                 question = item.get(nl_field)
-                if not question:
-                    result[query_field] = None
-                    continue
-                
-                raw_pred = self._call_single(local_client, question)
-                # Note: Only perform cleanup here, not execution.
-                # Call clean_query here to maintain output consistency.
-                result[query_field] = clean_query(raw_pred)
-            
-            return result
+                if question:
+                    yield idx, query_field, question
+
+    def _single_flight(self, tasks: list) -> list:
+        """
+        Collapse identical requests into one call.
+        Requests are keyed by the whitespace-normalized question (the prompt is built from
+        the question alone), so every (record, field) asking the same thing shares a single
+        in-flight call; the prompt actually sent keeps the first such question as written.
+        Returns a list of (question, messages, [(idx, query_field), ...]).
+        """
+        flights = {}
+        for idx, query_field, question in tasks:
+            key = " ".join(question.split())
+            if key not in flights:
+                question = question.strip()
+                flights[key] = (question, self._build_prompt(question), [])
+            flights[key][2].append((idx, query_field))
+        return list(flights.values())
+
+    def _plan_jobs(self, flights: list) -> list:
+        """
+        Group unique requests into jobs of up to batch_size questions.
+        Without schema pruning every question sees the full schema, so jobs are plain chunks.
+        With pruning, pruned schemas rarely coincide, so a question joins the open job whose
+        union of schema elements grows least and stays within batch_schema_limit; the batch
+        prompt then carries that union. A higher limit means fewer requests but longer, less
+        focused schemas per prompt. Questions that fall back to the full schema batch together.
+        """
+        if self.batch_size <= 1:
+            return [[flight] for flight in flights]
+        if not self.schema_retriever:
+            return [flights[i:i + self.batch_size] for i in range(0, len(flights), self.batch_size)]
+        jobs, full_schema = [], []
+        open_jobs = []  # [union of schema elements, flights]
+        for flight in flights:
+            selected = self.schema_retriever.select(flight[0])
+            if not selected:
+                full_schema.append(flight)
+                continue
+            best = None
+            for job in open_jobs:
+                union = job[0] | selected
+                if len(union) <= self.batch_schema_limit and (best is None or len(union) < len(best[1])):
+                    best = (job, union)
+            if best is None:
+                job = [selected, []]
+                open_jobs.append(job)
+            else:
+                job = best[0]
+                job[0] = best[1]
+            job[1].append(flight)
+            if len(job[1]) == self.batch_size:
+                open_jobs.remove(job)
+                jobs.append(job[1])
+        jobs.extend(job[1] for job in open_jobs)
+        jobs.extend(full_schema[i:i + self.batch_size] for i in range(0, len(full_schema), self.batch_size))
+        return jobs
 
+    def _run_job(self, client, job: list) -> list:
+        if len(job) == 1:
+            _, messages, targets = job[0]
+            return [(targets, self._call_single(client, messages))]
+        questions = [question for question, _, _ in job]
+        content = self._call_single(client, self._build_batch_prompt(questions, self._batch_schema(questions)))
+        answers = self._split_batch_answer(content, len(job))
+        # Fall back to a single-question call for every item the batch answer did not cover
+        return [(targets, answer if answer is not None else self._call_single(client, messages))
+                for (_, messages, targets), answer in zip(job, answers)]
+
+    async def _run_job_async(self, client, semaphore, job: list) -> list:
+        if len(job) == 1:
+            _, messages, targets = job[0]
+            return [(targets, await self._call_single_async(client, semaphore, messages))]
+        questions = [question for question, _, _ in job]
+        content = await self._call_single_async(
+            client, semaphore, self._build_batch_prompt(questions, self._batch_schema(questions)))
+        answers = self._split_batch_answer(content, len(job))
         results = []
-        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
-            futures = [pool.submit(process_record, item) for item in data]
-            for f in tqdm(as_completed(futures), total=len(futures), desc="Predicting"):
-                results.append(f.result())
-        
+        for (_, messages, targets), answer in zip(job, answers):
+            if answer is None:
+                answer = await self._call_single_async(client, semaphore, messages)
+            results.append((targets, answer))
+        return results
+
+    def _assemble_record(self, item: dict, idx: int, predictions: dict) -> dict:
+        """Merge the finished per-call predictions of one input item into its result record."""
+        result = item.copy()
+        for _, query_field in self.level_fields:
+            result[query_field] = predictions.pop((idx, query_field), None)
+        return result
+
+    async def _predict_batch_async(self, jobs: list, store):
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._create_async_client() as client:
+            futures = [self._run_job_async(client, semaphore, job) for job in jobs]
+            for f in tqdm(asyncio.as_completed(futures), total=len(futures), desc="Predicting"):
+                for targets, raw_pred in await f:
+                    store(targets, raw_pred)
+
+    def close(self):
+        if self.cache:
+            self.cache.close()
+            self.cache = None
+
+    def predict_batch(self, data: list, on_record=None) -> list:
+        tasks = list(self._iter_tasks(data))
+        pending = Counter(idx for idx, _, _ in tasks)
+        predictions = {}
+        results = [None] * len(data)
+
+        def finish(idx):
+            record = self._assemble_record(data[idx], idx, predictions)
+            # Records handed to on_record are not kept, so the caller owns the only copy
+            if on_record:
+                on_record(record)
+            else:
+                results[idx] = record
+
+        def store(targets, raw_pred):
+            # Note: Only perform cleanup here, not execution.
+            # Call clean_query here to maintain output consistency.
+            pred = clean_query(raw_pred)
+            for idx, query_field in targets:
+                predictions[(idx, query_field)] = pred
+                pending[idx] -= 1
+                if pending[idx] == 0:
+                    finish(idx)
+
+        # Records without any question are complete before the first call
+        for idx in range(len(data)):
+            if idx not in pending:
+                finish(idx)
+
+        flights = self._single_flight(tasks)
+        if len(flights) < len(tasks):
+            print(f"De-duplicated {len(tasks)} questions into {len(flights)} unique requests")
+        jobs = self._plan_jobs(flights)
+
+        if self.async_mode:
+            asyncio.run(self._predict_batch_async(jobs, store))
+        else:
+            # With a rate limiter the pool bounds the AIMD ceiling; the limiter decides in-flight calls
+            with self._create_client() as client, ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = [pool.submit(self._run_job, client, job) for job in jobs]
+                for f in tqdm(as_completed(futures), total=len(futures), desc="Predicting"):
+                    for targets, raw_pred in f.result():
+                        store(targets, raw_pred)
+
+        if self.cache:
+            print(self.cache.summary())
+        if self.rate_limiter:
+            print(self.rate_limiter.summary())
+
+        if on_record:
+            return []
+
         # Preserve the original sorting logic
         try:
             results.sort(key=lambda x: int(str(x.get("instance_id", "0")).split("_")[-1]))
         except:
             pass
-            
-        return results
\ No newline at end of file
+
+        return results
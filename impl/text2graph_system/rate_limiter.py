@@ -0,0 +1,220 @@
+import time
+import random
+import asyncio
+import threading
+import weakref
+from email.utils import parsedate_to_datetime
+
+class TokenBucket:
+    """Per-minute budget refilled continuously; reservations may go into debt and report the wait."""
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def reserve(self, amount: float) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= min(amount, self.capacity)
+        return max(0.0, -self.tokens / self.rate)
+
+    def refund(self, amount: float):
+        self.tokens = min(self.capacity, self.tokens + amount)
+
+
+def _parse_duration(value):
+    """Parse header durations such as '20', '1.5', '250ms', '6m0s' or an HTTP date into seconds."""
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    if value.endswith("ms"):
+        try:
+            return float(value[:-2]) / 1000.0
+        except ValueError:
+            return None
+    seconds, number = 0.0, ""
+    units = {"h": 3600.0, "m": 60.0, "s": 1.0}
+    for ch in value:
+        if ch.isdigit() or ch == ".":
+            number += ch
+        elif ch in units and number:
+            seconds += float(number) * units[ch]
+            number = ""
+        else:
+            seconds = None
+            break
+    if seconds is not None and not number:
+        return seconds
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class RateLimiter:
+    """
+    Client-side throttle for LLM calls.
+    Enforces requests-per-minute and tokens-per-minute budgets, honours
+    Retry-After / x-ratelimit-* headers, and adapts the number of in-flight
+    requests with AIMD: +1 per window of successes, halved on overload.
+    Only 429, 5xx and timeouts count as overload; other errors are retried
+    after a short fixed pause without touching concurrency.
+    """
+    OVERLOAD_STATUS = {429}
+
+    def __init__(self, rpm=None, tpm=None, min_concurrency=1, max_concurrency=64,
+                 initial_concurrency=None, base_backoff=1.0, max_backoff=60.0):
+        self.rpm = TokenBucket(rpm) if rpm else None
+        self.tpm = TokenBucket(tpm) if tpm else None
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.concurrency = float(initial_concurrency or min(max_concurrency, max(min_concurrency, 8)))
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.last_decrease = 0.0
+        self.successes = 0
+        self.overloads = 0
+
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        # asyncio.Condition is bound to the loop it is first used on, so keep one per event loop
+        self._async_conds = weakref.WeakKeyDictionary()
+
+    @classmethod
+    def from_config(cls, cfg: dict, ceiling: int):
+        """Limiter for a `rate_limit` config section; ceiling is the caller's own worker/concurrency bound."""
+        return cls(
+            rpm=cfg.get("rpm"),
+            tpm=cfg.get("tpm"),
+            min_concurrency=min(cfg.get("min_concurrency", 1), ceiling),
+            max_concurrency=min(cfg.get("max_concurrency", ceiling), ceiling),
+            initial_concurrency=cfg.get("initial_concurrency"),
+            base_backoff=cfg.get("base_backoff", 1.0),
+            max_backoff=cfg.get("max_backoff", 60.0),
+        )
+
+    # --- Budgets ---
+
+    def _reserve(self, tokens: int) -> float:
+        """Charge one request and its estimated tokens; return how long the caller must wait."""
+        with self._lock:
+            wait = max(0.0, self.blocked_until - time.monotonic())
+            if self.rpm:
+                wait = max(wait, self.rpm.reserve(1))
+            if self.tpm:
+                wait = max(wait, self.tpm.reserve(tokens))
+            return wait
+
+    def _slots(self) -> int:
+        return max(self.min_concurrency, int(self.concurrency))
+
+    def acquire(self, tokens: int = 0):
+        with self._cond:
+            self._cond.wait_for(lambda: self.in_flight < self._slots())
+            self.in_flight += 1
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+
+    def _async_cond(self) -> asyncio.Condition:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            cond = self._async_conds.get(loop)
+            if cond is None:
+                cond = self._async_conds[loop] = asyncio.Condition()
+            return cond
+
+    async def acquire_async(self, tokens: int = 0):
+        cond = self._async_cond()
+        async with cond:
+            await cond.wait_for(lambda: self.in_flight < self._slots())
+            self.in_flight += 1
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def release(self):
+        with self._cond:
+            self.in_flight -= 1
+            self._cond.notify(max(1, self._slots() - self.in_flight))
+
+    async def release_async(self):
+        cond = self._async_cond()
+        async with cond:
+            self.in_flight -= 1
+            cond.notify(max(1, self._slots() - self.in_flight))
+
+    # --- Feedback ---
+
+    def record_success(self, headers=None, estimated_tokens: int = 0, used_tokens=None):
+        with self._lock:
+            self.successes += 1
+            # Additive increase: roughly one extra slot per window of successful calls
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1.0 / max(self.concurrency, 1.0))
+            if self.tpm and used_tokens is not None:
+                self.tpm.refund(estimated_tokens - used_tokens)
+            self._apply_headers(headers)
+
+    def record_error(self, error, attempt: int) -> float:
+        """Register a failed call and return the jittered backoff before the next attempt."""
+        status = getattr(error, "status_code", None)
+        response = getattr(error, "response", None)
+        headers = getattr(response, "headers", None)
+        overloaded = (status in self.OVERLOAD_STATUS or (status is not None and status >= 500)
+                      or self._is_timeout(error))
+
+        with self._lock:
+            retry_after = self._apply_headers(headers)
+            if overloaded:
+                self.overloads += 1
+                now = time.monotonic()
+                # Multiplicative decrease, at most once per backoff window so a burst
+                # of 429s from the same wave only halves concurrency once
+                if now - self.last_decrease > self.base_backoff:
+                    self.concurrency = max(float(self.min_concurrency), self.concurrency / 2.0)
+                    self.last_decrease = now
+
+        if retry_after is not None:
+            return retry_after + random.uniform(0, self.base_backoff)
+        if not overloaded:
+            # Bad requests, auth or connection errors: the provider is not asking us to slow down
+            return random.uniform(self.base_backoff / 2.0, self.base_backoff)
+        cap = min(self.max_backoff, self.base_backoff * (2 ** attempt))
+        return random.uniform(cap / 2.0, cap)
+
+    @staticmethod
+    def _is_timeout(error) -> bool:
+        """Client-side timeouts (TimeoutError, asyncio / httpx / openai timeout types)."""
+        return isinstance(error, (TimeoutError, asyncio.TimeoutError)) or "timeout" in type(error).__name__.lower()
+
+    def _apply_headers(self, headers):
+        """Block new requests until the provider's advertised reset time; return Retry-After if present."""
+        if not headers:
+            return None
+        retry_after = None
+        if headers.get("retry-after-ms") is not None:
+            retry_after = _parse_duration(headers.get("retry-after-ms") + "ms")
+        if retry_after is None:
+            retry_after = _parse_duration(headers.get("retry-after"))
+
+        block = retry_after or 0.0
+        for kind in ("requests", "tokens"):
+            remaining = headers.get(f"x-ratelimit-remaining-{kind}")
+            if remaining is not None and str(remaining).strip() in ("0", "0.0"):
+                block = max(block, _parse_duration(headers.get(f"x-ratelimit-reset-{kind}")) or 0.0)
+        if block > 0:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + block)
+        return retry_after
+
+    def summary(self) -> str:
+        return (f"Rate limiter: {self.successes} ok, {self.overloads} throttled/overloaded, "
+                f"settled concurrency {self._slots()}")
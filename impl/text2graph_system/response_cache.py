@@ -0,0 +1,106 @@
+import os
+import json
+import time
+import hashlib
+import sqlite3
+import threading
+
+class ResponseCache:
+    """
+    Persistent, content-addressed cache of raw LLM completions backed by SQLite.
+    Entries are keyed by a hash of everything that determines the response and
+    evicted least-recently-used first once the stored payload exceeds max_size_mb.
+    Hits only record their access time in memory; the times are written in one batch
+    on the next put, every TOUCH_BATCH hits and on close, so reads never commit.
+    """
+    TOUCH_BATCH = 256
+
+    def __init__(self, path: str, max_size_mb: float = 512):
+        self.path = path
+        self.max_bytes = int(max_size_mb * 1024 * 1024)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # key -> last access time not yet written to the database
+        self._touched = {}
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, response TEXT NOT NULL, "
+            "size INTEGER NOT NULL, last_access REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+        self.conn.commit()
+        self.total_bytes = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    @staticmethod
+    def make_key(model: str, base_url: str, messages: list, params: dict) -> str:
+        payload = json.dumps([model, base_url, messages, params], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        with self._lock:
+            row = self.conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._touched[key] = time.time()
+            if len(self._touched) >= self.TOUCH_BATCH:
+                self._flush_touches()
+                self.conn.commit()
+            return row[0]
+
+    def _flush_touches(self):
+        if self._touched:
+            self.conn.executemany("UPDATE responses SET last_access = ? WHERE key = ?",
+                                  [(t, key) for key, t in self._touched.items()])
+            self._touched.clear()
+
+    def put(self, key: str, response: str):
+        size = len(response.encode("utf-8"))
+        with self._lock:
+            # Eviction order must see recent hits
+            self._flush_touches()
+            old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, size, last_access) VALUES (?, ?, ?, ?)",
+                (key, response, size, time.time())
+            )
+            self.total_bytes += size - (old[0] if old else 0)
+            self._evict()
+            self.conn.commit()
+
+    def _evict(self):
+        """Drop least-recently-used entries until the cache fits in max_bytes."""
+        while self.total_bytes > self.max_bytes:
+            rows = self.conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_access ASC LIMIT 64"
+            ).fetchall()
+            if not rows:
+                self.total_bytes = 0
+                break
+            for key, size in rows:
+                self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.total_bytes -= size
+                if self.total_bytes <= self.max_bytes:
+                    break
+
+    def summary(self) -> str:
+        lookups = self.hits + self.misses
+        rate = self.hits / lookups if lookups else 0.0
+        return (f"LLM cache: {self.hits} hits, {self.misses} misses ({rate:.1%} hit rate), "
+                f"{self.total_bytes / 1024 / 1024:.1f} MB stored at {self.path}")
+
+    def close(self):
+        with self._lock:
+            if self.conn is None:
+                return
+            self._flush_touches()
+            self.conn.commit()
+            self.conn.close()
+            self.conn = None
@@ -0,0 +1,108 @@
+import re
+import math
+from collections import Counter, defaultdict
+from impl.text2graph_system.utils import schema_to_text
+
+def _stem(token: str) -> str:
+    """Very small English plural folding so 'countries' matches COUNTRY and 'rivers' matches RIVER."""
+    if len(token) > 4 and token.endswith("ies"):
+        return token[:-3] + "y"
+    if len(token) > 4 and token.endswith(("ses", "xes", "zes", "ches", "shes")):
+        return token[:-2]
+    if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+        return token[:-1]
+    return token
+
+def tokenize(text: str) -> list:
+    """Split identifiers and prose alike: CamelCase, snake_case and punctuation become lowercase stems."""
+    text = re.sub(r"([a-z0-9])([A-Z])", r"\1 \2", text)
+    return [_stem(t) for t in re.findall(r"[a-z0-9]+", text.lower())]
+
+
+class SchemaRetriever:
+    """
+    Local BM25 retrieval over schema elements.
+    Every vertex/edge label is indexed by its label, property names and (for edges)
+    endpoint labels; a question keeps the top-k matching elements plus their 1-hop
+    neighbourhood (endpoint vertices of kept edges, incident edges of kept vertices).
+    """
+    # Label tokens count this many times more than property/endpoint tokens
+    LABEL_BOOST = 3
+
+    def __init__(self, schema_json: dict, top_k: int = 8, k1: float = 1.2, b: float = 0.75):
+        self.items = schema_json["schema"]
+        self.top_k = top_k
+        self.k1 = k1
+        self.b = b
+
+        self.index = defaultdict(dict)  # token -> {item position: term frequency}
+        self.lengths = []
+        for pos, item in enumerate(self.items):
+            words = [p["name"] for p in item.get("properties", [])]
+            for pair in item.get("constraints", []):
+                words.extend(pair)
+            counts = Counter(t for w in words for t in tokenize(w))
+            for token in tokenize(item["label"]):
+                counts[token] += self.LABEL_BOOST
+            for token, tf in counts.items():
+                self.index[token][pos] = tf
+            self.lengths.append(sum(counts.values()))
+        self.avg_length = sum(self.lengths) / len(self.lengths) if self.lengths else 0.0
+
+        # Adjacency between schema elements for the 1-hop expansion
+        by_label = defaultdict(list)
+        for pos, item in enumerate(self.items):
+            by_label[(item["type"], item["label"])].append(pos)
+        self.neighbours = defaultdict(set)
+        for pos, item in enumerate(self.items):
+            if item["type"] != "EDGE":
+                continue
+            for pair in item.get("constraints", []):
+                for label in pair:
+                    for vpos in by_label.get(("VERTEX", label), []):
+                        self.neighbours[pos].add(vpos)
+                        self.neighbours[vpos].add(pos)
+
+        self._rendered = {}
+
+    def _idf(self, token: str) -> float:
+        df = len(self.index.get(token, ()))
+        n = len(self.items)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def score(self, question: str) -> dict:
+        scores = defaultdict(float)
+        for token in set(tokenize(question)):
+            postings = self.index.get(token)
+            if not postings:
+                continue
+            idf = self._idf(token)
+            for pos, tf in postings.items():
+                norm = self.k1 * (1 - self.b + self.b * self.lengths[pos] / self.avg_length)
+                scores[pos] += idf * tf * (self.k1 + 1) / (tf + norm)
+        return scores
+
+    def select(self, question: str):
+        """Positions of the schema elements kept for this question, or None for the full schema."""
+        scores = self.score(question)
+        if not scores:
+            return None
+        seeds = sorted(scores, key=lambda pos: (-scores[pos], pos))[:self.top_k]
+        selected = set(seeds)
+        for pos in seeds:
+            selected |= self.neighbours[pos]
+        return frozenset(selected)
+
+    def schema_text(self, question: str):
+        """Rendered (pruned) schema for the question; None when nothing matched."""
+        selected = self.select(question)
+        if selected is None:
+            return None
+        return self.render(selected)
+
+    def render(self, selected: frozenset) -> str:
+        """Schema text of the elements at the given positions, in schema order."""
+        if selected not in self._rendered:
+            subset = [item for pos, item in enumerate(self.items) if pos in selected]
+            self._rendered[selected] = schema_to_text({"schema": subset}).rstrip() + "\n"
+        return self._rendered[selected]
@@ -2,9 +2,12 @@ import json
 import argparse
 import os
 import sys
+from collections import Counter
 from impl.text2graph_system.qwen_zeroshot_system import QwenZeroshotSystem
 from impl.db_driver.tugraph_driver import TuGraphAdapter
-from impl.evaluation.metrics import ExecutionAccuracy, GoogleBleu, ExternalMetric
+from impl.db_driver.memory_graph_driver import InMemoryGraphAdapter
+from impl.evaluation.metrics import ExecutionAccuracy, GoogleBleu, ExternalMetric, load_query_validator
+from impl.evaluation.result_cache import GoldResultCache
 from impl.text2graph_system.utils import clean_query
 
 class PipelineRunner:
@@ -26,10 +29,106 @@ class PipelineRunner:
         """Initialize database connection"""
         # EA (Execution Accuracy) is now enabled
         eval_cfg = self.cfg["evaluation"]
+        if eval_cfg.get("db_backend", "tugraph") == "memory":
+            # Offline EA: load the import config's CSV files into the embedded engine
+            import_config = eval_cfg.get("import_config") or self.cfg["prediction"]["schema_path"]
+            print(f"Loading in-memory graph ({import_config})...")
+            self.db_driver = InMemoryGraphAdapter(import_config, data_dir=eval_cfg.get("import_data_dir"),
+                                                  max_rows=eval_cfg.get("max_rows"),
+                                                  cache_dir=eval_cfg.get("graph_cache_dir"),
+                                                  query_timeout=eval_cfg.get("query_timeout"),
+                                                  pool_size=eval_cfg.get("db_pool_size", 4))
+            self.db_driver.connect()
+            return
         print(f"Connecting to TuGraph ({eval_cfg['db_uri']})...")
-        self.db_driver = TuGraphAdapter(eval_cfg["db_uri"], eval_cfg["db_user"], eval_cfg["db_pass"])
+        self.db_driver = TuGraphAdapter(eval_cfg["db_uri"], eval_cfg["db_user"], eval_cfg["db_pass"],
+                                        pool_size=eval_cfg.get("db_pool_size", 8),
+                                        query_timeout=eval_cfg.get("query_timeout"),
+                                        max_rows=eval_cfg.get("max_rows"))
         self.db_driver.connect()
 
+    def _stream_path(self):
+        """JSONL sidecar that receives each prediction record as soon as it completes"""
+        data_cfg = self.cfg["data"]
+        return data_cfg.get("stream_path") or os.path.splitext(data_cfg["output_path"])[0] + ".jsonl"
+
+    def _iter_streamed_records(self, stream_path):
+        """Records of a previous (possibly interrupted) run, skipping a torn last line"""
+        if not os.path.exists(stream_path):
+            return
+        with open(stream_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    print(f"Warning: Skipping incomplete line in {stream_path}")
+
+    @staticmethod
+    def _encode_record(record) -> bytes:
+        return (json.dumps(record, ensure_ascii=False) + "\n").encode("utf-8")
+
+    def _resume_records(self, stream_path, keys):
+        """
+        Sidecar byte offsets, keyed like `keys`, of the records a previous run streamed.
+        The sidecar is rewritten with only those records, which drops a torn trailing line and
+        records whose position and instance_id no longer match the input; sidecars written
+        without positions are matched by instance_id, which is only safe when ids are unique.
+        """
+        valid = set(keys)
+        ids = Counter(instance_id for _, instance_id in keys)
+        position = {instance_id: i for i, instance_id in keys}
+        done = {}
+        stale = 0
+        staging = stream_path + ".tmp"
+        with open(staging, "wb") as out:
+            for record in self._iter_streamed_records(stream_path):
+                instance_id = record.get("instance_id")
+                if "_index" in record:
+                    key = (record["_index"], instance_id)
+                elif instance_id is not None and ids[instance_id] == 1:
+                    key = (position[instance_id], instance_id)
+                    record["_index"] = key[0]
+                else:
+                    key = None
+                if key in valid and key not in done:
+                    done[key] = out.tell()
+                    out.write(self._encode_record(record))
+                else:
+                    stale += 1
+        os.replace(staging, stream_path)
+        if stale:
+            print(f"Warning: Ignoring {stale} streamed records that do not match an input position/instance_id")
+        return done
+
+    @staticmethod
+    def _output_order(keys):
+        """Input keys in predict_batch's order: by the number ending the instance_id, ties in input order"""
+        try:
+            return sorted(keys, key=lambda key: int(str("0" if key[1] is None else key[1]).split("_")[-1]))
+        except ValueError:
+            return keys
+
+    def _predict_to_sidecar(self, raw_data, keys, done, stream_path):
+        """Predict the records not yet in `done`, appending each to the sidecar and its offset to `done`"""
+        # The sidecar stores each record's input position so resume can tell repeated ids apart
+        pending = [dict(item, _index=i) for i, item in enumerate(raw_data) if keys[i] not in done]
+
+        print("Initializing Text2Graph System...")
+        system = QwenZeroshotSystem(self.cfg["prediction"])
+
+        print(f"Running Prediction Batch ({len(pending)} records, streaming to {stream_path})...")
+        try:
+            with open(stream_path, "ab" if done else "wb") as stream:
+                def on_record(record):
+                    done[(record["_index"], record.get("instance_id"))] = stream.tell()
+                    stream.write(self._encode_record(record))
+                    stream.flush()
+
+                system.predict_batch(pending, on_record=on_record)
+        finally:
+            # Persists the response cache's pending LRU touches
+            system.close()
+
     def run_prediction_phase(self):
         """Execute prediction phase logic"""
         data_path = self.cfg["data"]["input_path"]
@@ -39,13 +138,29 @@ class PipelineRunner:
             print(f"Loading raw data from {data_path}...")
             with open(data_path, "r", encoding="utf-8") as f:
                 raw_data = json.load(f)
-            
-            print("Initializing Text2Graph System...")
-            system = QwenZeroshotSystem(self.cfg["prediction"])
-            
-            print("Running Prediction Batch...")
-            self.results = system.predict_batch(raw_data)
-            
+
+            stream_path = self._stream_path()
+            os.makedirs(os.path.dirname(stream_path) or ".", exist_ok=True)
+            # Records are keyed by (input position, instance_id): ids may repeat or be missing.
+            # Only their sidecar offsets are kept in memory until the output is consolidated.
+            keys = [(i, item.get("instance_id")) for i, item in enumerate(raw_data)]
+            done = {}
+            if self.cfg["pipeline"].get("resume", False):
+                done = self._resume_records(stream_path, keys)
+                print(f"Resuming: {len(done)} records already predicted in {stream_path}")
+            self._predict_to_sidecar(raw_data, keys, done, stream_path)
+            del raw_data
+
+            # Read the consolidated output back from the sidecar, in predict_batch's order
+            self.results = []
+            with open(stream_path, "rb") as stream:
+                for key in self._output_order(keys):
+                    if key in done:
+                        stream.seek(done[key])
+                        record = json.loads(stream.readline())
+                        record.pop("_index", None)
+                        self.results.append(record)
+
             os.makedirs(os.path.dirname(output_path), exist_ok=True)
             with open(output_path, "w", encoding="utf-8") as f:
                 json.dump(self.results, f, indent=2, ensure_ascii=False)
@@ -68,11 +183,32 @@ class PipelineRunner:
         eval_cfg = self.cfg["evaluation"]
 
         # 1. Initialize metrics
+        gold_cache = GoldResultCache(eval_cfg.get("gold_cache_path"),
+                                     max_rows=eval_cfg.get("max_rows"),
+                                     query_timeout=eval_cfg.get("query_timeout"))
+        # Persisted gold results are keyed by the backend in use and a fingerprint of the dataset
+        # behind it; an in-memory cache lives for one run against one dataset, so skip the hashing
+        if eval_cfg.get("gold_cache_path"):
+            backend = eval_cfg.get("db_backend", "tugraph")
+            namespace = backend if backend == "memory" else f"{backend}:{eval_cfg.get('db_uri')}"
+            fingerprint = eval_cfg.get("dataset_fingerprint") or gold_cache.dataset_fingerprint(
+                eval_cfg.get("import_config") or self.cfg["prediction"]["schema_path"], eval_cfg.get("import_data_dir"))
+            gold_cache.fingerprint = f"{namespace}|{fingerprint}"
+
+        # Optionally check predictions against the schema before sending them to the database
+        validator = None
+        if eval_cfg.get("prevalidate", False):
+            validator = load_query_validator(eval_cfg.get("import_config") or self.cfg["prediction"]["schema_path"])
+
         # EA is enabled, so we initialize ExecutionAccuracy using self.db_driver
-        ea_metric = ExecutionAccuracy(self.db_driver)
+        ea_metric = ExecutionAccuracy(self.db_driver, gold_cache,
+                                      use_fingerprints=eval_cfg.get("fingerprint_results", False),
+                                      full_diff=eval_cfg.get("full_diff_on_mismatch", False),
+                                      validator=validator)
         
         bleu_metric = GoogleBleu()
-        ext_metric = ExternalMetric(eval_cfg["dbgpt_root"])
+        ext_metric = ExternalMetric(eval_cfg["dbgpt_root"], isolated=eval_cfg.get("external_metric_worker", False),
+                                    gold_cache_path=eval_cfg.get("grammar_gold_cache_path"))
         
         levels = self.cfg["prediction"]["level_fields"]
 
@@ -81,6 +217,10 @@ class PipelineRunner:
             # We now pass ea_metric to the evaluation function
             self._evaluate_single_level(query_key, ea_metric, bleu_metric, ext_metric)
 
+        print(f"\n{gold_cache.summary()}")
+        gold_cache.close()
+        ext_metric.close()
+
     def _evaluate_single_level(self, query_key, ea_metric, bleu_metric, ext_metric):
         """Evaluate a single difficulty level and save detailed results"""
         print(f"\n{'='*40}")
@@ -101,8 +241,10 @@ class PipelineRunner:
         
         # --- Metric Calculation ---
         print("Calculating Execution Accuracy...")
-        # Computing EA
-        ea = ea_metric.compute(preds, golds, db_ids=[])
+        # Computing EA (aggregate plus per-instance verdicts for the detailed report)
+        ea_res = ea_metric.compute(preds, golds, db_ids=[],
+                                   keep_results=self.cfg["evaluation"].get("save_query_results", True))
+        ea = ea_res["accuracy"]
         
         print("Calculating Google BLEU...")
         bleu = bleu_metric.compute(preds, golds)
@@ -118,37 +260,52 @@ class PipelineRunner:
         print(f"  - Similarity : {ext_res['Similarity']:.4f}")
         print(f"  - BLEU       : {bleu if isinstance(bleu, str) else f'{bleu:.4f}'}")
 
+        verdict_counts = Counter(v["verdict"] for v in ea_res["verdicts"])
+        print(f"  - EA verdicts: {dict(verdict_counts)}")
+
         # --- Save Detailed Results ---
-        # Pass 'ea' to be saved
-        self._save_detailed_results(query_key, preds, golds, ea, bleu, ext_res)
+        # Pass the per-instance EA verdicts to be saved
+        self._save_detailed_results(query_key, preds, golds, ea_res["verdicts"], bleu, ext_res)
 
-    def _save_detailed_results(self, query_key, preds, golds, ea, bleu, ext_res):
+    def _save_detailed_results(self, query_key, preds, golds, verdicts, bleu, ext_res):
         """Save evaluation details to file"""
         # Fixed path separator for cross-platform compatibility
         output_dir = os.path.join("evaluation_detail", "execution_results")
         os.makedirs(output_dir, exist_ok=True)
 
+        # Per-item grammar / similarity when the external metric produced them, else the level mean
+        ext_items = ext_res.get("items", {})
         detailed_records = []
         for i, item in enumerate(self.results):
+            verdict = verdicts[i]
             record = {
                 "instance_id": item.get("id", i),
                 "gold_query": golds[i],
                 "pred_query": item.get(query_key, ""),
                 "cleaned_pred": preds[i],
                 "metrics": {
-                    "accuracy": ea,  # EA is now included
-                    "grammar": ext_res["Grammar"],
-                    "similarity": ext_res["Similarity"],
+                    "accuracy": 1 if verdict["verdict"] == "correct" else 0,
+                    "grammar": ext_items.get("Grammar", [ext_res["Grammar"]] * len(preds))[i],
+                    "similarity": ext_items.get("Similarity", [ext_res["Similarity"]] * len(preds))[i],
                     "google_bleu": float(bleu) if not isinstance(bleu, str) else bleu
                 },
-                "gold_result": None,
-                "pred_result": None
+                "verdict": verdict["verdict"],
+                "error": verdict["error"],
+                "gold_result": verdict.get("gold_result"),
+                "pred_result": verdict.get("pred_result")
             }
+            if verdict.get("truncated"):
+                record["truncated"] = True
+            if "diff" in verdict:
+                record["diff"] = verdict["diff"]
+            if verdict.get("validation"):
+                record["validation"] = verdict["validation"]
             detailed_records.append(record)
 
         save_path = os.path.join(output_dir, f"{query_key}_results.json")
         with open(save_path, "w", encoding="utf-8") as f:
-            json.dump(detailed_records, f, indent=2, ensure_ascii=False)
+            # default=str covers driver-specific values such as temporal types
+            json.dump(detailed_records, f, indent=2, ensure_ascii=False, default=str)
         print(f"Detailed results saved → {save_path}")
 
     def cleanup(self):
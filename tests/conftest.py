@@ -0,0 +1,15 @@
+import os
+import pytest
+from impl.db_driver.memory_graph_driver import InMemoryGraphAdapter
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GEOGRAPHY_CONFIG = os.path.join(ROOT, "example_data", "geography", "import_config.json")
+GEOGRAPHY_CORPUS = os.path.join(ROOT, "example_data", "geography", "geography_5_csv_files_08051006_corpus_seeds.json")
+
+
+@pytest.fixture(scope="session")
+def geography_db():
+    driver = InMemoryGraphAdapter(GEOGRAPHY_CONFIG, query_timeout=30)
+    driver.connect()
+    yield driver
+    driver.close()
@@ -0,0 +1,76 @@
+import csv
+import json
+import os
+from collections import Counter, defaultdict
+import pytest
+from impl.evaluation.fingerprint import ResultFingerprint
+from impl.evaluation.tugraph_eval import tugraph_eval_module
+from conftest import ROOT, GEOGRAPHY_CORPUS
+
+RowNormalizer = tugraph_eval_module("result_normalization").RowNormalizer
+GEOGRAPHY_DATA = os.path.join(ROOT, "example_data", "geography")
+# Row count and multiset hash of every corpus gold query on the geography data
+EXPECTED = os.path.join(ROOT, "tests", "data", "geography_gold_results.json")
+
+with open(GEOGRAPHY_CORPUS, "r", encoding="utf-8") as f:
+    CORPUS = {item["instance_id"]: item["gql_query"] for item in json.load(f)}
+
+
+def _csv(name):
+    with open(os.path.join(GEOGRAPHY_DATA, name), "r", encoding="utf-8", newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def _gold(geography_db, instance_id):
+    rows = geography_db.query(CORPUS[instance_id])
+    assert rows is not None
+    return rows
+
+
+@pytest.mark.parametrize("instance_id", sorted(CORPUS, key=lambda i: int(i.split("_")[1])))
+def test_corpus_gold_query_matches_expected(geography_db, instance_id):
+    with open(EXPECTED, "r", encoding="utf-8") as f:
+        expected = json.load(f)[instance_id]
+    rows = _gold(geography_db, instance_id)
+    fingerprint = ResultFingerprint.from_records(RowNormalizer().normalize(rows), tuple)
+    assert {"count": fingerprint.count, "hash": f"{fingerprint.total:032x}"} == expected
+
+
+# The queries below are also recomputed straight from the CSV files
+
+def test_rivers_into_pacific(geography_db):
+    pacific = {r["ocean_id"] for r in _csv("OCEAN.csv") if r["name"] == "Pacific Ocean"}
+    rivers = {r["river_id"]: r["name"] for r in _csv("RIVER.csv")}
+    expected = Counter(rivers[e["RIVER"]] for e in _csv("FlowsInto.csv") if e["destination"] in pacific)
+    assert Counter(r["r.name"] for r in _gold(geography_db, "instance_8")) == expected
+
+
+def test_small_provinces_by_area(geography_db):
+    provinces = [p for p in _csv("PROVINCE.csv")
+                 if p["population"] and p["area"] and int(p["population"]) < 1000000 and float(p["area"]) > 10000]
+    provinces.sort(key=lambda p: float(p["area"]))
+    assert [r["p.name"] for r in _gold(geography_db, "instance_9")] == [p["name"] for p in provinces]
+
+
+def test_cities_per_country(geography_db):
+    countries = {c["country_id"]: c["name"] for c in _csv("COUNTRY.csv")}
+    population = {c["city_id"]: int(c["population"]) if c["population"] else 0 for c in _csv("CITY.csv")}
+    expected = defaultdict(lambda: [0, 0])
+    for edge in _csv("LocatedIn_CITY_COUNTRY.csv"):
+        totals = expected[countries[edge["COUNTRY"]]]
+        totals[0] += 1
+        totals[1] += population[edge["CITY"]]
+    rows = _gold(geography_db, "instance_7")
+    assert [r["country_name"] for r in rows] == sorted(expected)
+    assert {r["country_name"]: [r["city_count"], r["total_population"]] for r in rows} == expected
+
+
+def test_round_half_away_from_zero(geography_db):
+    rows = geography_db.query("RETURN round(2.5) AS a, round(-2.5) AS b, round(-1.25, 1) AS c, round(-2.4) AS d")
+    assert rows == [{"a": 3.0, "b": -3.0, "c": -1.3, "d": -2.0}]
+
+
+def test_relationship_id_uses_schema_label_index(geography_db):
+    code = list(geography_db.graph.edges).index("FlowsInto")
+    rows = geography_db.query("MATCH (:RIVER)-[r:FlowsInto]->(:SEA) RETURN id(r) AS i LIMIT 1")
+    assert rows[0]["i"] >> 32 == code
@@ -0,0 +1,27 @@
+import pytest
+from impl.evaluation.metrics import ExecutionAccuracy
+
+
+@pytest.fixture
+def ea(geography_db):
+    return ExecutionAccuracy(geography_db)
+
+
+def _verdict(ea, pred, gold):
+    return ea.compute([pred], [gold])["verdicts"][0]["verdict"]
+
+
+def test_limit_without_order_rejects_other_label_and_column(ea):
+    assert _verdict(ea, "MATCH (r:RIVER) RETURN r.length LIMIT 5", "MATCH (c:COUNTRY) RETURN c.name LIMIT 5") == "incorrect"
+
+
+def test_limit_without_order_rejects_same_type_from_other_label(ea):
+    assert _verdict(ea, "MATCH (c:CITY) RETURN c.name LIMIT 5", "MATCH (c:COUNTRY) RETURN c.name LIMIT 5") == "incorrect"
+
+
+def test_limit_without_order_accepts_other_rows_of_the_gold_result(ea):
+    assert _verdict(ea, "MATCH (c:COUNTRY) RETURN c.name SKIP 3 LIMIT 5", "MATCH (c:COUNTRY) RETURN c.name LIMIT 5") == "correct"
+
+
+def test_limit_without_order_rejects_wrong_count(ea):
+    assert _verdict(ea, "MATCH (c:COUNTRY) RETURN c.name LIMIT 4", "MATCH (c:COUNTRY) RETURN c.name LIMIT 5") == "incorrect"
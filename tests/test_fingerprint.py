@@ -0,0 +1,38 @@
+from impl.evaluation.fingerprint import ResultFingerprint
+from impl.evaluation.tugraph_eval import tugraph_eval_module
+
+RowNormalizer = tugraph_eval_module("result_normalization").RowNormalizer
+
+
+def _fingerprint(records):
+    return ResultFingerprint.from_records(RowNormalizer().normalize(records), tuple)
+
+
+def test_integral_float_matches_int():
+    assert _fingerprint([{"x": 1}]) == _fingerprint([{"x": 1.0}])
+
+
+def test_bool_matches_int():
+    assert _fingerprint([{"x": True}, {"x": 0}]) == _fingerprint([{"x": 1}, {"x": False}])
+
+
+def test_different_values_differ():
+    assert _fingerprint([{"x": 1}]) != _fingerprint([{"x": 1.5}])
+    assert _fingerprint([{"x": 1}]) != _fingerprint([{"x": "1"}])
+
+
+def test_same_set_ignores_duplicates():
+    gold = _fingerprint([{"x": 1}, {"x": 2}])
+    pred = _fingerprint([{"x": 2}, {"x": 1}, {"x": 1.0}])
+    assert gold != pred
+    assert gold.same_set(pred)
+    assert not gold.same_set(_fingerprint([{"x": 1}, {"x": 3}]))
+
+
+def test_set_plan_verdict_matches_row_comparison(geography_db):
+    from impl.evaluation.metrics import ExecutionAccuracy
+    gold = "MATCH (c:COUNTRY) RETURN DISTINCT c.name"
+    pred = "MATCH (c:COUNTRY) RETURN c.name UNION ALL MATCH (c:COUNTRY) RETURN c.name"
+    verdicts = [ExecutionAccuracy(geography_db, use_fingerprints=fp).compute([pred], [gold])["verdicts"][0]["verdict"]
+                for fp in (False, True)]
+    assert verdicts == ["correct", "correct"]
@@ -0,0 +1,65 @@
+import json
+import pytest
+from impl.evaluation.metrics import load_query_validator
+from conftest import GEOGRAPHY_CONFIG, GEOGRAPHY_CORPUS
+
+
+@pytest.fixture(scope="module")
+def validator():
+    return load_query_validator(GEOGRAPHY_CONFIG)
+
+
+def _issue(validator, query, kind):
+    issue = validator.validate(query)
+    assert issue is not None and issue.kind == kind, issue
+    return issue
+
+
+def test_corpus_gold_queries_pass(validator):
+    with open(GEOGRAPHY_CORPUS, "r", encoding="utf-8") as f:
+        for item in json.load(f):
+            assert validator.validate(item["gql_query"]) is None, item["gql_query"]
+
+
+@pytest.mark.parametrize("query", [
+    "MATCH (r:RIVER)-[:FlowsInto]->(s:SEA) RETURN r.name, s.name",
+    "MATCH (s:SEA)-[:FlowsInto]-(r:RIVER) RETURN r.name",
+    "MATCH (s:SEA)<-[:FlowsInto]-(r:RIVER {name: 'Frank River'}) RETURN s",
+    "MATCH (c:COUNTRY) WITH c AS country RETURN country.name",
+])
+def test_accepted(validator, query):
+    assert validator.validate(query) is None
+
+
+def test_unknown_label(validator):
+    issue = _issue(validator, "MATCH (c:COUNTY) RETURN c", "error")
+    assert issue.reason == "Unknown label 'COUNTY'"
+
+
+def test_unknown_relationship_type(validator):
+    issue = _issue(validator, "MATCH (r:RIVER)-[:FLOWS_INTO]->(s:SEA) RETURN r", "error")
+    assert issue.reason == "Unknown relationship type 'FLOWS_INTO'"
+
+
+@pytest.mark.parametrize("query", [
+    "MATCH (r:RIVER) RETURN r.height",
+    "MATCH (r:RIVER {height: 100}) RETURN r",
+    "MATCH (r:RIVER) WITH r AS river WHERE river.height > 100 RETURN river",
+])
+def test_unknown_property(validator, query):
+    issue = _issue(validator, query, "error")
+    assert issue.reason == "Unknown property 'height' on RIVER"
+
+
+def test_wrong_edge_direction(validator):
+    issue = _issue(validator, "MATCH (s:SEA)-[:FlowsInto]->(r:RIVER) RETURN r.name", "empty")
+    assert issue.provably_empty
+    assert "FlowsInto" in issue.reason
+
+
+@pytest.mark.parametrize("query", [
+    "MATCH (s:SEA)-[:FlowsInto]->(r:RIVER) RETURN count(r)",
+    "MATCH (s:SEA) OPTIONAL MATCH (s)-[:FlowsInto]->(r:RIVER) RETURN s.name, r.name",
+])
+def test_wrong_direction_may_still_return_rows(validator, query):
+    assert not _issue(validator, query, "empty").provably_empty
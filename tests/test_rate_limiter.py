@@ -0,0 +1,147 @@
+from email.utils import format_datetime
+from datetime import datetime, timezone
+import pytest
+from impl.text2graph_system import rate_limiter
+from impl.text2graph_system.rate_limiter import RateLimiter, TokenBucket, _parse_duration
+
+START = 1_700_000_000.0
+
+
+class FakeClock:
+    """Stands in for the time module: monotonic and wall clocks advance only through sleep()."""
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        return START + self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class LowRandom:
+    """Jitter always picks the low end of its range."""
+    @staticmethod
+    def uniform(low, high):
+        return low
+
+
+class ApiError(Exception):
+    def __init__(self, status_code=None, headers=None):
+        self.status_code = status_code
+        self.response = type("Response", (), {"headers": headers})()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    monkeypatch.setattr(rate_limiter, "random", LowRandom)
+    return clock
+
+
+def test_bucket_refills_per_minute(clock):
+    bucket = TokenBucket(60)
+    assert bucket.reserve(60) == 0.0
+    assert bucket.reserve(1) == pytest.approx(1.0)
+    clock.sleep(3.0)
+    assert bucket.reserve(1) == 0.0
+    # Refunds never raise the budget above capacity
+    clock.sleep(120.0)
+    bucket.reserve(0)
+    bucket.refund(100)
+    assert bucket.tokens == 60
+
+
+def test_rpm_and_tpm_budgets_delay_acquire(clock):
+    limiter = RateLimiter(rpm=2, tpm=600)
+    limiter.acquire(tokens=300)
+    limiter.release()
+    limiter.acquire(tokens=300)
+    limiter.release()
+    assert clock.sleeps == []
+    # Both budgets are spent: one request every 30s, 10 tokens per second
+    limiter.acquire(tokens=300)
+    limiter.release()
+    assert clock.sleeps == [pytest.approx(30.0)]
+
+
+def test_unused_tokens_are_refunded(clock):
+    limiter = RateLimiter(tpm=600)
+    assert limiter._reserve(600) == 0.0
+    limiter.record_success(estimated_tokens=600, used_tokens=300)
+    assert limiter._reserve(300) == 0.0
+    assert limiter._reserve(60) == pytest.approx(6.0)
+
+
+def test_additive_increase(clock):
+    limiter = RateLimiter(initial_concurrency=4, max_concurrency=5)
+    for _ in range(4):
+        limiter.record_success()
+    assert limiter._slots() == 4
+    limiter.record_success()
+    assert limiter._slots() == 5
+    for _ in range(20):
+        limiter.record_success()
+    assert limiter.concurrency == 5
+
+
+def test_overload_halves_once_per_backoff_window(clock):
+    limiter = RateLimiter(initial_concurrency=16, base_backoff=1.0, max_backoff=60.0)
+    clock.sleep(10.0)
+    assert limiter.record_error(ApiError(429), attempt=0) == 0.5
+    assert limiter.concurrency == 8
+    # The rest of the same wave of 429s
+    limiter.record_error(ApiError(429), attempt=0)
+    assert limiter.concurrency == 8
+    clock.sleep(1.5)
+    assert limiter.record_error(ApiError(503), attempt=3) == 4.0
+    assert limiter.concurrency == 4
+    clock.sleep(1.5)
+    limiter.record_error(TimeoutError(), attempt=10)
+    assert limiter.concurrency == 2
+    assert limiter.overloads == 4
+
+
+def test_other_errors_keep_concurrency(clock):
+    limiter = RateLimiter(initial_concurrency=16, base_backoff=2.0)
+    clock.sleep(10.0)
+    assert limiter.record_error(ApiError(400), attempt=5) == 1.0
+    assert limiter.concurrency == 16
+    assert limiter.overloads == 0
+
+
+@pytest.mark.parametrize("value, seconds", [
+    ("20", 20.0), ("1.5", 1.5), ("-3", 0.0), ("250ms", 0.25), ("6m0s", 360.0), ("1h2m3.5s", 3723.5),
+    ("soon", None), ("6m0", None), (None, None),
+])
+def test_parse_duration(clock, value, seconds):
+    assert _parse_duration(value) == seconds
+
+
+def test_parse_http_date(clock):
+    date = format_datetime(datetime.fromtimestamp(START + 30, tz=timezone.utc), usegmt=True)
+    assert _parse_duration(date) == pytest.approx(30.0)
+
+
+def test_retry_after_ms_blocks_new_requests(clock):
+    limiter = RateLimiter(base_backoff=1.0)
+    clock.sleep(10.0)
+    error = ApiError(429, {"retry-after-ms": "1500", "retry-after": "9"})
+    assert limiter.record_error(error, attempt=0) == 1.5
+    assert limiter._reserve(0) == pytest.approx(1.5)
+    clock.sleep(1.5)
+    assert limiter._reserve(0) == 0.0
+
+
+def test_rate_limit_reset_headers_block_only_when_exhausted(clock):
+    limiter = RateLimiter()
+    limiter.record_success({"x-ratelimit-remaining-requests": "5", "x-ratelimit-reset-requests": "6m0s"})
+    assert limiter._reserve(0) == 0.0
+    limiter.record_success({"x-ratelimit-remaining-tokens": "0", "x-ratelimit-reset-tokens": "6m0s"})
+    assert limiter._reserve(0) == pytest.approx(360.0)
@@ -0,0 +1,67 @@
+import json
+import pytest
+import run_pipeline
+
+
+class Interrupted(Exception):
+    pass
+
+
+class FakeSystem:
+    """Predicts "<id>@<position>" for every record and can be killed after a number of records."""
+    fail_after = None
+    seen = []
+
+    def __init__(self, config):
+        pass
+
+    def predict_batch(self, data, on_record=None):
+        for n, item in enumerate(reversed(data)):
+            if n == FakeSystem.fail_after:
+                raise Interrupted()
+            FakeSystem.seen.append(item["_index"])
+            on_record(dict(item, pred=f"{item['instance_id']}@{item['_index']}"))
+        return []
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def runner(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_pipeline, "QwenZeroshotSystem", FakeSystem)
+    ids = ["instance_3", "instance_1", "instance_2", "instance_1", "instance_0", "instance_2"]
+    with open(tmp_path / "input.json", "w", encoding="utf-8") as f:
+        json.dump([{"instance_id": i} for i in ids], f)
+    config = {
+        "data": {"input_path": str(tmp_path / "input.json"), "output_path": str(tmp_path / "out" / "result.json")},
+        "pipeline": {"run_prediction": True, "resume": True},
+        "prediction": {},
+    }
+    with open(tmp_path / "config.json", "w", encoding="utf-8") as f:
+        json.dump(config, f)
+    FakeSystem.seen = []
+    return run_pipeline.PipelineRunner(str(tmp_path / "config.json"))
+
+
+def test_resume_after_interrupted_run(runner, tmp_path):
+    FakeSystem.fail_after = 3
+    with pytest.raises(Interrupted):
+        runner.run_prediction_phase()
+    assert FakeSystem.seen == [5, 4, 3]
+    # A record torn by the kill
+    with open(tmp_path / "out" / "result.jsonl", "a", encoding="utf-8") as f:
+        f.write('{"instance_id": "instance_2", "_ind')
+
+    FakeSystem.fail_after = None
+    FakeSystem.seen = []
+    runner.run_prediction_phase()
+    assert sorted(FakeSystem.seen) == [0, 1, 2]
+
+    expected = [("instance_0", 4), ("instance_1", 1), ("instance_1", 3), ("instance_2", 2), ("instance_2", 5),
+                ("instance_3", 0)]
+    with open(tmp_path / "out" / "result.json", "r", encoding="utf-8") as f:
+        output = json.load(f)
+    assert [record["pred"] for record in output] == [f"{i}@{position}" for i, position in expected]
+    assert all("_index" not in record for record in output)
+    assert output == runner.results
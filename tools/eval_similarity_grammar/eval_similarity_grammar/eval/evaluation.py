@@ -5,14 +5,14 @@ import importlib
 import json
 import prettytable as pt
 from evaluator.evaluator import Evaluator
-from evaluator.similarity_evaluator import SimilarityEvaluator
+from metric_engine import MetricEngine
 from tqdm import tqdm
 
 # print(f"{os.path.dirname(os.path.abspath(__file__))}/evaluator/impl/tugraph-db")
 # sys.path.append(f"{os.path.dirname(os.path.abspath(__file__))}/evaluator/impl/tugraph-db")
 
 
-def evaluate(gold, predict, etype, impl):
+def evaluate(gold, predict, etype, impl, servers=2, workers=1, gold_cache=None):
     log_file = open(f"{os.path.dirname(__file__)}/../output/logs/eval.log", "w")
     log_lines = []
 
@@ -51,26 +51,12 @@ def evaluate(gold, predict, etype, impl):
     ), "number of predicted queries and gold standard queries must equal"
 
     score_total = 0
-    if etype == "similarity":
-        # jaro-winkler distance score
-        evaluator = SimilarityEvaluator()
-    elif etype == "grammar":
-        # grammar check result, 1 if pass, 0 if fail
-        model_path = f"evaluator.impl.{impl}.grammar_evaluator"
-        m = importlib.import_module(model_path)
-        GrammarEvaluator = getattr(m, "GrammarEvaluator")
-        evaluator = GrammarEvaluator()
-    elif etype == "execution":
-        # excution result, 1 if same, 0 if not same
-        model_path = f"evaluator.impl.{impl}.execution_evaluator"
-        m = importlib.import_module(model_path)
-        ExecutionEvaluator = getattr(m, "ExecutionEvaluator")
-        evaluator = ExecutionEvaluator()
-
     total = 0
+    items = list(zip(pseq_one, gseq_one, db_id_list))
+    # scores come back in input order, also when sharded across worker processes
+    scores = MetricEngine(gold_cache).iter_scores(etype, impl, items, workers=workers, pool_size=servers)
     pbar = tqdm(range(len(gseq_one)), desc="Evaluating")
-    for i in pbar:
-        score = evaluator.evaluate(pseq_one[i], gseq_one[i], db_id_list[i])
+    for i, score in zip(pbar, scores):
         # if score != -1:
         #     score_total += score
         #     total += 1
@@ -124,10 +110,31 @@ if __name__ == "__main__":
         default="tugraph-analytics",
         help="implementation folder for grammar evaluator",
     )
+    parser.add_argument(
+        "--servers",
+        dest="servers",
+        type=int,
+        default=2,
+        help="number of predict servers the execution evaluator runs queries on in parallel",
+    )
+    parser.add_argument(
+        "--workers",
+        dest="workers",
+        type=int,
+        default=1,
+        help="number of processes grammar / similarity scoring is sharded across",
+    )
+    parser.add_argument(
+        "--gold_cache",
+        dest="gold_cache",
+        type=str,
+        default=None,
+        help="sqlite file remembering which gold queries parse, reused across runs",
+    )
     args = parser.parse_args()
 
     # Print args
     print(f"params as fllows \n {args}")
 
     # Second, evaluate the predicted GQL queries
-    evaluate(args.gold, args.input, args.etype, args.impl)
\ No newline at end of file
+    evaluate(args.gold, args.input, args.etype, args.impl, args.servers, args.workers, args.gold_cache)
\ No newline at end of file
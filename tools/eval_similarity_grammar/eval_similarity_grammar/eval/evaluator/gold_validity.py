@@ -0,0 +1,83 @@
+import os
+import json
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class GoldValidityCache:
+    """
+    Remembers whether a gold query parses, so a gold query scored at every difficulty level
+    is parsed once. Entries live in an in-memory LRU and, when a path is given, in SQLite
+    so later runs (and other worker processes) reuse them. Keys combine a grammar namespace
+    with the exact query text.
+    """
+    def __init__(self, namespace: str, path: str = None, max_entries: int = 4096):
+        self.namespace = namespace
+        self.path = path
+        self.max_entries = max_entries
+        self.memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self.conn = None
+
+        if path:
+            if os.path.dirname(path):
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+            self.conn.execute("CREATE TABLE IF NOT EXISTS gold_validity (key TEXT PRIMARY KEY, valid INTEGER NOT NULL)")
+            self.conn.commit()
+
+    def _key(self, query: str) -> str:
+        return hashlib.sha256(json.dumps([self.namespace, query]).encode("utf-8")).hexdigest()
+
+    def _remember(self, key, valid):
+        self.memory[key] = valid
+        self.memory.move_to_end(key)
+        if len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, query: str):
+        """True / False for a query seen before, None otherwise."""
+        key = self._key(query)
+        with self._lock:
+            valid = self.memory.get(key)
+            if valid is not None:
+                self.memory.move_to_end(key)
+            elif self.conn is not None:
+                row = self.conn.execute("SELECT valid FROM gold_validity WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    valid = bool(row[0])
+                    self._remember(key, valid)
+            if valid is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return valid
+
+    def put(self, query: str, valid: bool):
+        key = self._key(query)
+        with self._lock:
+            self._remember(key, valid)
+            if self.conn is not None:
+                self.conn.execute("INSERT OR REPLACE INTO gold_validity (key, valid) VALUES (?, ?)", (key, int(valid)))
+                self.conn.commit()
+
+    def lookup(self, query: str, parse) -> bool:
+        """Cached validity of query, calling parse(query) (which raises on a syntax error) on a miss."""
+        valid = self.get(query)
+        if valid is None:
+            try:
+                parse(query)
+                valid = True
+            except Exception:
+                valid = False
+            self.put(query, valid)
+        return valid
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
@@ -9,6 +9,10 @@ sys.path.append(os.path.dirname(__file__))
 from GQLLexer import GQLLexer
 from GQLParser import GQLParser
 
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+from gold_validity import GoldValidityCache
+from two_stage_parse import parse_two_stage
+
 
 class MyErrorListener(ErrorListener):
     def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
@@ -18,30 +22,29 @@ class MyErrorListener(ErrorListener):
 
 
 class GrammarEvaluator:
-    def evaluate(self, query_predict, query_gold):
+    def __init__(self, gold_cache_path=None):
+        # gold queries repeat across difficulty levels, so their validity is parsed once
+        self.gold_cache = GoldValidityCache("iso-gql", gold_cache_path)
+
+    def _parse(self, query):
         error_listener = MyErrorListener()
+        input_stream = InputStream(query)
+        lexer = GQLLexer(input_stream)
+        lexer.removeErrorListeners()
+        lexer.addErrorListener(error_listener)
+        stream = CommonTokenStream(lexer)
+        parser = GQLParser(stream)
+        # SLL first, full LL only when SLL rejects: same verdicts, most queries parse in one fast pass
+        return parse_two_stage(parser, "gqlProgram", error_listener)
+
+    def evaluate(self, query_predict, query_gold, db_id=None, gold_valid=None):
+        """1 if the prediction parses, 0 if not, -1 if the gold query does not; gold_valid skips the gold check."""
+        if gold_valid is None:
+            gold_valid = self.gold_cache.lookup(query_gold, self._parse)
+        if not gold_valid:
+            return -1
         try:
-            input_stream = InputStream(query_gold)
-            lexer = GQLLexer(input_stream)
-            lexer.removeErrorListeners()
-            lexer.addErrorListener(error_listener)
-            stream = CommonTokenStream(lexer)
-            parser = GQLParser(stream)
-            parser.removeErrorListeners()
-            parser.addErrorListener(error_listener)
-            tree = parser.gqlProgram()
-            try:
-                input_stream = InputStream(query_predict)
-                lexer = GQLLexer(input_stream)
-                lexer.removeErrorListeners()
-                lexer.addErrorListener(error_listener)
-                stream = CommonTokenStream(lexer)
-                parser = GQLParser(stream)
-                parser.removeErrorListeners()
-                parser.addErrorListener(error_listener)
-                tree = parser.gqlProgram()
-                return 1
-            except Exception as e:
-                return 0
+            tree = self._parse(query_predict)
+            return 1
         except Exception as e:
-            return -1
+            return 0
@@ -1,9 +1,15 @@
 import jpype
+import sys
 import os.path
 
+sys.path.append(os.path.join(os.path.dirname(__file__), "..", ".."))
+from gold_validity import GoldValidityCache
+
 
 class GrammarEvaluator:
-    def __init__(self):
+    def __init__(self, gold_cache_path=None):
+        # gold queries repeat across difficulty levels, so their validity is parsed once
+        self.gold_cache = GoldValidityCache("geaflow-dsl", gold_cache_path)
         jvmPath = jpype.getDefaultJVMPath()
 
         # gql grammar paerser from tugraph-analytics https://github.com/TuGraph-family/tugraph-analytics/tree/master/geaflow/geaflow-dsl/geaflow-dsl-parser/src/main/java/com/antgroup/geaflow/dsl/parser
@@ -16,13 +22,14 @@ class GrammarEvaluator:
         JDClass = jpype.JClass("com.antgroup.geaflow.dsl.parser.GeaFlowDSLParser")
         self.jd = JDClass()
 
-    def evaluate(self, query_predict, query_gold, db_id):
-        try:
-            result_gold = self.jd.parseStatement(query_gold)
-            try:
-                result_predict = self.jd.parseStatement(query_predict)
-                return 1
-            except jpype.JException as e_query:
-                return 0
-        except jpype.JException as e_gold:
+    def evaluate(self, query_predict, query_gold, db_id=None, gold_valid=None):
+        """1 if the prediction parses, 0 if not, -1 if the gold query does not; gold_valid skips the gold check."""
+        if gold_valid is None:
+            gold_valid = self.gold_cache.lookup(query_gold, self.jd.parseStatement)
+        if not gold_valid:
             return -1
+        try:
+            result_predict = self.jd.parseStatement(query_predict)
+            return 1
+        except jpype.JException as e_query:
+            return 0
@@ -0,0 +1,47 @@
+import sys
+import os.path
+from antlr4 import InputStream, CommonTokenStream
+from antlr4.error.ErrorListener import ErrorListener
+
+sys.path.append(os.path.dirname(__file__))
+from LcypherLexer import LcypherLexer
+from LcypherParser import LcypherParser
+
+
+class RaisingErrorListener(ErrorListener):
+    def syntaxError(self, recognizer, offendingSymbol, line, column, msg, e):
+        raise Exception("ERROR: when parsing line %d column %d: %s\n" % (line, column, msg))
+
+
+def parse_cypher(query: str):
+    """oC_Cypher parse tree of query; raises on the first syntax error."""
+    error_listener = RaisingErrorListener()
+    lexer = LcypherLexer(InputStream(query))
+    lexer.removeErrorListeners()
+    lexer.addErrorListener(error_listener)
+    parser = LcypherParser(CommonTokenStream(lexer))
+    parser.removeErrorListeners()
+    parser.addErrorListener(error_listener)
+    return parser.oC_Cypher()
+
+
+def find_all(ctx, cls):
+    """Every descendant of ctx (including ctx) that is an instance of cls, in document order."""
+    found = []
+    stack = [ctx]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, cls):
+            found.append(node)
+        children = getattr(node, "children", None)
+        if children:
+            stack.extend(reversed(children))
+    return found
+
+
+def symbol_text(ctx) -> str:
+    """Name of a label / type / variable / property key, without escaping backticks."""
+    text = ctx.getText().strip()
+    if len(text) >= 2 and text[0] == text[-1] == "`":
+        return text[1:-1]
+    return text
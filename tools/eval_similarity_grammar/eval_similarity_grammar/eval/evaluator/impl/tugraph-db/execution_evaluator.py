@@ -4,161 +4,287 @@ import os.path
 import os
 import ctypes
 import subprocess
+import shutil
+import threading
+import queue
 import time
 import json
-import signal
 import jaro
-from neo4j import GraphDatabase
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+from neo4j import GraphDatabase, READ_ACCESS
+from neo4j.exceptions import ServiceUnavailable, SessionExpired
+
+sys.path.append(os.path.dirname(__file__))
+from result_comparator import ResultComparator
 
 current_dir = os.path.dirname(__file__)
 
-def handle_timeout(sig, frame):
-        raise TimeoutError('took too long')
+# Seconds a predicted query may run before the server is considered stuck
+QUERY_TIMEOUT = 10
+# Seconds to wait for a (re)started server to accept bolt connections
+READY_TIMEOUT = 120
+# Restart attempts before a quarantined predict server is given up
+RECOVERY_ATTEMPTS = 3
+# Pool server i listens on these ports + i (the template keeps 7075/9095/9094)
+POOL_HTTP_PORT = 7100
+POOL_RPC_PORT = 9300
+POOL_BOLT_PORT = 9200
+
+
+class TuGraphServer:
+    """One lgraph_server instance under ./server/<name>, reached through a thread-safe driver."""
+    def __init__(self, name, log):
+        self.name = name
+        self.log = log
+        self.home = f"{current_dir}/server/{name}"
+        with open(f"{self.home}/lgraph_standalone.json") as f:
+            self.url = f"bolt://localhost:{json.load(f)['bolt_port']}"
+        self.driver = None
+        # Popen of a start.sh running in the background, until the server is probed ready
+        self.starting = None
+
+    def import_dataset(self, dataset):
+        subprocess.run([
+            'sh',
+            f'{current_dir}/datasets/{dataset}/import.sh',
+            f'{self.home}/lgraph_db', f'{dataset}'
+        ], stdout=self.log, stderr=self.log, close_fds=True)
+
+    def start(self):
+        """Launch start.sh without waiting; wait_ready() connects once the server is up."""
+        old, self.driver = self.driver, None
+        # The scripts locate their directory through BASH_SOURCE, so they need bash, not sh
+        self.starting = subprocess.Popen(['bash', f'{self.home}/start.sh'],
+                                         stdout=self.log, stderr=self.log, close_fds=True)
+        # Closed after start.sh has been launched, since a stuck query may still hold a connection
+        self._close_driver(old)
+
+    def wait_ready(self, timeout=READY_TIMEOUT):
+        """Poll verify_connectivity with exponential backoff instead of sleeping a fixed time."""
+        if self.starting is not None:
+            # start.sh returns as soon as lgraph_server has daemonized
+            self.starting.wait()
+            self.starting = None
+        if self.driver is not None:
+            return True
+        driver = GraphDatabase.driver(self.url, auth=("admin", "73@TuGraph"))
+        deadline = time.monotonic() + timeout
+        delay = 0.05
+        while True:
+            try:
+                driver.verify_connectivity()
+                break
+            except Exception as e:
+                if time.monotonic() + delay > deadline:
+                    logging.debug(f"{self.name} not ready after {timeout}s: {e}")
+                    self._close_driver(driver)
+                    return False
+                time.sleep(delay)
+                delay = min(delay * 2, 2.0)
+        self.driver = driver
+        return True
+
+    def run(self, dataset, query):
+        """
+        Run query in a read-only transaction that is always rolled back, so a predicted
+        CREATE/SET/DELETE cannot change the data seen by later queries.
+        """
+        with self.driver.session(database=dataset, default_access_mode=READ_ACCESS) as session:
+            tx = session.begin_transaction()
+            try:
+                return tx.run(query).data()
+            finally:
+                # Never committed: close() rolls back (and is a no-op once the server failed it)
+                tx.close()
+
+    @staticmethod
+    def _close_driver(driver):
+        if driver is not None:
+            try:
+                driver.close()
+            except Exception as e:
+                logging.debug(e)
+
+    def stop(self):
+        old, self.driver = self.driver, None
+        self._close_driver(old)
+        subprocess.run(['bash', f'{self.home}/stop.sh'], stdout=self.log, stderr=self.log, close_fds=True)
+
+
+class PredictServerPool:
+    """
+    K predict servers generated from the server/server_predict template, each with its own
+    ports and data directory. Idle servers wait in a queue; a query takes one, runs on that
+    server's own runner thread and returns it. A server that hangs past QUERY_TIMEOUT or
+    drops its connection is quarantined and restarted in the background while the rest
+    keep serving.
+    """
+    def __init__(self, size, log, template="server_predict"):
+        self.log = log
+        self.servers = [TuGraphServer(self._generate(template, i), log) for i in range(size)]
+        self.idle = queue.Queue()
+        self.runners = {}
+        # Servers not given up on (serving, idle or recovering)
+        self.alive = size
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def _generate(template, index):
+        """Copy the template's scripts into server/pool/predict_<index> with distinct ports."""
+        name = f"pool/predict_{index}"
+        source = f"{current_dir}/server/{template}"
+        target = f"{current_dir}/server/{name}"
+        os.makedirs(target, exist_ok=True)
+        for script in ("start.sh", "stop.sh"):
+            shutil.copyfile(f"{source}/{script}", f"{target}/{script}")
+        with open(f"{source}/lgraph_standalone.json") as f:
+            config = json.load(f)
+        config["port"] = POOL_HTTP_PORT + index
+        config["rpc_port"] = POOL_RPC_PORT + index
+        config["bolt_port"] = str(POOL_BOLT_PORT + index)
+        with open(f"{target}/lgraph_standalone.json", "w") as f:
+            json.dump(config, f, indent=2)
+        return name
+
+    def start(self):
+        for server in self.servers:
+            server.start()
+        for server in self.servers:
+            if not server.wait_ready():
+                raise RuntimeError(f"TuGraph server {server.name} did not become ready at {server.url}")
+            self.runners[server.name] = ThreadPoolExecutor(max_workers=1)
+            self.idle.put(server)
+
+    def stop(self):
+        for server in self.servers:
+            server.stop()
+
+    def _acquire(self):
+        while True:
+            try:
+                return self.idle.get(timeout=1)
+            except queue.Empty:
+                if self.alive == 0:
+                    raise RuntimeError("all predict servers failed to restart")
+
+    def run(self, dataset, query, timeout=QUERY_TIMEOUT):
+        server = self._acquire()
+        future = self.runners[server.name].submit(server.run, dataset, query)
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeout:
+            self.quarantine(server)
+            raise TimeoutError('took too long')
+        except (ServiceUnavailable, SessionExpired, ConnectionError):
+            self.quarantine(server)
+            raise
+        except Exception:
+            self.idle.put(server)
+            raise
+        self.idle.put(server)
+        return result
+
+    def quarantine(self, server):
+        """Take server out of rotation and restart it on a background thread."""
+        print(f"Quarantining predict server {server.name} ({server.url}), restarting it")
+        # The runner may stay blocked on the dead connection; it is replaced, not joined
+        self.runners.pop(server.name).shutdown(wait=False)
+        threading.Thread(target=self._recover, args=(server,), daemon=True).start()
+
+    def _recover(self, server):
+        for attempt in range(RECOVERY_ATTEMPTS):
+            try:
+                server.start()
+                if server.wait_ready():
+                    self.runners[server.name] = ThreadPoolExecutor(max_workers=1)
+                    self.idle.put(server)
+                    return
+            except Exception as e:
+                logging.debug(e)
+        print(f"Predict server {server.name} did not come back after {RECOVERY_ATTEMPTS} restarts")
+        with self.lock:
+            self.alive -= 1
 
-signal.signal(signal.SIGALRM, handle_timeout)
 
 class ExecutionEvaluator:
-    def __init__(self):
+    def __init__(self, pool_size=2):
         self.log = open('./exc_eval.log', 'w+')
-        # import datasets to 2 different data folder
+        # picks list / multiset / set / size semantics from the gold query
+        self.comparator = ResultComparator()
+        self.pool_size = max(1, pool_size)
+        self.gold = TuGraphServer('server_gold', self.log)
+        self.pool = PredictServerPool(self.pool_size, self.log)
+        servers = [self.gold] + self.pool.servers
+
+        # import datasets to the gold server and every predict server
         dataset_list = os.listdir(f"{current_dir}/datasets")
         self.dataset_list = dataset_list
         try:
             # iterate through all dataset folder under ./datasets
             for dataset in dataset_list:
-                # import data to data folder for ground truth with cli command
-                self.process = subprocess.run([
-                    'sh',
-                    f'{current_dir}/datasets/{dataset}/import.sh',
-                    f'{current_dir}/server/server_gold/lgraph_db', f'{dataset}'
-                ], stdout=self.log, stderr=self.log, close_fds=True)
-
-                # import data to data folder for predicted result with cli command
-                self.process = subprocess.run([
-                    'sh',
-                    f'{current_dir}/datasets/{dataset}/import.sh',
-                    f'{current_dir}/server/server_predict/lgraph_db', f'{dataset}'
-                ], stdout=self.log, stderr=self.log, close_fds=True)
+                for server in servers:
+                    server.import_dataset(dataset)
         except Exception as e:
             logging.debug(e)
 
-        # start 2 seperate tugraph-db server
+        # start all tugraph-db server, then wait until each one answers
         try:
-            # start server for ground truth with cli command
-            self.process = subprocess.run([
-                'sh',
-                f'{current_dir}/server/server_gold/start.sh'
-            ], stdout=self.log, stderr=self.log, close_fds=True)
-            time.sleep(10)
-
-            # start server for predcited result with cli command
-            self.process = subprocess.run([
-                'sh',
-                f'{current_dir}/server/server_predict/start.sh'
-            ], stdout=self.log, stderr=self.log, close_fds=True)
-            time.sleep(10)
+            self.gold.start()
         except Exception as e:
             logging.debug(e)
-
-        # setup driver for ground truth
-        self.url_gold = f"bolt://localhost:9092"
-        self.driver_gold = GraphDatabase.driver(self.url_gold, auth=("admin", "73@TuGraph"))
-        self.driver_gold.verify_connectivity()
-
-        # setup driver for predicted result
-        self.url_predict = f"bolt://localhost:9094"
-        self.driver_predict = GraphDatabase.driver(self.url_predict, auth=("admin", "73@TuGraph"))
-        self.driver_predict.verify_connectivity()
-
-        self.session_pool = {}
-        for dataset in self.dataset_list:
-            self.session_pool[dataset] = []
-            self.session_pool[dataset].append(self.driver_gold.session(database=dataset))
-            self.session_pool[dataset].append(self.driver_predict.session(database=dataset))
+        self.pool.start()
+        if not self.gold.wait_ready():
+            raise RuntimeError(f"TuGraph server {self.gold.name} did not become ready at {self.gold.url}")
 
     def __del__(self):
-        # stop 2 seperate tugraph-db server
+        # stop all tugraph-db server
         try:
-            # stop server for ground truth with cli command
-            self.process = subprocess.run([
-                'sh',
-                f'{current_dir}/server/server_gold/stop.sh'
-            ], stdout=self.log, stderr=self.log, close_fds=True)
-
-            # stop server for predicted result with cli command
-            self.process = subprocess.run([
-                'sh',
-                f'{current_dir}/server/server_predict/stop.sh'
-            ], stdout=self.log, stderr=self.log, close_fds=True)
+            self.gold.stop()
+            self.pool.stop()
         except Exception as e:
             logging.debug(e)
-    
-    def restart_predict_server(self):
+
+    def _run_gold(self, db_id, query):
+        """Rows of query on the gold server, or None if it fails (the comparator then falls back)."""
         try:
-            # restart server for predicted result with cli command
-            self.process = subprocess.run([
-                'sh',
-                f'{current_dir}/server/server_predict/start.sh'
-            ], stdout=self.log, stderr=self.log, close_fds=True)
-            time.sleep(10)
-
-            # setup driver for predicted result
-            self.driver_predict = GraphDatabase.driver(self.url_predict, auth=("admin", "73@TuGraph"))
-            self.driver_predict.verify_connectivity()
-            for dataset in self.dataset_list:
-                self.session_pool[dataset][1] = self.driver_predict.session(database=dataset)
+            return self.gold.run(db_id, query)
         except Exception as e:
             logging.debug(e)
+            return None
 
     def evaluate(self, query_predict, query_gold, db_id):
-        if db_id not in self.session_pool.keys():
+        if db_id not in self.dataset_list:
             return -1
 
         # run cypher on the server for ground truth
         ret_gold = True
         try:
-            res_gold = self.session_pool[db_id][0].run(query_gold).data()
+            res_gold = self.gold.run(db_id, query_gold)
         except Exception as e:
             ret_gold = False
             res_gold = e
 
-        # run cypher on the server for predict result
+        # run cypher on an idle predict server
         ret_predict = True
         try:
-            signal.alarm(10)
-            res_predict = self.session_pool[db_id][1].run(query_predict).data()
-            signal.alarm(0)
-        except TimeoutError as e:
-            ret_predict = False
-            res_predict = e
-            self.restart_predict_server()
+            res_predict = self.pool.run(db_id, query_predict)
         except Exception as e:
             ret_predict = False
             res_predict = e
-            if "Couldn't connect to localhost:9094 (resolved to ()):" in str(e):
-                self.restart_predict_server()
-        
+
         if ret_gold == False:
             return -1
         else:
             if ret_predict == True:
-                if "SKIP" in query_gold or "LIMIT" in query_gold:
-                    # if SKIP or LIMIT in cypher, only compare the size of query result
-                    if len(res_gold) == len(res_predict):
-                        return 1
-                    else:
-                        return 0
+                if self.comparator.compare(res_gold, res_predict, query_gold,
+                                           run_query=lambda query: self._run_gold(db_id, query)):
+                    return 1
                 else:
-                    # else, sort all query results then compare if two results are same
-                    for i in range(len(res_gold)):
-                        res_gold[i] = str(res_gold[i])
-                    res_gold.sort()
-                    for i in range(len(res_predict)):
-                        res_predict[i] = str(res_predict[i])
-                    res_predict.sort()
-                    if res_predict == res_gold:
-                        return 1
-                    else:
-                        return 0
+                    return 0
             else:
                 return 0
+
+    def evaluate_many(self, items):
+        """Scores for (query_predict, query_gold, db_id) items, in order, with one worker per predict server."""
+        with ThreadPoolExecutor(max_workers=self.pool_size) as executor:
+            yield from executor.map(lambda item: self.evaluate(*item), items)
@@ -0,0 +1,265 @@
+import sys
+import json
+import os.path
+
+sys.path.append(os.path.dirname(__file__))
+from cypher_tree import parse_cypher, find_all, symbol_text
+from LcypherParser import LcypherParser as P
+
+AGGREGATES = {"count", "sum", "avg", "min", "max", "collect", "stdev", "stdevp", "percentilecont", "percentiledisc"}
+
+
+class ValidationIssue:
+    """
+    Why a query cannot be right against the schema.
+      error - TuGraph would reject it (unknown label, relationship type or property)
+      empty - a MATCH pattern can never match (no such edge between those labels / in that direction)
+    provably_empty is set when an "empty" issue forces an empty result (no OPTIONAL MATCH,
+    aggregation or UNION that could still produce rows), so the result is known without executing.
+    """
+    __slots__ = ("reason", "kind", "provably_empty")
+
+    def __init__(self, reason, kind, provably_empty=False):
+        self.reason = reason
+        self.kind = kind
+        self.provably_empty = provably_empty
+
+    def __repr__(self):
+        return f"ValidationIssue({self.kind}: {self.reason})"
+
+
+class QueryValidator:
+    """Checks predicted queries against a TuGraph schema (import_config.json) using the Lcypher parse tree."""
+    def __init__(self, schema_json):
+        self.vertex_props = {}
+        self.edge_props = {}
+        self.edge_ends = {}
+        for item in schema_json["schema"]:
+            props = {p["name"] for p in item.get("properties", [])}
+            if item["type"] == "VERTEX":
+                self.vertex_props[item["label"]] = props
+            elif item["type"] == "EDGE":
+                self.edge_props[item["label"]] = props
+                if item.get("constraints"):
+                    self.edge_ends[item["label"]] = {tuple(c) for c in item["constraints"]}
+        self._cache = {}
+
+    @classmethod
+    def from_import_config(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def validate(self, query: str):
+        """ValidationIssue for query, or None when it passes (or cannot be parsed; the server decides then)."""
+        if query not in self._cache:
+            try:
+                issue = self._check(parse_cypher(query))
+            except Exception:
+                issue = None
+            self._cache[query] = issue
+        return self._cache[query]
+
+    # --- checks ---
+    def _check(self, tree):
+        for ctx in find_all(tree, P.OC_NodeLabelContext):
+            label = symbol_text(ctx.oC_LabelName())
+            if label not in self.vertex_props:
+                return ValidationIssue(f"Unknown label '{label}'", "error")
+        for ctx in find_all(tree, P.OC_RelTypeNameContext):
+            rel_type = symbol_text(ctx)
+            if rel_type not in self.edge_props:
+                return ValidationIssue(f"Unknown relationship type '{rel_type}'", "error")
+
+        regular = tree.oC_Statement().oC_Query().oC_RegularQuery()
+        if regular is None:
+            return None
+        singles = [regular.oC_SingleQuery()] + [u.oC_SingleQuery() for u in regular.oC_Union()]
+        empty = None
+        for single in singles:
+            issue = self._check_single(single)
+            if issue is not None and issue.kind == "error":
+                return issue
+            empty = empty or issue
+        if empty is not None and len(singles) == 1 and empty.provably_empty:
+            empty.provably_empty = not self._aggregates(tree)
+        elif empty is not None:
+            empty.provably_empty = False
+        return empty
+
+    @staticmethod
+    def _aggregates(tree) -> bool:
+        for atom in find_all(tree, P.OC_AtomContext):
+            if atom.COUNT() is not None:
+                return True
+        for call in find_all(tree, P.OC_FunctionInvocationContext):
+            if call.oC_FunctionName().getText().lower() in AGGREGATES:
+                return True
+        return False
+
+    def _check_single(self, single):
+        # variable -> ("node" | "rel", labels or types); unlabeled variables are not checked
+        scope = {}
+        empty = None
+        clauses = find_all(single, (P.OC_MatchContext, P.OC_UnwindContext, P.OC_WithContext, P.OC_ReturnContext))
+        for clause in clauses:
+            if isinstance(clause, P.OC_MatchContext):
+                issue = self._check_match(clause, scope)
+            elif isinstance(clause, P.OC_UnwindContext):
+                scope.pop(symbol_text(clause.oC_Variable()), None)
+                issue = self._check_lookups(clause, scope)
+            elif isinstance(clause, P.OC_WithContext):
+                # WITH ... WHERE filters the projected rows, so it sees the new names
+                issue = self._check_lookups(clause.oC_ReturnBody(), scope)
+                scope = self._project(clause, scope)
+                if issue is None and clause.oC_Where() is not None:
+                    issue = self._check_lookups(clause.oC_Where(), scope)
+            else:
+                issue = self._check_lookups(clause, scope)
+            if issue is not None:
+                if issue.kind == "error":
+                    return issue
+                empty = empty or issue
+        return empty
+
+    def _check_match(self, match, scope):
+        pattern = match.oC_Pattern()
+        for node in find_all(pattern, P.OC_NodePatternContext):
+            labels = self._labels(node)
+            if node.oC_Variable() is not None:
+                var = symbol_text(node.oC_Variable())
+                if labels or var not in scope:
+                    scope[var] = ("node", labels)
+            issue = self._check_map_keys(node.oC_Properties(), ("node", labels))
+            if issue is not None:
+                return issue
+        for detail in find_all(pattern, P.OC_RelationshipDetailContext):
+            types = self._types(detail)
+            if detail.oC_Variable() is not None and detail.oC_RangeLiteral() is None:
+                scope[symbol_text(detail.oC_Variable())] = ("rel", types)
+            issue = self._check_map_keys(detail.oC_Properties(), ("rel", types))
+            if issue is not None:
+                return issue
+
+        issue = self._check_lookups(match, scope)
+        if issue is not None:
+            return issue
+
+        for element in find_all(pattern, P.OC_PatternElementContext):
+            left = element.oC_NodePattern()
+            if left is None:
+                continue
+            for chain in element.oC_PatternElementChain():
+                right = chain.oC_NodePattern()
+                reason = self._impossible_hop(left, chain.oC_RelationshipPattern(), right, scope)
+                if reason is not None:
+                    return ValidationIssue(reason, "empty", provably_empty=match.OPTIONAL_() is None)
+                left = right
+        return None
+
+    def _check_lookups(self, ctx, scope):
+        """Property lookups var.key (and label tests var:LABEL) on variables whose labels are known."""
+        # Names rebound by list/pattern comprehensions inside ctx shadow outer variables
+        shadowed = {symbol_text(c.oC_Variable()) for c in find_all(ctx, P.OC_IdInCollContext)}
+        shadowed |= {symbol_text(c.oC_Variable()) for c in find_all(ctx, P.OC_PatternComprehensionContext)
+                     if c.oC_Variable() is not None}
+        for expr in find_all(ctx, P.OC_PropertyOrLabelsExpressionContext):
+            atom = expr.oC_Atom()
+            lookups = expr.oC_PropertyLookup()
+            if atom.oC_Variable() is None or not lookups:
+                continue
+            var = symbol_text(atom.oC_Variable())
+            if var in shadowed or var not in scope:
+                continue
+            issue = self._check_key(symbol_text(lookups[0].oC_PropertyKeyName()), scope[var])
+            if issue is not None:
+                return issue
+        return None
+
+    def _check_map_keys(self, properties, binding):
+        if properties is None or properties.oC_MapLiteral() is None:
+            return None
+        for key in properties.oC_MapLiteral().oC_PropertyKeyName():
+            issue = self._check_key(symbol_text(key), binding)
+            if issue is not None:
+                return issue
+        return None
+
+    def _check_key(self, key, binding):
+        kind, names = binding
+        if not names:
+            return None
+        schema = self.vertex_props if kind == "node" else self.edge_props
+        if any(key in schema.get(name, ()) for name in names):
+            return None
+        owner = "/".join(sorted(names))
+        return ValidationIssue(f"Unknown property '{key}' on {owner}", "error")
+
+    @staticmethod
+    def _project(with_ctx, scope):
+        """Scope after WITH: projected variables keep their labels, everything else is dropped."""
+        items = with_ctx.oC_ReturnBody().oC_ReturnItems()
+        if items.getChildCount() and items.getChild(0).getText() == "*":
+            projected = dict(scope)
+        else:
+            projected = {}
+        for item in items.oC_ReturnItem():
+            source = "".join(item.oC_Expression().getText().split())
+            target = symbol_text(item.oC_Variable()) if item.oC_Variable() is not None else source
+            if source in scope:
+                projected[target] = scope[source]
+            else:
+                projected.pop(target, None)
+        return projected
+
+    @staticmethod
+    def _labels(node):
+        labels = node.oC_NodeLabels()
+        if labels is None:
+            return frozenset()
+        return frozenset(symbol_text(l.oC_LabelName()) for l in labels.oC_NodeLabel())
+
+    @staticmethod
+    def _types(detail):
+        types = detail.oC_RelationshipTypes() if detail is not None else None
+        if types is None:
+            return frozenset()
+        return frozenset(symbol_text(t) for t in types.oC_RelTypeName())
+
+    def _node_labels(self, node, scope):
+        labels = self._labels(node)
+        if not labels and node.oC_Variable() is not None:
+            binding = scope.get(symbol_text(node.oC_Variable()))
+            if binding is not None and binding[0] == "node":
+                labels = binding[1]
+        return labels
+
+    def _impossible_hop(self, left, rel, right, scope):
+        """Reason why no edge can connect left and right through rel, or None."""
+        detail = rel.oC_RelationshipDetail()
+        if detail is not None and detail.oC_RangeLiteral() is not None:
+            # Variable-length paths may pass through other labels
+            return None
+        left_labels = self._node_labels(left, scope)
+        right_labels = self._node_labels(right, scope)
+        if not left_labels and not right_labels:
+            return None
+        if rel.oC_LeftArrowHead() is not None and rel.oC_RightArrowHead() is None:
+            directions = [(right_labels, left_labels)]
+        elif rel.oC_RightArrowHead() is not None and rel.oC_LeftArrowHead() is None:
+            directions = [(left_labels, right_labels)]
+        else:
+            directions = [(left_labels, right_labels), (right_labels, left_labels)]
+        types = self._types(detail) or frozenset(self.edge_props)
+        for rel_type in types:
+            ends = self.edge_ends.get(rel_type)
+            if ends is None:
+                # No constraints declared: any endpoints are allowed
+                return None
+            for src, dst in ends:
+                if any((not s or src in s) and (not d or dst in d) for s, d in directions):
+                    return None
+        src, dst = directions[0]
+        arrow = "-" if len(directions) == 2 else "->"
+        names = "|".join(sorted(types)) if detail is not None and self._types(detail) else "any type"
+        return (f"No {names} edge ({'/'.join(sorted(src)) or 'any'}){arrow}"
+                f"({'/'.join(sorted(dst)) or 'any'}) in the schema")
@@ -0,0 +1,253 @@
+import sys
+import os.path
+from collections import Counter
+
+sys.path.append(os.path.dirname(__file__))
+from cypher_tree import parse_cypher
+from result_normalization import RowNormalizer, normalize_value, row_digest
+
+
+def _compact(text):
+    """Case- and whitespace-insensitive form of an expression, used to match sort keys to columns."""
+    return "".join(text.split()).lower()
+
+
+class ComparisonPlan:
+    """
+    How two results of a gold query must be compared:
+      list     - final RETURN has ORDER BY; rows must follow the same key order, rows tied on
+                 the key may appear in any order, and the tie group cut by SKIP/LIMIT may
+                 hold different rows as long as it has the same keys
+      multiset - rows compared with duplicates, order ignored
+      set      - rows compared without duplicates (RETURN DISTINCT, UNION)
+      size     - LIMIT/SKIP without ORDER BY picks arbitrary rows: the row count, column count
+                 and column types must match and the predicted rows must come from the gold
+                 result without its SKIP/LIMIT (`unlimited`); when that query is unknown or
+                 cannot be run, rows are compared as a multiset instead
+    """
+    def __init__(self, mode="multiset", base="multiset", keys=None, skip=False, limit=None, unlimited=None):
+        self.mode = mode
+        self.base = base
+        # (column index, property name or None) per ORDER BY item, or None when unmappable
+        self.keys = keys
+        self.skip = skip
+        # Literal LIMIT value; None when absent or not a literal
+        self.limit = limit
+        # Gold query with the final SKIP/LIMIT cut out (size plans only)
+        self.unlimited = unlimited
+
+    def __repr__(self):
+        return (f"ComparisonPlan(mode={self.mode}, base={self.base}, keys={self.keys}, skip={self.skip}, "
+                f"limit={self.limit}, unlimited={self.unlimited!r})")
+
+
+class ResultComparator:
+    """
+    Compares gold and predicted query results with the semantics the gold query implies,
+    read from its Lcypher parse tree. Rows are reduced to 128-bit hashes of their normalized
+    form (see row_digest) and compared as sorted integer lists, instead of sorting str() renderings.
+    """
+    def __init__(self, canonicalize=normalize_value, canonicalize_rows=None):
+        self.canonicalize = canonicalize
+        # Batch form: rows -> list of canonical tuples (must agree with canonicalize)
+        self.canonicalize_rows = canonicalize_rows or RowNormalizer().normalize_all
+        self._plans = {}
+
+    # --- planning ---
+    def plan(self, gold_query: str) -> ComparisonPlan:
+        plan = self._plans.get(gold_query)
+        if plan is None:
+            try:
+                plan = self._build_plan(parse_cypher(gold_query), gold_query)
+            except Exception:
+                # Unparseable gold: fall back to plain multiset comparison
+                plan = ComparisonPlan()
+            self._plans[gold_query] = plan
+        return plan
+
+    def _build_plan(self, tree, query) -> ComparisonPlan:
+        regular = tree.oC_Statement().oC_Query().oC_RegularQuery()
+        if regular is None:
+            return ComparisonPlan()
+        unions = regular.oC_Union()
+        if unions:
+            # ORDER BY / LIMIT bind to the last branch only; the combined result is a bag or a set
+            mode = "multiset" if all(u.ALL() is not None for u in unions) else "set"
+            return ComparisonPlan(mode, mode)
+
+        single = regular.oC_SingleQuery()
+        final = single.oC_SinglePartQuery()
+        multi = single.oC_MultiPartQuery()
+        if final is None:
+            final = multi.oC_SinglePartQuery()
+        ret = final.oC_Return()
+        if ret is None:
+            return ComparisonPlan()
+
+        base = "set" if ret.DISTINCT() is not None else "multiset"
+        nondeterministic = False
+        if multi is not None:
+            for with_ctx in multi.oC_With():
+                body = with_ctx.oC_ReturnBody()
+                if (body.oC_Limit() or body.oC_Skip()) and body.oC_Order() is None:
+                    # Earlier WITH ... LIMIT without ORDER BY feeds arbitrary rows downstream
+                    nondeterministic = True
+
+        body = ret.oC_ReturnBody()
+        skip = body.oC_Skip() is not None
+        limit = None
+        if body.oC_Limit() is not None:
+            text = body.oC_Limit().oC_Expression().getText().strip()
+            limit = int(text) if text.isdigit() else -1
+
+        if body.oC_Order() is not None:
+            keys = self._sort_keys(body)
+            return ComparisonPlan("list", base, keys, skip, limit)
+        if nondeterministic:
+            return ComparisonPlan("size", base)
+        if skip or limit is not None:
+            # Cut from the last clause backwards so earlier character offsets stay valid
+            unlimited = query
+            for ctx in (body.oC_Limit(), body.oC_Skip()):
+                if ctx is not None:
+                    unlimited = unlimited[:ctx.start.start] + unlimited[ctx.stop.stop + 1:]
+            return ComparisonPlan("size", base, None, skip, limit, " ".join(unlimited.split()))
+        return ComparisonPlan(base, base)
+
+    def _sort_keys(self, body):
+        """Map every ORDER BY item to a returned column, or a property of a returned node."""
+        items = body.oC_ReturnItems()
+        if items.getChildCount() and items.getChild(0).getText() == "*":
+            return None
+        columns = {}
+        for i, item in enumerate(items.oC_ReturnItem()):
+            columns.setdefault(_compact(item.oC_Expression().getText()), i)
+            if item.oC_Variable() is not None:
+                columns.setdefault(_compact(item.oC_Variable().getText()), i)
+        keys = []
+        for sort_item in body.oC_Order().oC_SortItem():
+            raw = "".join(sort_item.oC_Expression().getText().split())
+            if raw.lower() in columns:
+                keys.append((columns[raw.lower()], None))
+                continue
+            var, _, prop = raw.partition(".")
+            var = var.lower()
+            if prop.isidentifier() and var in columns:
+                keys.append((columns[var], prop))
+                continue
+            return None
+        return keys
+
+    # --- comparison ---
+    def _hashes(self, rows) -> list:
+        return list(map(row_digest, self.canonicalize_rows(rows)))
+
+    def _key(self, row, keys):
+        values = list(row.values())
+        out = []
+        for column, prop in keys:
+            value = values[column] if column < len(values) else None
+            if prop is not None:
+                value = value.get(prop) if isinstance(value, dict) else None
+            out.append(self.canonicalize(value))
+        return tuple(out)
+
+    def _same_multiset(self, gold_rows, pred_rows) -> bool:
+        if len(gold_rows) != len(pred_rows):
+            return False
+        return sorted(self._hashes(gold_rows)) == sorted(self._hashes(pred_rows))
+
+    def _same_set(self, gold_rows, pred_rows) -> bool:
+        return set(self._hashes(gold_rows)) == set(self._hashes(pred_rows))
+
+    def _compare_mode(self, mode, gold_rows, pred_rows) -> bool:
+        if mode == "set":
+            return self._same_set(gold_rows, pred_rows)
+        return self._same_multiset(gold_rows, pred_rows)
+
+    def _same_list(self, plan, gold_rows, pred_rows, cut) -> bool:
+        if len(gold_rows) != len(pred_rows):
+            return False
+        if plan.keys is None:
+            # Sort keys are not visible in the output, so ties cannot be told apart: compare strictly
+            return self._hashes(gold_rows) == self._hashes(pred_rows)
+        gold_keys = [self._key(r, plan.keys) for r in gold_rows]
+        pred_keys = [self._key(r, plan.keys) for r in pred_rows]
+        if gold_keys != pred_keys:
+            return False
+        # Compare each run of rows tied on the sort key as a multiset
+        groups = []
+        start = 0
+        for i in range(1, len(gold_keys) + 1):
+            if i == len(gold_keys) or gold_keys[i] != gold_keys[start]:
+                groups.append((start, i))
+                start = i
+        for n, (lo, hi) in enumerate(groups):
+            boundary = (n == len(groups) - 1 and cut) or (n == 0 and plan.skip)
+            if boundary:
+                # SKIP/LIMIT may cut through this tie group; any members with the same key are valid
+                continue
+            if not self._same_multiset(gold_rows[lo:hi], pred_rows[lo:hi]):
+                return False
+        return True
+
+    @staticmethod
+    def limit_cut(plan: ComparisonPlan, gold_count: int) -> bool:
+        """Whether LIMIT may have dropped rows; a limit the gold result does not reach has not."""
+        return plan.limit is not None and (plan.limit < 0 or gold_count >= plan.limit)
+
+    @classmethod
+    def size_only(cls, plan: ComparisonPlan, gold_count: int) -> bool:
+        """Whether only the row count is comparable for this plan and gold result size."""
+        if plan.mode != "size":
+            return False
+        return plan.skip or plan.limit is None or cls.limit_cut(plan, gold_count)
+
+    @staticmethod
+    def _kind(value):
+        if value is None:
+            return None
+        if isinstance(value, (bool, int, float)):
+            return "number"
+        return type(value).__name__
+
+    def _column_kinds(self, canonical_rows) -> list:
+        """Per column, the set of normalized value kinds (numbers are one kind, nulls ignored)."""
+        width = len(canonical_rows[0])
+        return [{self._kind(row[i]) for row in canonical_rows} - {None} for i in range(width)]
+
+    def _same_shape(self, gold_rows, pred_rows) -> bool:
+        if not gold_rows or not pred_rows:
+            return True
+        gold, pred = self.canonicalize_rows(gold_rows), self.canonicalize_rows(pred_rows)
+        if len(gold[0]) != len(pred[0]):
+            return False
+        return all(not g or not p or p <= g for g, p in zip(self._column_kinds(gold), self._column_kinds(pred)))
+
+    def _drawn_from(self, plan, gold_rows, pred_rows, run_query) -> bool:
+        """Size plan: counts and shapes match and pred is a sub-multiset of the un-limited gold result."""
+        if len(gold_rows) != len(pred_rows) or not self._same_shape(gold_rows, pred_rows):
+            return False
+        superset = run_query(plan.unlimited) if run_query is not None and plan.unlimited else None
+        if superset is None:
+            return self._compare_mode(plan.base, gold_rows, pred_rows)
+        available = Counter(self._hashes(superset))
+        needed = Counter(self._hashes(pred_rows))
+        if plan.base == "set":
+            return all(h in available for h in needed)
+        return all(available[h] >= n for h, n in needed.items())
+
+    def compare(self, gold_rows: list, pred_rows: list, gold_query: str, run_query=None) -> bool:
+        """
+        run_query(query) -> rows, or None when it cannot be run (error, timeout, truncated),
+        executes the gold query without its SKIP/LIMIT for size plans; without it those
+        plans fall back to multiset comparison.
+        """
+        plan = self.plan(gold_query)
+        if plan.mode == "list":
+            return self._same_list(plan, gold_rows, pred_rows, self.limit_cut(plan, len(gold_rows)))
+        if plan.mode == "size":
+            if self.size_only(plan, len(gold_rows)):
+                return self._drawn_from(plan, gold_rows, pred_rows, run_query)
+            return self._compare_mode(plan.base, gold_rows, pred_rows)
+        return self._compare_mode(plan.mode, gold_rows, pred_rows)
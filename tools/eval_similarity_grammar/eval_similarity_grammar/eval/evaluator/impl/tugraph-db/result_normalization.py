@@ -0,0 +1,179 @@
+import hashlib
+from itertools import islice, repeat
+from operator import itemgetter
+import numpy as np
+
+# Bumped whenever the normalized form changes, so persisted fingerprints are not reused across forms
+FORMAT_VERSION = 4
+
+# Types returned unchanged by normalize_value
+_PASSTHROUGH = {int, str, bool, type(None)}
+# Ints pass through rounding untouched, so int/float columns share one path
+_NUMERIC = {int, float}
+
+
+def round_float(value: float) -> float:
+    """Round to 9 decimals exactly as the vectorized path does (rint(x * 1e9) / 1e9, no -0.0)."""
+    try:
+        return round(value * 1e9) / 1e9
+    except (OverflowError, ValueError):
+        # inf / nan
+        return value
+
+
+def _round_floats(column) -> list:
+    """round_float over a column of floats, computed in NumPy."""
+    values = np.asarray(column, dtype=np.float64)
+    with np.errstate(over="ignore", invalid="ignore"):
+        scaled = values * 1e9
+        rounded = np.rint(scaled) / 1e9 + 0.0
+    return np.where(np.isfinite(scaled), rounded, values).tolist()
+
+
+def _normalize_other(value):
+    if isinstance(value, float):
+        return round_float(value)
+    elif isinstance(value, (int, str, bool)) or value is None:
+        return value
+    elif hasattr(value, "isoformat"):
+        return value.isoformat()
+    elif hasattr(value, "total_seconds"):
+        return str(value)
+    elif isinstance(value, (list, tuple)):
+        return tuple(map(normalize_value, value))
+    elif isinstance(value, dict):
+        keys = tuple(sorted(value))
+        return keys, tuple(normalize_value(value[k]) for k in keys)
+    else:
+        return str(value)
+
+
+def normalize_value(value):
+    """Hashable, comparable form of one result cell: floats rounded to 9 decimals, temporals as text,
+    lists as tuples and maps (nodes) as (sorted keys, values) pairs."""
+    t = type(value)
+    if t is float:
+        return round_float(value)
+    if t in _PASSTHROUGH:
+        return value
+    return _normalize_other(value)
+
+
+def _type_canonical(value):
+    """Equal normalized values share one representation: bools and integral floats become ints."""
+    t = type(value)
+    if t is str or t is int or value is None:
+        return value
+    if t is bool:
+        return int(value)
+    if t is float:
+        return int(value) if value.is_integer() else value
+    if t is tuple:
+        return tuple(map(_type_canonical, value))
+    return value
+
+
+def row_digest(normalized_row) -> int:
+    """
+    128-bit hash of a normalized row that agrees with ==, so rows holding 1, 1.0 and True
+    hash alike (repr alone would tell them apart).
+    """
+    encoded = repr(_type_canonical(normalized_row)).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(encoded, digest_size=16).digest(), "big")
+
+
+def _column_kind(types: set) -> str:
+    if types <= _PASSTHROUGH:
+        return "passthrough"
+    if types <= _NUMERIC | {type(None)}:
+        return "numeric"
+    if types == {dict}:
+        return "map"
+    return "generic"
+
+
+def _normalize_column(column, kind=None):
+    """Normalize one column in bulk, dispatching on the types actually present."""
+    types = set(map(type, column))
+    if kind is None or _column_kind(types) != kind:
+        kind = _column_kind(types)
+    if kind == "passthrough":
+        return column
+    if kind == "numeric":
+        if types == {float}:
+            return _round_floats(column)
+        return [v if type(v) is not float else round_float(v) for v in column]
+    if kind == "map":
+        return _normalize_maps(column)
+    return list(map(normalize_value, column))
+
+
+def _normalize_maps(column):
+    """
+    Property maps (nodes, relationships) grouped by key layout; each group is transposed
+    into per-key columns so the scalar fast paths apply, then zipped back into rows.
+    """
+    layouts = list(map(tuple, column))
+    distinct = set(layouts)
+    if len(distinct) == 1:
+        groups = {layouts[0]: (range(len(column)), column)}
+    else:
+        groups = {layout: ([], []) for layout in distinct}
+        for i, (layout, value) in enumerate(zip(layouts, column)):
+            group = groups[layout]
+            group[0].append(i)
+            group[1].append(value)
+    out = [None] * len(column)
+    for layout, (positions, maps) in groups.items():
+        keys = tuple(sorted(layout))
+        if len(keys) < 2:
+            normalized = [(keys, tuple(normalize_value(m[k]) for k in keys)) for m in maps]
+        else:
+            values = zip(*map(itemgetter(*keys), maps))
+            normalized = list(zip(repeat(keys), zip(*[_normalize_column(list(v)) for v in values])))
+        if len(groups) == 1:
+            return normalized
+        for i, value in zip(positions, normalized):
+            out[i] = value
+    return out
+
+
+class RowNormalizer:
+    """
+    Normalizes record streams into tuples of normalized cells, batch by batch.
+    The first batch decides a kind per column (passthrough, numeric rounding, property
+    maps or generic); each batch is checked with one set(map(type, column)) pass and
+    only columns whose types changed drop to the generic per-cell path. Output is
+    identical to applying normalize_value to every cell.
+    """
+    def __init__(self, batch_size: int = 1024):
+        self.batch_size = batch_size
+
+    def normalize(self, records):
+        """Yield one normalized tuple per record (a dict with positional column order)."""
+        records = iter(records)
+        plan = None
+        while True:
+            batch = [tuple(r.values()) for r in islice(records, self.batch_size)]
+            if not batch:
+                return
+            width = len(batch[0])
+            if any(len(row) != width for row in batch):
+                # Ragged rows (not produced by a single RETURN); keep per-cell semantics
+                yield from (tuple(map(normalize_value, row)) for row in batch)
+                continue
+            columns = list(zip(*batch))
+            if plan is None or len(plan) != width:
+                plan = [self._compile(column) for column in columns]
+            yield from zip(*[self._apply(spec, column) for spec, column in zip(plan, columns)])
+
+    def normalize_all(self, records) -> list:
+        return list(self.normalize(records))
+
+    @staticmethod
+    def _compile(column):
+        return _column_kind(set(map(type, column)))
+
+    @staticmethod
+    def _apply(kind, column):
+        return _normalize_column(column, kind)
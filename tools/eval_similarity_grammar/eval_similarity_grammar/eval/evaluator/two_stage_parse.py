@@ -0,0 +1,26 @@
+from antlr4.atn.PredictionMode import PredictionMode
+from antlr4.error.ErrorStrategy import BailErrorStrategy, DefaultErrorStrategy
+from antlr4.error.Errors import ParseCancellationException
+
+
+def parse_two_stage(parser, start_rule, error_listener):
+    """
+    Run parser.<start_rule>() with fast SLL prediction and a bail-out strategy first, and only
+    if that fails rewind and rerun it with full LL prediction and error_listener attached.
+    Whatever SLL accepts, LL accepts too, so accept/reject results are exactly those of a
+    plain LL parse; only SLL's (rare) false rejections pay for the second pass.
+    """
+    parser.removeErrorListeners()
+    parser._errHandler = BailErrorStrategy()
+    parser._interp.predictionMode = PredictionMode.SLL
+    try:
+        return getattr(parser, start_rule)()
+    except ParseCancellationException:
+        pass
+
+    # rewinds the token stream; tokens lexed so far are reused
+    parser.reset()
+    parser._errHandler = DefaultErrorStrategy()
+    parser._interp.predictionMode = PredictionMode.LL
+    parser.addErrorListener(error_listener)
+    return getattr(parser, start_rule)()
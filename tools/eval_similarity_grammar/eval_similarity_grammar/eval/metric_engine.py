@@ -0,0 +1,95 @@
+import os
+import sys
+import importlib
+import multiprocessing
+
+# evaluator.* packages are resolved relative to this directory, as in evaluation.py
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from evaluator.similarity_evaluator import SimilarityEvaluator
+
+# Evaluator of a pool worker process, built once by _init_worker
+_worker_evaluator = None
+
+
+def _init_worker(etype, impl, gold_cache_path):
+    global _worker_evaluator
+    _worker_evaluator = MetricEngine(gold_cache_path).evaluator(etype, impl)
+
+
+def _score_chunk(chunk):
+    return [_worker_evaluator.evaluate(*item) for item in chunk]
+
+
+class MetricEngine:
+    """
+    In-process grammar / similarity scoring. Evaluators (and the generated ANTLR parsers behind
+    them) are imported once per implementation and reused; inputs and scores are Python lists.
+    gold_cache_path optionally persists gold-query validity for the grammar evaluators.
+    """
+    def __init__(self, gold_cache_path=None):
+        self.gold_cache_path = gold_cache_path
+        self._evaluators = {}
+
+    def evaluator(self, etype, impl, pool_size=2):
+        """The evaluator for etype / impl; pool_size only applies to execution evaluators."""
+        key = (etype, impl)
+        if key not in self._evaluators:
+            if etype == "similarity":
+                # jaro-winkler distance score
+                self._evaluators[key] = SimilarityEvaluator()
+            elif etype == "grammar":
+                # grammar check result, 1 if pass, 0 if fail
+                m = importlib.import_module(f"evaluator.impl.{impl}.grammar_evaluator")
+                self._evaluators[key] = getattr(m, "GrammarEvaluator")(gold_cache_path=self.gold_cache_path)
+            elif etype == "execution":
+                # excution result, 1 if same, 0 if not same
+                m = importlib.import_module(f"evaluator.impl.{impl}.execution_evaluator")
+                self._evaluators[key] = getattr(m, "ExecutionEvaluator")(pool_size=pool_size)
+            else:
+                raise ValueError(f"Unknown evaluation type: {etype}")
+        return self._evaluators[key]
+
+    @staticmethod
+    def prepare(predictions, golds):
+        """The same cleaning evaluation.py applies to its input files: one line per query, empty predictions as "no out"."""
+        preds = [p.replace("\n", " ").strip() if p else "" for p in predictions]
+        preds = [p if p else "no out" for p in preds]
+        golds = [g.replace("\n", " ").strip() if g else "" for g in golds]
+        return preds, golds
+
+    def iter_scores(self, etype, impl, items, workers=1, pool_size=2):
+        """
+        Scores for (query_predict, query_gold, db_id) items, in input order. With workers > 1,
+        grammar and similarity items are sharded across a process pool whose workers each
+        build their own evaluator; execution keeps its own server pool instead.
+        """
+        if workers > 1 and etype != "execution" and len(items) > 1:
+            yield from self._pool_scores(etype, impl, items, workers)
+            return
+        evaluator = self.evaluator(etype, impl, pool_size=pool_size)
+        if hasattr(evaluator, "evaluate_many"):
+            # evaluators backed by a server pool score several items at once, results stay in order
+            yield from evaluator.evaluate_many(items)
+        else:
+            for item in items:
+                yield evaluator.evaluate(*item)
+
+    def _pool_scores(self, etype, impl, items, workers):
+        # Several chunks per worker keep the pool busy when some queries parse much slower
+        chunk_size = max(1, min(256, -(-len(items) // (workers * 4))))
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+        with multiprocessing.Pool(workers, initializer=_init_worker, initargs=(etype, impl, self.gold_cache_path)) as pool:
+            for scores in pool.imap(_score_chunk, chunks):
+                yield from scores
+
+    def score(self, etype, impl, predictions, golds, db_ids=None, workers=1) -> dict:
+        """
+        Per-item scores and their mean. Items scored -1 (the gold query itself failed)
+        are left out of the mean, as they were when averaging eval.log.
+        """
+        assert len(predictions) == len(golds), "number of predicted queries and gold standard queries must equal"
+        preds, golds = self.prepare(predictions, golds)
+        db_ids = db_ids or [None] * len(golds)
+        scores = list(self.iter_scores(etype, impl, list(zip(preds, golds, db_ids)), workers))
+        valid = [s for s in scores if s >= 0]
+        return {"scores": scores, "score": sum(valid) / len(valid) if valid else 0.0}
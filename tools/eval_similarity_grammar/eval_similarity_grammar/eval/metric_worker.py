@@ -0,0 +1,38 @@
+import sys
+import json
+import argparse
+from metric_engine import MetricEngine
+
+# Long-lived scoring worker speaking JSON lines on stdin/stdout.
+# Request:  {"id": 1, "etype": "grammar", "impl": "tugraph-db", "predictions": [...], "golds": [...]}
+# Response: {"id": 1, "scores": [...], "score": 0.93} or {"id": 1, "error": "..."}
+# Evaluators are imported on first use and kept for the lifetime of the process.
+
+
+def serve(requests, responses, gold_cache_path=None):
+    engine = MetricEngine(gold_cache_path)
+    for line in requests:
+        if not line.strip():
+            continue
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            result = engine.score(request["etype"], request["impl"], request["predictions"],
+                                  request["golds"], request.get("db_ids"))
+            response = {"id": request_id, **result}
+        except Exception as e:
+            response = {"id": request_id, "error": f"{type(e).__name__}: {e}"}
+        responses.write(json.dumps(response, ensure_ascii=False) + "\n")
+        responses.flush()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--gold_cache", dest="gold_cache", type=str, default=None,
+                        help="sqlite file remembering which gold queries parse")
+    args = parser.parse_args()
+    # Anything the evaluators print goes to stderr so stdout carries only responses
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+    serve(sys.stdin, protocol_out, args.gold_cache)